@@ -0,0 +1,177 @@
+"""
+Servidor local que imita la API de push de Expo para pruebas de carga y de
+integración sin salir a internet.
+
+Uso:
+    python scripts/expo_stub_server.py --port 8765 --latency 0.2
+
+y en el .env del backend:
+    EXPO_HOST=http://127.0.0.1:8765
+
+Endpoints:
+    POST /--/api/v2/push/send   Responde un ticket por mensaje tras `--latency` segundos.
+                                Los tokens que contienen "unregistered" reciben
+                                DeviceNotRegistered y los que contienen "toobig"
+                                reciben MessageTooBig.
+    POST /--/api/v2/push/getReceipts
+                                Recibos de los tickets emitidos (hasta 1000 por
+                                solicitud). Los tokens que contienen "receiptdead"
+                                reciben DeviceNotRegistered y los que contienen
+                                "receiptfail" reciben MessageRateExceeded.
+    GET  /stats                 Número de solicitudes, mensajes y tiempo acumulado.
+    POST /stats/reset           Reinicia los contadores.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_PATH = "/--/api/v2/push/send"
+RECEIPTS_PATH = "/--/api/v2/push/getReceipts"
+MAX_MESSAGES = 100
+MAX_RECEIPTS = 1000
+
+_lock = threading.Lock()
+_stats = {
+    "requests": 0, "messages": 0, "max_batch": 0, "busy_seconds": 0.0,
+    "receipt_requests": 0, "receipts": 0,
+}
+# Token de cada ticket emitido, para responder sus recibos
+_tickets = {}
+
+
+def ticket_for(token: str) -> dict:
+    if "unregistered" in token:
+        return {
+            "status": "error",
+            "message": f'"{token}" is not a registered push notification recipient',
+            "details": {"error": "DeviceNotRegistered"},
+        }
+    if "toobig" in token:
+        return {
+            "status": "error",
+            "message": "Message too big",
+            "details": {"error": "MessageTooBig"},
+        }
+    ticket_id = str(uuid.uuid4())
+    with _lock:
+        _tickets[ticket_id] = token
+    return {"status": "ok", "id": ticket_id}
+
+
+def receipt_for(token: str) -> dict:
+    if "receiptdead" in token:
+        return {
+            "status": "error",
+            "message": f'"{token}" is not a registered push notification recipient',
+            "details": {"error": "DeviceNotRegistered"},
+        }
+    if "receiptfail" in token:
+        return {
+            "status": "error",
+            "message": "Message rate exceeded",
+            "details": {"error": "MessageRateExceeded"},
+        }
+    return {"status": "ok"}
+
+
+class ExpoStubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path != "/stats":
+            self._reply(404, {"errors": [{"code": "NOT_FOUND"}]})
+            return
+        with _lock:
+            self._reply(200, dict(_stats))
+
+    def do_POST(self) -> None:
+        if self.path == "/stats/reset":
+            with _lock:
+                _stats.update(
+                    requests=0, messages=0, max_batch=0, busy_seconds=0.0,
+                    receipt_requests=0, receipts=0,
+                )
+            self._reply(200, {"ok": True})
+            return
+        if self.path == RECEIPTS_PATH:
+            self._receipts()
+            return
+        if self.path.split("?")[0] != SEND_PATH:
+            self._reply(404, {"errors": [{"code": "NOT_FOUND"}]})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        messages = json.loads(self.rfile.read(length) or b"[]")
+        if isinstance(messages, dict):
+            messages = [messages]
+        if len(messages) > MAX_MESSAGES:
+            self._reply(400, {"errors": [{
+                "code": "PUSH_TOO_MANY_NOTIFICATIONS",
+                "message": f"Se enviaron {len(messages)} mensajes; el máximo es {MAX_MESSAGES}",
+            }]})
+            return
+
+        time.sleep(self.latency)
+        with _lock:
+            _stats["requests"] += 1
+            _stats["messages"] += len(messages)
+            _stats["max_batch"] = max(_stats["max_batch"], len(messages))
+            _stats["busy_seconds"] += self.latency
+        self._reply(200, {"data": [ticket_for(message.get("to", "")) for message in messages]})
+
+    def _receipts(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        ids = json.loads(self.rfile.read(length) or b"{}").get("ids", [])
+        if len(ids) > MAX_RECEIPTS:
+            self._reply(400, {"errors": [{
+                "code": "PUSH_TOO_MANY_RECEIPTS",
+                "message": f"Se pidieron {len(ids)} recibos; el máximo es {MAX_RECEIPTS}",
+            }]})
+            return
+
+        time.sleep(self.latency)
+        with _lock:
+            _stats["receipt_requests"] += 1
+            _stats["receipts"] += len(ids)
+            # Como Expo, el recibo se puede volver a consultar mientras no venza
+            tokens = {ticket_id: _tickets[ticket_id] for ticket_id in ids if ticket_id in _tickets}
+        self._reply(200, {"data": {
+            ticket_id: receipt_for(token) for ticket_id, token in tokens.items()
+        }})
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor simulado de Expo Push")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Segundos de espera por solicitud")
+    args = parser.parse_args()
+
+    ExpoStubHandler.latency = args.latency
+    server = ThreadingHTTPServer((args.host, args.port), ExpoStubHandler)
+    print(f"Expo stub escuchando en http://{args.host}:{args.port} (latencia {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
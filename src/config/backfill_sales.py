@@ -0,0 +1,24 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.crud import sale as sale_crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> int:
+    with Session(engine) as session:
+        return sale_crud.backfill(session)
+
+
+def main() -> None:
+    logger.info("Completando empresa de las ventas existentes")
+    updated = init()
+    logger.info(f"Ventas actualizadas: {updated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import Session, create_engine, select, SQLModel
 
 from src.crud import employee as employee_crud
@@ -6,6 +8,7 @@ from src.crud import role as role_crud
 from src.crud import supplier as supplier_crud
 from src.crud import category as category_crud
 from src.crud import product as product_crud
+from src.crud import notification_token as notification_token_crud
 from src.config.settings import settings
 
 # Importar todos los modelos
@@ -13,8 +16,46 @@ from src.models import *
 
 engine = create_engine(settings.MYSQL_URI)
 
+# Índices que los modelos ya no declaran y que quedan en bases de datos existentes
+OBSOLETE_INDEXES = {
+    # Reemplazado por el índice único ux_notificationtoken_token
+    "notificationtoken": ["ix_notificationtoken_token"],
+}
+
+def sync_schema(db_engine: Engine) -> None:
+    """
+    create_all no modifica tablas existentes: agrega las columnas e índices
+    declarados en los modelos que todavía no existen en la base de datos y
+    elimina los de OBSOLETE_INDEXES.
+    """
+    inspector = inspect(db_engine)
+    preparer = db_engine.dialect.identifier_preparer
+    with db_engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=db_engine.dialect)
+                    connection.execute(text(
+                        f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"
+                    ))
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=connection)
+            for name in OBSOLETE_INDEXES.get(table.name, []):
+                if name in existing_indexes:
+                    connection.execute(text(
+                        f"DROP INDEX {preparer.quote(name)} ON {preparer.format_table(table)}"
+                    ))
+
 def init_db(session: Session) -> None:
     SQLModel.metadata.create_all(engine)
+    # El índice único de notificationtoken.token requiere quitar antes los duplicados
+    notification_token_crud.remove_duplicates(session)
+    sync_schema(engine)
     
     # Crear empresa inicial si no existe
     enterprise = session.exec(
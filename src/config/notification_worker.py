@@ -0,0 +1,25 @@
+import logging
+
+from src.utils.notification_outbox import notification_outbox_worker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    # Usar con NOTIFICATION_OUTBOX_IN_PROCESS=false en el API
+    logger.info("Procesando la cola de notificaciones")
+    # El registro de tokens lee cada NOTIFICATION_TOKEN_REGISTRY_POLL_SECONDS los
+    # cambios que hace el API
+    notification_outbox_worker.start()
+    try:
+        notification_outbox_worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notification_outbox_worker.stop()
+    logger.info("Worker de notificaciones detenido")
+
+
+if __name__ == "__main__":
+    main()
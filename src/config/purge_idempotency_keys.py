@@ -0,0 +1,24 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.utils import idempotency
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> int:
+    with Session(engine) as session:
+        return idempotency.purge_expired(session)
+
+
+def main() -> None:
+    logger.info("Eliminando Idempotency-Keys vencidas")
+    deleted = init()
+    logger.info(f"Llaves eliminadas: {deleted}")
+
+
+if __name__ == "__main__":
+    main()
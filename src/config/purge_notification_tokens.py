@@ -0,0 +1,30 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.config.settings import settings
+from src.crud import notification_token
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> int:
+    with Session(engine) as session:
+        return notification_token.purge_inactive(
+            session, settings.NOTIFICATION_TOKEN_PURGE_DAYS
+        )
+
+
+def main() -> None:
+    logger.info(
+        f"Eliminando tokens de notificación inactivos hace más de "
+        f"{settings.NOTIFICATION_TOKEN_PURGE_DAYS} días"
+    )
+    deleted = init()
+    logger.info(f"Tokens eliminados: {deleted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.crud import category_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> int:
+    with Session(engine) as session:
+        return category_stats.rebuild(session)
+
+
+def main() -> None:
+    logger.info("Recalculando los agregados por categoría")
+    categories = init()
+    logger.info(f"Categorías recalculadas: {categories}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.crud import client_summary
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    with Session(engine) as session:
+        client_summary.rebuild(session)
+
+
+def main() -> None:
+    logger.info("Recalculando los resúmenes de compras por cliente")
+    init()
+    logger.info("Resúmenes recalculados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.crud import sales_rollup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    with Session(engine) as session:
+        sales_rollup.rebuild(session)
+
+
+def main() -> None:
+    logger.info("Recalculando los agregados diarios de ventas")
+    init()
+    logger.info("Agregados de ventas recalculados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import logging
+
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.crud import product as product_crud
+from src.crud import category_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> int:
+    with Session(engine) as session:
+        updated = product_crud.reconcile_status(session)
+        # El cambio de estado altera el conteo de productos activos por categoría
+        if updated:
+            category_stats.rebuild(session)
+        return updated
+
+
+def main() -> None:
+    logger.info("Sincronizando el estado de los productos con su stock")
+    updated = init()
+    logger.info(f"Productos actualizados: {updated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -58,6 +58,90 @@ class Settings(BaseSettings):
     
     # Expo Push Notifications
     EXPO_TOKEN: str = ""
+    # Servidor de Expo (se puede apuntar a scripts/expo_stub_server.py en pruebas locales)
+    EXPO_HOST: str = "https://exp.host"
+    # Mensajes por solicitud a /push/send (Expo acepta hasta 100)
+    EXPO_PUSH_CHUNK_SIZE: int = 100
+
+    # Cola de notificaciones: el worker corre dentro del API salvo que se use
+    # python -m src.config.notification_worker. Reserva hasta BATCH_SIZE
+    # notificaciones, las envía con CONCURRENCY hilos y reintenta con backoff
+    # exponencial hasta MAX_ATTEMPTS antes de dejarlas en DEAD
+    NOTIFICATION_OUTBOX_IN_PROCESS: bool = True
+    NOTIFICATION_OUTBOX_BATCH_SIZE: int = 100
+    NOTIFICATION_OUTBOX_CONCURRENCY: int = 4
+    NOTIFICATION_OUTBOX_POLL_SECONDS: int = 5
+    NOTIFICATION_OUTBOX_LEASE_SECONDS: int = 300
+    NOTIFICATION_RETRY_BASE_SECONDS: int = 30
+    NOTIFICATION_RETRY_MAX_SECONDS: int = 3600
+    NOTIFICATION_MAX_ATTEMPTS: int = 6
+
+    # Envíos masivos: solicitudes simultáneas a Expo y mensajes por segundo
+    # (Expo admite hasta 600 por segundo por proyecto). Al iniciar, un envío en
+    # curso sin avances hace más de NOTIFICATION_BROADCAST_STALE_SECONDS se da
+    # por interrumpido
+    NOTIFICATION_BROADCAST_CONCURRENCY: int = 4
+    NOTIFICATION_BROADCAST_RATE_PER_SECOND: float = 500
+    NOTIFICATION_BROADCAST_STALE_SECONDS: int = 600
+
+    # Recibos de Expo: cada cuánto se consultan, antigüedad mínima del ticket
+    # (Expo recomienda esperar ~15 min), tickets por solicitud y tiempo tras el
+    # cual Expo ya no guarda el recibo
+    PUSH_RECEIPT_INTERVAL_SECONDS: int = 900
+    PUSH_RECEIPT_DELAY_SECONDS: int = 900
+    PUSH_RECEIPT_CHUNK_SIZE: int = 1000
+    PUSH_RECEIPT_EXPIRY_HOURS: int = 24
+    # Dispositivos con MAX_FAILURES fallos seguidos se omiten hasta pasar RETRY_HOURS
+    NOTIFICATION_TOKEN_MAX_FAILURES: int = 5
+    NOTIFICATION_TOKEN_RETRY_HOURS: int = 24
+    # Registro de tokens activos por usuario: clase del backend (ruta de importación).
+    # El registro en memoria es de cada proceso: con un solo proceso está siempre al
+    # día, pero con varios procesos del API (o el worker de notificaciones aparte) cada
+    # uno ve los tokens registrados, reasignados o desactivados en los demás hasta
+    # POLL_SECONDS tarde, cuando lee los cambios por updated_at; un token reasignado
+    # puede recibir en ese lapso una notificación del dueño anterior. Cada TTL_SECONDS
+    # se recarga completo. Si ese retraso no es aceptable, usar
+    # src.utils.token_registry.DatabaseTokenRegistry (una consulta por envío) o un
+    # backend compartido (Redis) que implemente TokenRegistry
+    NOTIFICATION_TOKEN_REGISTRY: str = "src.utils.token_registry.InMemoryTokenRegistry"
+    NOTIFICATION_TOKEN_REGISTRY_TTL_SECONDS: int = 300
+    NOTIFICATION_TOKEN_REGISTRY_POLL_SECONDS: int = 5
+    # Días sin cambios tras los cuales se eliminan los tokens inactivos
+    NOTIFICATION_TOKEN_PURGE_DAYS: int = 90
+
+    # Alertas de stock bajo: ventana (segundos) en la que se agrupan por empresa
+    LOW_STOCK_ALERT_WINDOW_SECONDS: int = 60
+    LOW_STOCK_ALERT_EMAIL: bool = False
+
+    # Tiempo (segundos) que se reutiliza el análisis de productos por empresa y periodo
+    PRODUCT_ANALYTICS_CACHE_SECONDS: int = 300
+
+    # Idempotency-Key: vigencia de las respuestas guardadas y de la caché en memoria.
+    # Una reserva sin respuesta se puede retomar pasados IDEMPOTENCY_LOCK_SECONDS
+    # (el proceso que la tomó pudo haberse caído)
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CACHE_SECONDS: int = 600
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+
+    # Sincronización fuera de línea: facturas por transacción
+    SYNC_BATCH_CHUNK_SIZE: int = 100
+
+    # Sugerencias de pedido: historial usado, vida media de la velocidad de venta,
+    # días de entrega y de cobertura, y hora (0-23) del cálculo nocturno
+    REORDER_HISTORY_DAYS: int = 365
+    REORDER_HALF_LIFE_DAYS: int = 14
+    REORDER_LEAD_TIME_DAYS: int = 7
+    REORDER_COVERAGE_DAYS: int = 14
+    REORDER_FORECAST_HOUR: int = 2
+
+    # Tablero de ventas en vivo: clase del broker de eventos (ruta de importación)
+    LIVE_SALES_BROKER: str = "src.utils.live_sales.InProcessBroker"
+
+    # Recibos: ancho en caracteres del formato de texto (48 para impresoras de 80 mm,
+    # 32 para 58 mm), recibos guardados en memoria y pre-render tras el checkout
+    RECEIPT_TEXT_WIDTH: int = 48
+    RECEIPT_CACHE_SIZE: int = 1000
+    RECEIPT_PRERENDER: bool = True
 
 
 settings = Settings()
@@ -34,10 +34,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         ).offset(skip).limit(limit)
         return session.exec(statement).all()
 
-    def create(self, session: Session, *, obj_in: CreateSchemaType) -> ModelType:
+    def create(self, session: Session, *, obj_in: CreateSchemaType, commit: bool = True) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         session.add(db_obj)
+        # Sin commit el llamador confirma la transacción (p. ej. junto con la Idempotency-Key)
+        if not commit:
+            session.flush()
+            return db_obj
         session.commit()
         session.refresh(db_obj)
         return db_obj
@@ -1,14 +1,26 @@
 from typing import Optional, List
 from sqlmodel import Session, select
 from src.models.category import Category, CategoryCreate, CategoryUpdate
+from src.models.product import Product
 from .base import CRUDBase
+from . import category_stats
 
 class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
     def get_by_name(self, session: Session, *, name: str) -> Optional[Category]:
         return session.exec(select(Category).where(Category.name == name)).first()
 
-    def get_products(self, session: Session, *, category_id: int) -> List["Product"]:
-        category = self.get(session=session, id=category_id)
-        return category.products if category else []
+    def get_products(
+        self, session: Session, *, category_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Product]:
+        return session.exec(
+            select(Product)
+            .where(Product.category_id == category_id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+    def remove(self, session: Session, *, id: int) -> Category:
+        category_stats.delete_for_category(session, id)
+        return super().remove(session=session, id=id)
 
 category = CRUDCategory(Category)
\ No newline at end of file
@@ -0,0 +1,148 @@
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import case, delete, func
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import Session, select
+
+from src.models.category import Category, CategoryStats, CategorySummaryRead
+from src.models.product import Product, ProductStatus
+
+FIELDS = ("product_count", "active_count", "stock_units", "stock_value")
+
+
+def product_delta(product: Any, sign: int = 1, **overrides: Any) -> Dict[str, Any]:
+    """
+    Aporte de un producto a los agregados de su categoría.
+    `overrides` permite calcular el aporte con valores que aún no se han guardado.
+    """
+    values = {
+        field: overrides.get(field, getattr(product, field))
+        for field in ("category_id", "enterprise_id", "status", "stock", "supplier_price")
+    }
+    return {
+        "category_id": values["category_id"],
+        "enterprise_id": values["enterprise_id"],
+        "product_count": sign,
+        "active_count": sign if values["status"] == ProductStatus.ACTIVE else 0,
+        "stock_units": sign * values["stock"],
+        "stock_value": sign * values["stock"] * values["supplier_price"],
+    }
+
+
+def stock_delta(product: Product, quantity: int, active_delta: int = 0) -> Dict[str, Any]:
+    """
+    Variación de los agregados cuando solo cambia el stock de un producto.
+    """
+    return {
+        "category_id": product.category_id,
+        "enterprise_id": product.enterprise_id,
+        "product_count": 0,
+        "active_count": active_delta,
+        "stock_units": quantity,
+        "stock_value": quantity * product.supplier_price,
+    }
+
+
+def apply_deltas(session: Session, deltas: Iterable[Dict[str, Any]]) -> None:
+    """
+    Acumula los deltas por categoría y los aplica con un único
+    INSERT ... ON DUPLICATE KEY UPDATE. No hace commit.
+    """
+    merged: Dict[int, Dict[str, Any]] = {}
+    for delta in deltas:
+        if delta["category_id"] is None:
+            continue
+        row = merged.setdefault(
+            delta["category_id"],
+            {
+                "category_id": delta["category_id"],
+                "enterprise_id": delta["enterprise_id"],
+                **{field: 0 for field in FIELDS},
+            },
+        )
+        for field in FIELDS:
+            row[field] += delta[field]
+
+    rows = [row for row in merged.values() if any(row[field] for field in FIELDS)]
+    if not rows:
+        return
+
+    table = CategoryStats.__table__
+    statement = insert(table).values(rows)
+    statement = statement.on_duplicate_key_update(
+        {field: table.c[field] + statement.inserted[field] for field in FIELDS}
+    )
+    session.exec(statement)
+
+
+def get_summaries(
+    session: Session, *, enterprise_id: int, skip: int = 0, limit: int = 100
+) -> List[CategorySummaryRead]:
+    """
+    Lista las categorías de la empresa con sus agregados en una sola consulta.
+    """
+    rows = session.exec(
+        select(Category, CategoryStats)
+        .outerjoin(CategoryStats, CategoryStats.category_id == Category.id)
+        .where(Category.enterprise_id == enterprise_id)
+        .order_by(Category.id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    return [
+        CategorySummaryRead(
+            id=category.id,
+            name=category.name,
+            description=category.description,
+            enterprise_id=category.enterprise_id,
+            product_count=stats.product_count if stats else 0,
+            active_count=stats.active_count if stats else 0,
+            stock_units=stats.stock_units if stats else 0,
+            stock_value=stats.stock_value if stats else 0,
+        )
+        for category, stats in rows
+    ]
+
+
+def delete_for_category(session: Session, category_id: int) -> None:
+    """
+    Elimina los agregados de una categoría. No hace commit.
+    """
+    session.exec(delete(CategoryStats).where(CategoryStats.category_id == category_id))
+
+
+def rebuild(session: Session) -> int:
+    """
+    Recalcula todos los agregados desde la tabla de productos.
+    """
+    rows = session.exec(
+        select(
+            Product.category_id,
+            func.min(Product.enterprise_id),
+            func.count(Product.id),
+            func.sum(case((Product.status == ProductStatus.ACTIVE, 1), else_=0)),
+            func.coalesce(func.sum(Product.stock), 0),
+            func.coalesce(func.sum(Product.stock * Product.supplier_price), 0),
+        )
+        .where(Product.category_id.is_not(None))
+        .group_by(Product.category_id)
+    ).all()
+
+    session.exec(delete(CategoryStats))
+    if rows:
+        session.exec(
+            insert(CategoryStats.__table__),
+            params=[
+                {
+                    "category_id": category_id,
+                    "enterprise_id": enterprise_id,
+                    "product_count": product_count,
+                    "active_count": active_count,
+                    "stock_units": stock_units,
+                    "stock_value": stock_value,
+                }
+                for category_id, enterprise_id, product_count, active_count, stock_units, stock_value in rows
+            ],
+        )
+    session.commit()
+    return len(rows)
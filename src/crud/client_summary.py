@@ -0,0 +1,138 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert as sa_insert, tuple_, update
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import Session, select
+
+from src.models.client import Client, ClientSummary, ClientSummaryRead
+from src.models.sale import Sale
+
+
+def apply_sales(
+    session: Session,
+    *,
+    sales: Iterable[Sale],
+    sign: int = 1,
+    count_visits: bool = True
+) -> None:
+    """
+    Suma (sign=1) o resta (sign=-1) las ventas del resumen de cada cliente.
+    Cada factura distinta cuenta como una visita; `count_visits=False` cuando
+    la factura ya estaba contada o sigue teniendo otras ventas del cliente.
+    Al restar, las ventas ya deben estar eliminadas para recalcular la última
+    fecha de compra. No hace commit.
+    """
+    rows: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    invoices: Dict[Tuple[int, int], set] = {}
+    for sale in sales:
+        if sale.client_id is None or sale.enterprise_id is None:
+            continue
+        key = (sale.client_id, sale.enterprise_id)
+        row = rows.setdefault(key, {
+            "client_id": sale.client_id,
+            "enterprise_id": sale.enterprise_id,
+            "visits": 0,
+            "lifetime_spend": 0,
+            "last_purchase_date": None,
+        })
+        row["lifetime_spend"] += sign * sale.total_price
+        if sign > 0 and (row["last_purchase_date"] is None or sale.sell_date > row["last_purchase_date"]):
+            row["last_purchase_date"] = sale.sell_date
+        invoices.setdefault(key, set()).add(sale.invoice_id)
+    if not rows:
+        return
+    if count_visits:
+        for key, row in rows.items():
+            row["visits"] = sign * len(invoices[key])
+
+    table = ClientSummary.__table__
+    statement = insert(table).values(list(rows.values()))
+    inserted = statement.inserted
+    statement = statement.on_duplicate_key_update({
+        "visits": table.c.visits + inserted.visits,
+        "lifetime_spend": table.c.lifetime_spend + inserted.lifetime_spend,
+        # GREATEST devuelve NULL si alguno lo es
+        "last_purchase_date": func.coalesce(
+            func.greatest(table.c.last_purchase_date, inserted.last_purchase_date),
+            table.c.last_purchase_date,
+            inserted.last_purchase_date,
+        ),
+    })
+    session.exec(statement)
+
+    if sign < 0:
+        last_purchase = (
+            select(func.max(Sale.sell_date))
+            .where(
+                Sale.client_id == ClientSummary.client_id,
+                Sale.enterprise_id == ClientSummary.enterprise_id,
+            )
+            .scalar_subquery()
+        )
+        session.exec(
+            update(ClientSummary)
+            .where(tuple_(ClientSummary.client_id, ClientSummary.enterprise_id).in_(list(rows)))
+            .values(last_purchase_date=last_purchase)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def get_summary(
+    session: Session, *, client_id: int, enterprise_id: int
+) -> Optional[ClientSummaryRead]:
+    """
+    Cliente con su resumen de compras en la empresa, en una sola consulta.
+    """
+    row = session.exec(
+        select(Client, ClientSummary)
+        .outerjoin(
+            ClientSummary,
+            (ClientSummary.client_id == Client.id) & (ClientSummary.enterprise_id == enterprise_id),
+        )
+        .where(Client.id == client_id)
+    ).first()
+    if row is None:
+        return None
+    client, summary = row
+    visits = summary.visits if summary else 0
+    lifetime_spend = summary.lifetime_spend if summary else 0
+    return ClientSummaryRead(
+        id=client.id,
+        name=client.name,
+        visits=visits,
+        lifetime_spend=round(lifetime_spend, 2),
+        last_purchase_date=summary.last_purchase_date if summary else None,
+        average_ticket=round(lifetime_spend / visits, 2) if visits else 0,
+    )
+
+
+def rebuild(session: Session) -> None:
+    """
+    Recalcula todos los resúmenes a partir de las ventas.
+    """
+    session.exec(delete(ClientSummary))
+    aggregated = (
+        select(
+            Sale.client_id,
+            Sale.enterprise_id,
+            func.count(func.distinct(Sale.invoice_id)),
+            func.sum(Sale.total_price),
+            func.max(Sale.sell_date),
+        )
+        .where(Sale.client_id.is_not(None), Sale.enterprise_id.is_not(None))
+        .group_by(Sale.client_id, Sale.enterprise_id)
+    )
+    table = ClientSummary.__table__
+    session.exec(
+        sa_insert(table).from_select(
+            [
+                table.c.client_id,
+                table.c.enterprise_id,
+                table.c.visits,
+                table.c.lifetime_spend,
+                table.c.last_purchase_date,
+            ],
+            aggregated,
+        )
+    )
+    session.commit()
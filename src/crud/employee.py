@@ -1,6 +1,8 @@
 from typing import Optional, List
 from sqlmodel import Session, select
 from src.models.employee import Employee, EmployeeCreate, EmployeeUpdate
+from src.models.permission import Permission
+from src.models.permission_has_role import PermissionHasRole
 from src.config.security import get_password_hash, verify_password
 from .base import CRUDBase
 
@@ -23,6 +25,24 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeUpdate]):
             .limit(limit)
         ).all()
 
+    def get_by_permission(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        permission_name: str
+    ) -> List[Employee]:
+        return session.exec(
+            select(Employee)
+            .join(PermissionHasRole, PermissionHasRole.role_id == Employee.role_id)
+            .join(Permission, Permission.id == PermissionHasRole.permission_id)
+            .where(
+                Employee.enterprise_id == enterprise_id,
+                Employee.is_active == True,
+                Permission.name == permission_name
+            )
+        ).all()
+
     def create(self, session: Session, *, obj_in: EmployeeCreate) -> Employee:
         db_obj = Employee(
             email=obj_in.email,
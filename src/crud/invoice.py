@@ -1,25 +1,574 @@
-from typing import Optional, List
-from datetime import datetime
-from sqlmodel import Session, select
-from src.models.invoice import Invoice, InvoiceCreate, InvoiceUpdate
+import json
+from collections import Counter
+from typing import Any, Dict, Optional, List, Tuple
+from datetime import date, datetime
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import Session, select, insert, update, delete
+from src.models.client import Client
+from src.models.enterprise import Enterprise
+from src.models.invoice import Invoice, InvoiceCreate, InvoiceUpdate, InvoiceVoid
+from src.models.product import Product, ProductStatus
+from src.models.sale import (
+    Sale, CheckoutCreate, InvoiceSummaryRead, InvoiceSaleRead, InvoiceDetailRead
+)
+from src.models.sync import SyncInvoice, SyncInvoiceResult, SyncStatus
+from src.utils import live_sales
 from .base import CRUDBase
+from .product import product as product_crud
+from . import sales_rollup, client_summary
+
+
+class InvoiceAlreadyVoidedError(Exception):
+    def __init__(self, invoice_id: int):
+        self.invoice_id = invoice_id
+        super().__init__(f"La factura {invoice_id} ya fue anulada")
+
 
 class CRUDInvoice(CRUDBase[Invoice, InvoiceCreate, InvoiceUpdate]):
     def get_by_date_range(
         self, 
         session: Session, 
         *, 
+        enterprise_id: int,
         start_date: datetime, 
-        end_date: datetime
+        end_date: datetime,
+        skip: int = 0,
+        limit: int = 100
     ) -> List[Invoice]:
+        # Usa el índice (enterprise_id, created_at)
         return session.exec(
             select(Invoice)
+            .where(Invoice.enterprise_id == enterprise_id)
             .where(Invoice.created_at >= start_date)
             .where(Invoice.created_at <= end_date)
+            .order_by(Invoice.created_at, Invoice.id)
+            .offset(skip)
+            .limit(limit)
         ).all()
 
     def get_sales(self, session: Session, *, invoice_id: int) -> List["Sale"]:
-        invoice = self.get(session=session, id=invoice_id)
-        return invoice.sales if invoice else []
+        return session.exec(
+            select(Sale).where(Sale.invoice_id == invoice_id).order_by(Sale.id)
+        ).all()
+
+    def get_summaries(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[InvoiceSummaryRead]:
+        """
+        Facturas de la empresa, las más recientes primero, con número de líneas,
+        unidades y total calculado de sus ventas en una sola consulta agrupada.
+        """
+        rows = session.exec(
+            select(
+                Invoice,
+                func.count(Sale.id),
+                func.coalesce(func.sum(Sale.quantity), 0),
+                func.coalesce(func.sum(Sale.total_price), 0)
+            )
+            .outerjoin(Sale, Sale.invoice_id == Invoice.id)
+            .where(Invoice.enterprise_id == enterprise_id)
+            .group_by(Invoice.id)
+            .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        return [
+            InvoiceSummaryRead(
+                **invoice.model_dump(),
+                line_count=line_count,
+                units=units,
+                lines_total=lines_total
+            )
+            for invoice, line_count, units, lines_total in rows
+        ]
+
+    def get_detail(self, session: Session, *, invoice_id: int) -> Optional[InvoiceDetailRead]:
+        """
+        Factura con sus ventas y el nombre de cada producto, cargados con
+        selectinload en lugar de una consulta por venta.
+        """
+        invoice = session.exec(
+            select(Invoice)
+            .where(Invoice.id == invoice_id)
+            .options(selectinload(Invoice.sales).joinedload(Sale.product))
+        ).first()
+        if not invoice:
+            return None
+        return InvoiceDetailRead(
+            **invoice.model_dump(),
+            sales=[
+                InvoiceSaleRead(
+                    **sale.model_dump(),
+                    product_name=sale.product.name if sale.product else None
+                )
+                for sale in sorted(invoice.sales, key=lambda sale: sale.id)
+            ]
+        )
+
+    def get_line_state(self, session: Session, *, invoice_id: int) -> Tuple[int, Optional[int]]:
+        """
+        Cantidad de líneas y mayor id de venta de la factura: cambia al agregar
+        o eliminar una venta, sin importar el proceso que la haya hecho.
+        """
+        count, max_id = session.exec(
+            select(func.count(Sale.id), func.max(Sale.id)).where(Sale.invoice_id == invoice_id)
+        ).one()
+        return count, max_id
+
+    def get_receipt_data(self, session: Session, *, invoice_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Factura, empresa, cliente y líneas con el nombre del producto en una sola
+        consulta. Las facturas anuladas toman sus líneas del registro de auditoría.
+        """
+        rows = session.exec(
+            select(Invoice, Enterprise, Sale, Product.name, Client.name)
+            .join(Enterprise, Enterprise.id == Invoice.enterprise_id)
+            .outerjoin(Sale, Sale.invoice_id == Invoice.id)
+            .outerjoin(Product, Product.id == Sale.product_id)
+            .outerjoin(Client, Client.id == Sale.client_id)
+            .where(Invoice.id == invoice_id)
+            .order_by(Sale.id)
+        ).all()
+        if not rows:
+            return None
+        invoice, enterprise = rows[0][0], rows[0][1]
+        lines = [
+            {
+                "name": product_name or "",
+                "quantity": sale.quantity,
+                "price": sale.price,
+                "discount": sale.discount,
+                "total_price": sale.total_price,
+            }
+            for _, _, sale, product_name, _ in rows
+            if sale is not None
+        ]
+        client_name = next((name for *_, name in rows if name), None)
+
+        if not lines and invoice.voided_at is not None:
+            audit = session.exec(
+                select(InvoiceVoid)
+                .where(InvoiceVoid.invoice_id == invoice_id)
+                .order_by(InvoiceVoid.id.desc())
+            ).first()
+            snapshot = json.loads(audit.lines) if audit else []
+            names = dict(session.exec(
+                select(Product.id, Product.name)
+                .where(Product.id.in_([line["product_id"] for line in snapshot]))
+            ).all()) if snapshot else {}
+            lines = [
+                {
+                    "name": names.get(line["product_id"], ""),
+                    "quantity": line["quantity"],
+                    "price": line["price"],
+                    "discount": line["discount"],
+                    "total_price": line["total_price"],
+                }
+                for line in snapshot
+            ]
+            client_id = next((line["client_id"] for line in snapshot if line["client_id"]), None)
+            client = session.get(Client, client_id) if client_id else None
+            client_name = client.name if client else None
+
+        return {
+            "invoice": invoice,
+            "enterprise": enterprise,
+            "client_name": client_name,
+            "lines": lines,
+        }
+
+    def checkout(
+        self, session: Session, *, enterprise_id: int, obj_in: CheckoutCreate, commit: bool = True
+    ) -> Tuple[Invoice, List[Sale]]:
+        """
+        Crea la factura con todas sus líneas en una sola transacción: un UPDATE
+        condicional para el stock, un executemany para las ventas, los agregados
+        de reportes y un único commit. Con commit=False el llamador confirma.
+        Lanza InsufficientStockError (con la transacción revertida) si falta stock.
+        """
+        db_obj = Invoice(
+            payment_method=obj_in.payment_method,
+            total_price=obj_in.total_price,
+            enterprise_id=enterprise_id
+        )
+        session.add(db_obj)
+        session.flush()
+
+        quantities = Counter()
+        for line in obj_in.lines:
+            quantities[line.product_id] -= line.quantity
+        products = product_crud.adjust_stock(session=session, deltas=quantities)
+        costs = {p.id: p.supplier_price for p in products}
+
+        sell_date = date.today()
+        rows = [
+            {
+                "quantity": line.quantity,
+                "discount": line.discount,
+                "price": line.price,
+                "sell_date": sell_date,
+                "total_price": line.total_price,
+                "invoice_id": db_obj.id,
+                "client_id": obj_in.client_id,
+                "product_id": line.product_id,
+                "enterprise_id": enterprise_id,
+                "unit_cost": costs[line.product_id],
+            }
+            for line in obj_in.lines
+        ]
+        session.exec(insert(Sale), params=rows)
+        new_sales = [Sale(**row) for row in rows]
+        sales_rollup.apply_sales(
+            session,
+            sales=new_sales,
+            products={p.id: p for p in products}
+        )
+        client_summary.apply_sales(session, sales=new_sales)
+        live_sales.track(session, enterprise_id, live_sales.sale_event(
+            "sale",
+            invoice_id=db_obj.id,
+            payment_method=obj_in.payment_method,
+            sell_date=sell_date,
+            total=sum(row["total_price"] for row in rows),
+            units=sum(row["quantity"] for row in rows),
+            sale_ids=session.exec(select(Sale.id).where(Sale.invoice_id == db_obj.id)).all()
+        ))
+        if commit:
+            session.commit()
+            session.refresh(db_obj)
+        else:
+            session.flush()
+
+        sales = session.exec(
+            select(Sale).where(Sale.invoice_id == db_obj.id).order_by(Sale.id)
+        ).all()
+        return db_obj, sales
+
+    def sync_batch(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        invoices: List[SyncInvoice],
+        chunk_size: int = 100
+    ) -> List[SyncInvoiceResult]:
+        """
+        Ingresa facturas registradas fuera de línea, en transacciones de
+        `chunk_size` facturas. Devuelve un resultado por factura, en el mismo orden.
+        """
+        pending: Dict[str, SyncInvoice] = {}
+        for invoice in invoices:
+            pending.setdefault(str(invoice.client_uuid), invoice)
+        pending_list = list(pending.values())
+
+        results: Dict[str, SyncInvoiceResult] = {}
+        for start in range(0, len(pending_list), chunk_size):
+            chunk = pending_list[start:start + chunk_size]
+            try:
+                results.update(self._sync_chunk(session, enterprise_id=enterprise_id, invoices=chunk))
+            except IntegrityError:
+                # Otra petición ingresó alguno de los UUID en paralelo: se repite
+                # el bloque y esos UUID ahora se reportan como duplicados
+                session.rollback()
+                results.update(self._sync_chunk(session, enterprise_id=enterprise_id, invoices=chunk))
+
+        # Un UUID repetido dentro del mismo lote es un duplicado de su primera aparición
+        output = []
+        reported = set()
+        for invoice in invoices:
+            client_uuid = str(invoice.client_uuid)
+            result = results[client_uuid]
+            if client_uuid in reported:
+                result = SyncInvoiceResult(
+                    client_uuid=invoice.client_uuid,
+                    status=SyncStatus.DUPLICATE,
+                    invoice_id=result.invoice_id
+                )
+            reported.add(client_uuid)
+            output.append(result)
+        return output
+
+    def _sync_chunk(
+        self, session: Session, *, enterprise_id: int, invoices: List[SyncInvoice]
+    ) -> Dict[str, SyncInvoiceResult]:
+        results: Dict[str, SyncInvoiceResult] = {}
+        existing = dict(session.exec(
+            select(Invoice.client_uuid, Invoice.id).where(
+                Invoice.enterprise_id == enterprise_id,
+                Invoice.client_uuid.in_([str(i.client_uuid) for i in invoices])
+            )
+        ).all())
+        for invoice in invoices:
+            if str(invoice.client_uuid) in existing:
+                results[str(invoice.client_uuid)] = SyncInvoiceResult(
+                    client_uuid=invoice.client_uuid,
+                    status=SyncStatus.DUPLICATE,
+                    invoice_id=existing[str(invoice.client_uuid)]
+                )
+        new_invoices = [i for i in invoices if str(i.client_uuid) not in existing]
+        if not new_invoices:
+            return results
+
+        # Las filas quedan bloqueadas hasta el commit: el stock validado no cambia antes del UPDATE
+        products = {
+            p.id: p for p in product_crud.get_many(
+                session=session,
+                enterprise_id=enterprise_id,
+                ids=[line.product_id for invoice in new_invoices for line in invoice.lines],
+                for_update=True
+            )
+        }
+        available = {product_id: p.stock for product_id, p in products.items()}
+
+        accepted = []
+        for invoice in new_invoices:
+            conflict = self._sync_conflict(invoice, products, available)
+            if conflict:
+                results[str(invoice.client_uuid)] = SyncInvoiceResult(
+                    client_uuid=invoice.client_uuid,
+                    status=SyncStatus.CONFLICT,
+                    detail=conflict
+                )
+                continue
+            for line in invoice.lines:
+                available[line.product_id] -= line.quantity
+            accepted.append(invoice)
+
+        if not accepted:
+            session.rollback()
+            return results
+
+        session.exec(insert(Invoice), params=[
+            {
+                "payment_method": invoice.payment_method,
+                "total_price": invoice.total_price,
+                "enterprise_id": enterprise_id,
+                "client_uuid": str(invoice.client_uuid),
+                "created_at": invoice.sold_at,
+            }
+            for invoice in accepted
+        ])
+        invoice_ids = dict(session.exec(
+            select(Invoice.client_uuid, Invoice.id).where(
+                Invoice.enterprise_id == enterprise_id,
+                Invoice.client_uuid.in_([str(i.client_uuid) for i in accepted])
+            )
+        ).all())
+
+        rows = [
+            {
+                "quantity": line.quantity,
+                "discount": line.discount,
+                "price": line.price,
+                "sell_date": invoice.sold_at.date(),
+                "total_price": line.total_price,
+                "invoice_id": invoice_ids[str(invoice.client_uuid)],
+                "client_id": invoice.client_id,
+                "product_id": line.product_id,
+                "enterprise_id": enterprise_id,
+                "unit_cost": products[line.product_id].supplier_price,
+            }
+            for invoice in accepted
+            for line in invoice.lines
+        ]
+        session.exec(insert(Sale), params=rows)
+
+        quantities = Counter()
+        for row in rows:
+            quantities[row["product_id"]] -= row["quantity"]
+        product_crud.adjust_stock(session=session, deltas=quantities)
+        new_sales = [Sale(**row) for row in rows]
+        sales_rollup.apply_sales(session, sales=new_sales, products=products)
+        client_summary.apply_sales(session, sales=new_sales)
+        sale_ids: Dict[int, List[int]] = {}
+        for invoice_id, sale_id in session.exec(
+            select(Sale.invoice_id, Sale.id).where(Sale.invoice_id.in_(list(invoice_ids.values())))
+        ).all():
+            sale_ids.setdefault(invoice_id, []).append(sale_id)
+        for invoice in accepted:
+            invoice_id = invoice_ids[str(invoice.client_uuid)]
+            live_sales.track(session, enterprise_id, live_sales.sale_event(
+                "sale",
+                invoice_id=invoice_id,
+                payment_method=invoice.payment_method,
+                sell_date=invoice.sold_at.date(),
+                total=sum(line.total_price for line in invoice.lines),
+                units=sum(line.quantity for line in invoice.lines),
+                sale_ids=sale_ids.get(invoice_id, [])
+            ))
+        session.commit()
+
+        for invoice in accepted:
+            results[str(invoice.client_uuid)] = SyncInvoiceResult(
+                client_uuid=invoice.client_uuid,
+                status=SyncStatus.ACCEPTED,
+                invoice_id=invoice_ids[str(invoice.client_uuid)]
+            )
+        return results
+
+    def _sync_conflict(
+        self,
+        invoice: SyncInvoice,
+        products: Dict[int, Product],
+        available: Dict[int, int]
+    ) -> Optional[str]:
+        """
+        Motivo por el que la factura no se puede ingresar, o None si es válida.
+        `available` es el stock que queda tras las facturas ya aceptadas del bloque.
+        """
+        missing = sorted({l.product_id for l in invoice.lines} - products.keys())
+        if missing:
+            return f"Productos no encontrados: {', '.join(map(str, missing))}"
+        inactive = [
+            products[l.product_id].name for l in invoice.lines
+            if products[l.product_id].status == ProductStatus.INACTIVE
+        ]
+        if inactive:
+            return f"Productos inactivos: {', '.join(inactive)}"
+        for line in invoice.lines:
+            if abs(line.price * line.quantity - line.discount - line.total_price) > 0.01:
+                return f"Total inválido en la línea del producto {line.product_id}"
+        if abs(sum(l.total_price for l in invoice.lines) - invoice.total_price) > 0.01:
+            return "El total de la factura no coincide con sus líneas"
+
+        required = Counter()
+        for line in invoice.lines:
+            required[line.product_id] += line.quantity
+        insufficient = sorted(
+            product_id for product_id, quantity in required.items()
+            if available[product_id] < quantity
+        )
+        if insufficient:
+            return f"Stock insuficiente para los productos: {', '.join(map(str, insufficient))}"
+        return None
+
+    def void(
+        self,
+        session: Session,
+        *,
+        invoice_id: int,
+        employee_id: int,
+        reason: Optional[str] = None
+    ) -> InvoiceVoid:
+        """
+        Anula la factura en una sola transacción: devuelve el stock de todas sus
+        líneas con un único UPDATE agrupado, descuenta las ventas de los reportes,
+        elimina las ventas y deja un registro de auditoría con su copia.
+        Lanza InvoiceAlreadyVoidedError si ya estaba anulada.
+        """
+        # El bloqueo de la factura evita que dos anulaciones simultáneas devuelvan el stock dos veces.
+        # populate_existing: la factura suele estar ya en la sesión (el router la leyó antes
+        # del bloqueo) y sin él se usaría esa copia, sin el voided_at de la otra anulación
+        invoice = session.exec(
+            select(Invoice)
+            .where(Invoice.id == invoice_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).one()
+        if invoice.voided_at is not None:
+            session.rollback()
+            raise InvoiceAlreadyVoidedError(invoice_id)
+
+        sales = session.exec(
+            select(Sale).where(Sale.invoice_id == invoice_id).order_by(Sale.id)
+        ).all()
+        snapshot = [
+            {
+                "sale_id": sale.id,
+                "product_id": sale.product_id,
+                "client_id": sale.client_id,
+                "quantity": sale.quantity,
+                "price": sale.price,
+                "discount": sale.discount,
+                "total_price": sale.total_price,
+                "unit_cost": sale.unit_cost,
+                "sell_date": sale.sell_date.isoformat(),
+            }
+            for sale in sales
+        ]
+
+        # Suma relativa (stock = stock + n): segura frente a ventas concurrentes
+        quantities = Counter()
+        for sale in sales:
+            if sale.product_id is not None:
+                quantities[sale.product_id] += sale.quantity
+        products = {
+            p.id: p for p in product_crud.adjust_stock(session=session, deltas=quantities)
+        }
+        sales_rollup.apply_sales(
+            session,
+            sales=[sale for sale in sales if sale.product_id in products],
+            products=products,
+            sign=-1
+        )
+        session.exec(delete(Sale).where(Sale.invoice_id == invoice_id))
+        client_summary.apply_sales(session, sales=sales, sign=-1)
+
+        voided_at = datetime.utcnow()
+        invoice.voided_at = voided_at
+        session.add(invoice)
+        audit = InvoiceVoid(
+            invoice_id=invoice_id,
+            enterprise_id=invoice.enterprise_id,
+            employee_id=employee_id,
+            reason=reason,
+            line_count=len(sales),
+            units=sum(sale.quantity for sale in sales),
+            total_price=invoice.total_price,
+            lines=json.dumps(snapshot),
+            voided_at=voided_at
+        )
+        session.add(audit)
+        # Las ventas anuladas se restan del día en que se vendieron
+        by_date: Dict[date, List[Sale]] = {}
+        for sale in sales:
+            by_date.setdefault(sale.sell_date, []).append(sale)
+        for sell_date, day_sales in by_date.items():
+            live_sales.track(session, invoice.enterprise_id, live_sales.sale_event(
+                "void",
+                invoice_id=invoice_id,
+                payment_method=invoice.payment_method,
+                sell_date=sell_date,
+                total=-sum(sale.total_price for sale in day_sales),
+                units=-sum(sale.quantity for sale in day_sales),
+                sale_ids=[sale.id for sale in day_sales]
+            ))
+        session.commit()
+        session.refresh(audit)
+        return audit
+
+    def backfill(self, session: Session) -> int:
+        """
+        Completa enterprise_id y created_at de las facturas anteriores a esas columnas
+        a partir de sus ventas (empresa del producto y sell_date).
+        """
+        enterprise_id = (
+            select(Product.enterprise_id)
+            .join(Sale, Sale.product_id == Product.id)
+            .where(Sale.invoice_id == Invoice.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        created_at = (
+            select(func.min(Sale.sell_date))
+            .where(Sale.invoice_id == Invoice.id)
+            .scalar_subquery()
+        )
+        has_sales = select(Sale.id).where(Sale.invoice_id == Invoice.id).exists()
+        result = session.exec(
+            update(Invoice)
+            .where(Invoice.enterprise_id.is_(None), has_sales)
+            .values(enterprise_id=enterprise_id, created_at=created_at)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount
 
 invoice = CRUDInvoice(Invoice)
\ No newline at end of file
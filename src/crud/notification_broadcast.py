@@ -0,0 +1,167 @@
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select, update
+
+from src.models.employee import Employee
+from src.models.notification_broadcast import (
+    BroadcastStatus,
+    BroadcastTarget,
+    NotificationBroadcast,
+    NotificationBroadcastCreate,
+)
+from src.models.notification_token import NotificationToken
+from src.models.permission import Permission
+from src.models.permission_has_role import PermissionHasRole
+from .notification_token import healthy_condition
+
+
+def create(
+    session: Session, *, obj_in: NotificationBroadcastCreate, enterprise_id: int, created_by: int
+) -> NotificationBroadcast:
+    db_obj = NotificationBroadcast(
+        enterprise_id=enterprise_id,
+        created_by=created_by,
+        target=obj_in.target,
+        role_id=obj_in.role_id if obj_in.target == BroadcastTarget.ROLE else None,
+        permission_name=(
+            obj_in.permission_name if obj_in.target == BroadcastTarget.PERMISSION else None
+        ),
+        title=obj_in.title,
+        message=obj_in.message,
+        data=json.dumps(obj_in.data) if obj_in.data is not None else None,
+    )
+    session.add(db_obj)
+    session.commit()
+    session.refresh(db_obj)
+    return db_obj
+
+
+def get(session: Session, *, id: int, enterprise_id: int) -> Optional[NotificationBroadcast]:
+    return session.exec(
+        select(NotificationBroadcast).where(
+            NotificationBroadcast.id == id,
+            NotificationBroadcast.enterprise_id == enterprise_id,
+        )
+    ).first()
+
+
+def get_by_enterprise(
+    session: Session, *, enterprise_id: int, skip: int = 0, limit: int = 100
+) -> List[NotificationBroadcast]:
+    return session.exec(
+        select(NotificationBroadcast)
+        .where(NotificationBroadcast.enterprise_id == enterprise_id)
+        .order_by(NotificationBroadcast.id.desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+
+
+def resolve_tokens(session: Session, *, broadcast: NotificationBroadcast) -> List[Tuple[int, str]]:
+    """
+    Tokens activos de los empleados activos alcanzados por el envío, en una
+    sola consulta con los joins del objetivo. Omite los dispositivos con
+    fallos recurrentes.
+    """
+    statement = (
+        select(NotificationToken.id, NotificationToken.token)
+        .join(Employee, Employee.id == NotificationToken.user_id)
+        .where(
+            Employee.enterprise_id == broadcast.enterprise_id,
+            Employee.is_active == True,
+            NotificationToken.active == True,
+            healthy_condition(),
+        )
+    )
+    if broadcast.target == BroadcastTarget.ROLE:
+        statement = statement.where(Employee.role_id == broadcast.role_id)
+    elif broadcast.target == BroadcastTarget.PERMISSION:
+        statement = (
+            statement
+            .join(PermissionHasRole, PermissionHasRole.role_id == Employee.role_id)
+            .join(Permission, Permission.id == PermissionHasRole.permission_id)
+            .where(Permission.name == broadcast.permission_name)
+        )
+    return session.exec(statement.order_by(NotificationToken.id)).all()
+
+
+def mark_running(session: Session, *, id: int, total: int) -> bool:
+    """
+    Toma el envío con un UPDATE condicional: devuelve False si otro proceso
+    ya lo inició.
+    """
+    now = datetime.utcnow()
+    result = session.exec(
+        update(NotificationBroadcast)
+        .where(NotificationBroadcast.id == id, NotificationBroadcast.status == BroadcastStatus.PENDING)
+        .values(status=BroadcastStatus.RUNNING, total=total, started_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def get_pending_ids(session: Session) -> List[int]:
+    return session.exec(
+        select(NotificationBroadcast.id)
+        .where(NotificationBroadcast.status == BroadcastStatus.PENDING)
+        .order_by(NotificationBroadcast.id)
+    ).all()
+
+
+def fail_stale(session: Session, *, updated_before: datetime, error: str) -> int:
+    """
+    Marca como FAILED los envíos en curso sin avances desde `updated_before`
+    (el proceso que los ejecutaba se detuvo).
+    """
+    result = session.exec(
+        update(NotificationBroadcast)
+        .where(
+            NotificationBroadcast.status == BroadcastStatus.RUNNING,
+            func.coalesce(NotificationBroadcast.updated_at, NotificationBroadcast.started_at)
+            < updated_before,
+        )
+        .values(status=BroadcastStatus.FAILED, error=error, finished_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return result.rowcount
+
+
+def add_progress(
+    session: Session, *, id: int, sent: int = 0, failed: int = 0, deactivated: int = 0
+) -> None:
+    """
+    Suma el resultado de un lote a los contadores con un UPDATE atómico.
+    """
+    session.exec(
+        update(NotificationBroadcast)
+        .where(NotificationBroadcast.id == id)
+        .values(
+            sent=NotificationBroadcast.sent + sent,
+            failed=NotificationBroadcast.failed + failed,
+            deactivated=NotificationBroadcast.deactivated + deactivated,
+            updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+
+
+def finish(
+    session: Session, *, id: int, status: BroadcastStatus, error: Optional[str] = None
+) -> None:
+    session.exec(
+        update(NotificationBroadcast)
+        .where(NotificationBroadcast.id == id)
+        .values(
+            status=status,
+            error=error[:500] if error else None,
+            finished_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
@@ -0,0 +1,149 @@
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, select, update
+
+from src.config.settings import settings
+from src.models.employee import Employee
+from src.models.notification_outbox import (
+    NotificationOutbox,
+    OutboxStatus,
+    OutboxStatusCount,
+)
+from src.utils import notification_outbox as outbox_signal
+
+
+def backoff_seconds(attempts: int) -> int:
+    """
+    Espera antes del siguiente intento: crece al doble en cada fallo hasta el máximo.
+    """
+    delay = settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.NOTIFICATION_RETRY_MAX_SECONDS)
+
+
+def enqueue(
+    session: Session,
+    *,
+    user_ids: List[int],
+    title: str,
+    message: str,
+    data: Optional[dict] = None
+) -> int:
+    """
+    Encola una notificación por usuario con un único INSERT. No hace commit:
+    la notificación se confirma junto con la transacción que la origina y el
+    worker se despierta tras el commit.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return 0
+    now = datetime.utcnow()
+    payload = json.dumps(data) if data is not None else None
+    session.exec(
+        insert(NotificationOutbox.__table__),
+        params=[
+            {
+                "user_id": user_id,
+                "title": title,
+                "message": message,
+                "data": payload,
+                "status": OutboxStatus.PENDING,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for user_id in user_ids
+        ],
+    )
+    outbox_signal.track(session)
+    return len(user_ids)
+
+
+def claim(session: Session, *, limit: int, lease_seconds: int) -> List[NotificationOutbox]:
+    """
+    Reserva hasta `limit` notificaciones vencidas para este worker y hace commit.
+
+    Las filas bloqueadas por otro worker se saltan (SKIP LOCKED). Una reserva
+    cuyo plazo venció sin respuesta (worker caído) vuelve a estar disponible.
+    """
+    now = datetime.utcnow()
+    messages = session.exec(
+        select(NotificationOutbox)
+        .where(
+            NotificationOutbox.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING]),
+            NotificationOutbox.next_attempt_at <= now,
+        )
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    for outbox_message in messages:
+        outbox_message.status = OutboxStatus.SENDING
+        outbox_message.attempts += 1
+        outbox_message.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        session.add(outbox_message)
+    session.commit()
+    return messages
+
+
+def mark_sent(session: Session, *, ids: List[int]) -> None:
+    """
+    Marca como enviadas las notificaciones con un único UPDATE. No hace commit.
+    """
+    if not ids:
+        return
+    session.exec(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids))
+        .values(status=OutboxStatus.SENT, sent_at=datetime.utcnow(), last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_failed(
+    session: Session,
+    *,
+    outbox_message: NotificationOutbox,
+    error: str,
+    token_ids: Optional[List[int]] = None
+) -> OutboxStatus:
+    """
+    Programa el reintento con backoff exponencial o, agotados los intentos,
+    deja la notificación en DEAD. Si se indican `token_ids`, el reintento se
+    envía solo a esos dispositivos. No hace commit.
+    """
+    if token_ids is not None:
+        outbox_message.token_ids = json.dumps(sorted(token_ids))
+    if outbox_message.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+        outbox_message.status = OutboxStatus.DEAD
+    else:
+        outbox_message.status = OutboxStatus.PENDING
+        outbox_message.next_attempt_at = datetime.utcnow() + timedelta(
+            seconds=backoff_seconds(outbox_message.attempts)
+        )
+    outbox_message.last_error = error[:500]
+    session.add(outbox_message)
+    return outbox_message.status
+
+
+def get_counts(
+    session: Session, *, enterprise_id: int
+) -> Tuple[List[OutboxStatusCount], Optional[datetime]]:
+    """
+    Cantidad de notificaciones por estado de la empresa y fecha de la pendiente más antigua.
+    """
+    rows = session.exec(
+        select(
+            NotificationOutbox.status,
+            func.count(NotificationOutbox.id),
+            func.min(NotificationOutbox.created_at),
+        )
+        .join(Employee, Employee.id == NotificationOutbox.user_id)
+        .where(Employee.enterprise_id == enterprise_id)
+        .group_by(NotificationOutbox.status)
+    ).all()
+    counts = [OutboxStatusCount(status=status, count=count) for status, count, _ in rows]
+    pending = [oldest for status, _, oldest in rows if status == OutboxStatus.PENDING]
+    return counts, pending[0] if pending else None
@@ -1,13 +1,54 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
-from sqlmodel import Session, select
+from sqlalchemy import and_, delete as sql_delete, func, insert, inspect, or_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select, update as sql_update
 
+from src.config.settings import settings
 from src.models.notification_token import (
+    NotificationTicket,
     NotificationToken,
     NotificationTokenCreate,
     NotificationTokenUpdate,
 )
+from src.utils.token_registry import TokenEntry, get_registry
+
+MYSQL_DEADLOCK = 1213
+UPSERT_ATTEMPTS = 3
+
+
+def _entry(token: NotificationToken) -> TokenEntry:
+    return TokenEntry(
+        id=token.id,
+        token=token.token,
+        user_id=token.user_id,
+        device_name=token.device_name,
+        failure_count=token.failure_count,
+        last_failure_at=token.last_failure_at,
+    )
+
+
+def _sync_registry(token: NotificationToken) -> None:
+    # Refleja en el registro en memoria un token recién confirmado
+    if token.active:
+        get_registry().put(_entry(token))
+    else:
+        get_registry().discard([token.id])
+
+
+def healthy_condition():
+    """
+    Condición SQL que excluye los dispositivos con demasiados fallos seguidos.
+    Pasado NOTIFICATION_TOKEN_RETRY_HOURS desde el último fallo se vuelven a intentar.
+    """
+    retry_after = datetime.utcnow() - timedelta(hours=settings.NOTIFICATION_TOKEN_RETRY_HOURS)
+    return or_(
+        NotificationToken.failure_count < settings.NOTIFICATION_TOKEN_MAX_FAILURES,
+        NotificationToken.last_failure_at < retry_after,
+    )
 
 
 def get_by_id(db: Session, token_id: int) -> Optional[NotificationToken]:
@@ -39,50 +80,67 @@ def get_by_user_id(db: Session, user_id: int, active_only: bool = True) -> List[
 
 def create(db: Session, obj_in: NotificationTokenCreate) -> NotificationToken:
     """
-    Crea un nuevo token de notificación. Si el token ya existe, lo actualiza a activo.
+    Registra un token de notificación con un único INSERT ... ON DUPLICATE KEY
+    UPDATE sobre el índice único de `token`: si ya existe se reactiva y pasa al
+    usuario indicado, sin carreras entre registros simultáneos del mismo token.
     """
-    # Verificar si el token ya existe
-    existing_token = get_by_token(db, obj_in.token)
-    
-    if existing_token:
-        # Si existe pero pertenece a otro usuario, crear uno nuevo
-        if existing_token.user_id != obj_in.user_id:
-            # Desactivar el existente
-            existing_token.active = False
-            existing_token.updated_at = datetime.utcnow()
-            db.add(existing_token)
-            
-            # Crear uno nuevo
-            db_obj = NotificationToken(
-                token=obj_in.token,
-                device_name=obj_in.device_name,
-                user_id=obj_in.user_id,
-                active=True,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            db.add(db_obj)
-        else:
-            # Si pertenece al mismo usuario, actualizarlo
-            existing_token.active = True
-            existing_token.device_name = obj_in.device_name
-            existing_token.updated_at = datetime.utcnow()
-            db.add(existing_token)
-            db_obj = existing_token
-    else:
-        # Si no existe, crear uno nuevo
-        db_obj = NotificationToken(
-            token=obj_in.token,
-            device_name=obj_in.device_name,
-            user_id=obj_in.user_id,
-            active=True,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        db.add(db_obj)
-    
-    db.commit()
-    db.refresh(db_obj)
+    # Caso habitual: la app vuelve a registrar el mismo token activo al abrirse
+    registered = get_registry().owner_of(obj_in.token)
+    if (
+        registered
+        and registered.user_id == obj_in.user_id
+        and registered.device_name == obj_in.device_name
+    ):
+        # El registro puede estar desactualizado (otro proceso reasignó el token):
+        # se confirma contra la fila antes de omitir la escritura
+        db_obj = get_by_id(db, registered.id)
+        if (
+            db_obj
+            and db_obj.active
+            and db_obj.token == obj_in.token
+            and db_obj.user_id == obj_in.user_id
+            and db_obj.device_name == obj_in.device_name
+        ):
+            return db_obj
+
+    now = datetime.utcnow()
+    table = NotificationToken.__table__
+    statement = mysql_insert(table).values(
+        token=obj_in.token,
+        device_name=obj_in.device_name,
+        user_id=obj_in.user_id,
+        active=True,
+        failure_count=0,
+        created_at=now,
+        updated_at=now,
+    )
+    # Un registro nuevo indica que el dispositivo está vivo: se reinicia su salud
+    statement = statement.on_duplicate_key_update(
+        user_id=statement.inserted.user_id,
+        device_name=statement.inserted.device_name,
+        active=True,
+        failure_count=0,
+        last_error=None,
+        updated_at=statement.inserted.updated_at,
+    )
+    for attempt in range(UPSERT_ATTEMPTS):
+        try:
+            db.exec(statement)
+            db.commit()
+            break
+        except OperationalError as exc:
+            # InnoDB puede elegir como víctima de un deadlock a uno de varios
+            # upserts simultáneos del mismo token: se repite la sentencia
+            db.rollback()
+            if exc.orig.args[0] != MYSQL_DEADLOCK or attempt == UPSERT_ATTEMPTS - 1:
+                raise
+
+    db_obj = db.exec(
+        select(NotificationToken)
+        .where(NotificationToken.token == obj_in.token)
+        .execution_options(populate_existing=True)
+    ).one()
+    _sync_registry(db_obj)
     return db_obj
 
 
@@ -101,19 +159,17 @@ def update(db: Session, db_obj: NotificationToken, obj_in: NotificationTokenUpda
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    _sync_registry(db_obj)
     return db_obj
 
 
 def delete(db: Session, token_id: int) -> bool:
     """
-    Elimina un token de notificación.
+    Elimina un token de notificación. La fila queda inactiva en lugar de
+    borrarse para que los registros de los demás procesos vean el cambio;
+    purge_inactive la elimina después.
     """
-    db_obj = get_by_id(db, token_id)
-    if db_obj:
-        db.delete(db_obj)
-        db.commit()
-        return True
-    return False
+    return deactivate(db, token_id) is not None
 
 
 def deactivate(db: Session, token_id: int) -> Optional[NotificationToken]:
@@ -127,23 +183,172 @@ def deactivate(db: Session, token_id: int) -> Optional[NotificationToken]:
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        get_registry().discard([token_id])
         return db_obj
     return None
 
 
+def deactivate_many(db: Session, token_ids: List[int]) -> int:
+    """
+    Desactiva varios tokens con un único UPDATE.
+    """
+    if not token_ids:
+        return 0
+    result = db.exec(
+        sql_update(NotificationToken)
+        .where(NotificationToken.id.in_(token_ids))
+        .values(active=False, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    get_registry().discard(token_ids)
+    return result.rowcount
+
+
+def record_health(
+    db: Session, *, successful_ids: List[int] = (), failures: Dict[int, str] = None
+) -> None:
+    """
+    Registra entregas exitosas (reinician el conteo de fallos) y fallidas.
+    Un UPDATE para los éxitos y uno por cada mensaje de error distinto.
+    """
+    now = datetime.utcnow()
+    if successful_ids:
+        db.exec(
+            sql_update(NotificationToken)
+            .where(NotificationToken.id.in_(successful_ids))
+            .values(failure_count=0, last_success_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    by_error: Dict[str, List[int]] = {}
+    for token_id, error in (failures or {}).items():
+        by_error.setdefault(error[:255], []).append(token_id)
+    for error, token_ids in by_error.items():
+        db.exec(
+            sql_update(NotificationToken)
+            .where(NotificationToken.id.in_(token_ids))
+            .values(
+                failure_count=NotificationToken.failure_count + 1,
+                last_failure_at=now,
+                last_error=error,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if successful_ids or by_error:
+        db.commit()
+        get_registry().record_health(
+            successful_ids=successful_ids, failed_ids=list(failures or ()), now=now
+        )
+
+
+def save_tickets(db: Session, tickets: List[Tuple[int, str]]) -> None:
+    """
+    Guarda los tickets `(token_id, ticket_id)` para consultar su recibo más tarde.
+    """
+    if not tickets:
+        return
+    now = datetime.utcnow()
+    db.exec(
+        insert(NotificationTicket.__table__),
+        params=[
+            {"token_id": token_id, "ticket_id": ticket_id, "created_at": now}
+            for token_id, ticket_id in tickets
+        ],
+    )
+    db.commit()
+
+
+def claim_due_tickets(
+    db: Session, *, sent_before: datetime, after_id: int = 0, limit: int = 1000
+) -> List[NotificationTicket]:
+    """
+    Tickets enviados antes de `sent_before`, en orden de id a partir de `after_id`.
+
+    Quedan bloqueados hasta el commit y las filas que ya tiene otro proceso se
+    saltan (SKIP LOCKED): cada recibo se concilia una sola vez aunque el
+    worker corra en todos los procesos del API.
+    """
+    return db.exec(
+        select(NotificationTicket)
+        .where(NotificationTicket.id > after_id, NotificationTicket.created_at < sent_before)
+        .order_by(NotificationTicket.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+
+def delete_tickets(db: Session, ids: List[int]) -> None:
+    """
+    Elimina los tickets ya conciliados con un único DELETE. No hace commit.
+    """
+    if ids:
+        db.exec(sql_delete(NotificationTicket).where(NotificationTicket.id.in_(ids)))
+
+
 def deactivate_all_user_tokens(db: Session, user_id: int) -> int:
     """
-    Desactiva todos los tokens de un usuario.
+    Desactiva todos los tokens de un usuario con un único UPDATE.
     """
-    tokens = get_by_user_id(db, user_id)
-    count = 0
-    
-    for token in tokens:
-        if token.active:
-            token.active = False
-            token.updated_at = datetime.utcnow()
-            db.add(token)
-            count += 1
-    
+    result = db.exec(
+        sql_update(NotificationToken)
+        .where(NotificationToken.user_id == user_id, NotificationToken.active == True)
+        .values(active=False, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    get_registry().discard_user(user_id)
+    return result.rowcount
+
+
+def purge_inactive(db: Session, older_than_days: int) -> int:
+    """
+    Elimina los tokens inactivos sin cambios hace más de `older_than_days` días,
+    junto con sus tickets pendientes, con dos DELETE.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    stale = select(NotificationToken.id).where(
+        NotificationToken.active == False,
+        NotificationToken.updated_at < cutoff,
+    )
+    db.exec(sql_delete(NotificationTicket).where(NotificationTicket.token_id.in_(stale)))
+    result = db.exec(
+        sql_delete(NotificationToken)
+        .where(NotificationToken.active == False, NotificationToken.updated_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def remove_duplicates(db: Session) -> int:
+    """
+    Deja un solo registro por token (el activo o, si no hay, el más reciente)
+    para poder crear el índice único. Se ejecuta antes de sync_schema.
+    """
+    if not inspect(db.get_bind()).has_table(NotificationToken.__tablename__):
+        return 0
+    keep = aliased(NotificationToken)
+    # Solo los tokens repetidos: sin duplicados no se recorre la tabla con el self-join
+    duplicated = (
+        select(NotificationToken.token)
+        .group_by(NotificationToken.token)
+        .having(func.count() > 1)
+    )
+    duplicate_ids = db.exec(
+        select(NotificationToken.id)
+        .where(NotificationToken.token.in_(duplicated))
+        .join(keep, and_(
+            keep.token == NotificationToken.token,
+            or_(
+                keep.active > NotificationToken.active,
+                and_(keep.active == NotificationToken.active, keep.id > NotificationToken.id),
+            ),
+        ))
+        .distinct()
+    ).all()
+    if not duplicate_ids:
+        return 0
+    db.exec(sql_delete(NotificationTicket).where(NotificationTicket.token_id.in_(duplicate_ids)))
+    db.exec(sql_delete(NotificationToken).where(NotificationToken.id.in_(duplicate_ids)))
     db.commit()
-    return count 
\ No newline at end of file
+    return len(duplicate_ids)
@@ -1,26 +1,85 @@
-from typing import Optional, List
-from sqlmodel import Session, select
-from src.models.product import Product, ProductCreate, ProductUpdate
+from typing import Any, Dict, Optional, List, Union
+from sqlalchemy import and_, case, literal, or_
+from sqlmodel import Session, select, update
+from src.models.product import (
+    Product, ProductCreate, ProductUpdate, ProductStatus, ProductReorderRead
+)
+from src.utils import stock_alerts
 from .base import CRUDBase
+from . import category_stats
+
+
+def status_for_stock(status: ProductStatus, stock: int) -> ProductStatus:
+    """
+    Estado que corresponde al stock. Los productos inactivos no se modifican.
+    """
+    if status == ProductStatus.ACTIVE and stock <= 0:
+        return ProductStatus.OUT_OF_STOCK
+    if status == ProductStatus.OUT_OF_STOCK and stock > 0:
+        return ProductStatus.ACTIVE
+    return status
+
+
+def status_for_stock_expr(stock_expr):
+    """
+    Versión SQL de `status_for_stock` para usar dentro del mismo UPDATE del stock.
+    """
+    # Tipar los literales con la columna para que se guarden con el formato del Enum
+    status_type = Product.__table__.c.status.type
+    return case(
+        (
+            and_(Product.status == ProductStatus.ACTIVE, stock_expr <= 0),
+            literal(ProductStatus.OUT_OF_STOCK, status_type)
+        ),
+        (
+            and_(Product.status == ProductStatus.OUT_OF_STOCK, stock_expr > 0),
+            literal(ProductStatus.ACTIVE, status_type)
+        ),
+        else_=Product.status
+    )
+
+
+class InsufficientStockError(Exception):
+    def __init__(self, product_ids: List[int]):
+        self.product_ids = product_ids
+        super().__init__(f"Stock insuficiente para los productos: {product_ids}")
+
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
     def get_by_bar_code(self, session: Session, *, bar_code: str) -> Optional[Product]:
         return session.exec(select(Product).where(Product.bar_code == bar_code)).first()
 
+    def get_by_enterprise(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        status: Optional[ProductStatus] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Product]:
+        statement = select(Product).where(Product.enterprise_id == enterprise_id)
+        if status:
+            statement = statement.where(Product.status == status)
+        return session.exec(statement.offset(skip).limit(limit)).all()
+
     def get_by_category(
         self, 
         session: Session, 
         *, 
         category_id: int,
         enterprise_id: int,
+        status: Optional[ProductStatus] = None,
         skip: int = 0, 
         limit: int = 100
     ) -> List[Product]:
         statement = select(Product).where(
             Product.category_id == category_id,
             Product.enterprise_id == enterprise_id
-        ).offset(skip).limit(limit)
-        return session.exec(statement).all()
+        )
+        if status:
+            statement = statement.where(Product.status == status)
+        return session.exec(statement.offset(skip).limit(limit)).all()
 
     def get_by_supplier(
         self, 
@@ -28,15 +87,50 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         *, 
         supplier_id: int,
         enterprise_id: int,
+        after_id: Optional[int] = None,
         skip: int = 0, 
         limit: int = 100
     ) -> List[Product]:
+        # Paginación por cursor sobre el índice (enterprise_id, supplier_id)
         statement = select(Product).where(
             Product.supplier_id == supplier_id,
             Product.enterprise_id == enterprise_id
-        ).offset(skip).limit(limit)
+        )
+        if after_id is not None:
+            statement = statement.where(Product.id > after_id)
+        statement = statement.order_by(Product.id).offset(skip).limit(limit)
         return session.exec(statement).all()
 
+    def get_reorder_by_supplier(
+        self,
+        session: Session,
+        *,
+        supplier_id: int,
+        enterprise_id: int,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[ProductReorderRead]:
+        """
+        Productos activos del proveedor por debajo del stock mínimo, calculado en SQL.
+        """
+        shortfall = (Product.minimal_safe_stock - Product.stock).label("shortfall")
+        rows = session.exec(
+            select(Product, shortfall)
+            .where(
+                Product.supplier_id == supplier_id,
+                Product.enterprise_id == enterprise_id,
+                Product.status != ProductStatus.INACTIVE,
+                Product.stock < Product.minimal_safe_stock
+            )
+            .order_by(shortfall.desc(), Product.id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        return [
+            ProductReorderRead(**product.model_dump(), shortfall=shortfall)
+            for product, shortfall in rows
+        ]
+
     def get_by_bar_code_and_enterprise(
         self, 
         session: Session, 
@@ -51,4 +145,165 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
             )
         ).first()
 
-product = CRUDProduct(Product)
\ No newline at end of file
+    def get_many(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        ids: List[int] = (),
+        bar_codes: List[str] = (),
+        for_update: bool = False
+    ) -> List[Product]:
+        """
+        Resuelve varios productos por id o código de barras en una sola consulta IN.
+        Con `for_update` bloquea las filas hasta el fin de la transacción.
+        """
+        conditions = []
+        if ids:
+            conditions.append(Product.id.in_(set(ids)))
+        if bar_codes:
+            conditions.append(Product.bar_code.in_(set(bar_codes)))
+        if not conditions:
+            return []
+        statement = select(Product).where(
+            Product.enterprise_id == enterprise_id,
+            or_(*conditions)
+        )
+        if for_update:
+            statement = statement.with_for_update()
+        return session.exec(statement).all()
+
+    def create(self, session: Session, *, obj_in: ProductCreate) -> Product:
+        obj_in.status = status_for_stock(obj_in.status, obj_in.stock)
+        # Los agregados se confirman en el mismo commit que el producto
+        category_stats.apply_deltas(session, [category_stats.product_delta(obj_in)])
+        return super().create(session=session, obj_in=obj_in)
+
+    def update(
+        self,
+        session: Session,
+        *,
+        db_obj: Product,
+        obj_in: Union[ProductUpdate, Dict[str, Any]]
+    ) -> Product:
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        update_data["status"] = status_for_stock(
+            update_data.get("status", db_obj.status),
+            update_data.get("stock", db_obj.stock)
+        )
+        category_stats.apply_deltas(session, [
+            category_stats.product_delta(db_obj, sign=-1),
+            category_stats.product_delta(db_obj, **update_data),
+        ])
+        return super().update(session=session, db_obj=db_obj, obj_in=update_data)
+
+    def remove(self, session: Session, *, id: int) -> Product:
+        product = self.get(session=session, id=id)
+        category_stats.apply_deltas(session, [category_stats.product_delta(product, sign=-1)])
+        return super().remove(session=session, id=id)
+
+    def update_stock(
+        self,
+        session: Session,
+        *,
+        product_id: int,
+        quantity: int
+    ) -> Optional[Product]:
+        """
+        Suma `quantity` al stock de un producto (negativo para descontar).
+        No hace commit: el llamador confirma junto con la venta.
+        """
+        products = self.adjust_stock(session=session, deltas={product_id: quantity})
+        return products[0] if products else None
+
+    def adjust_stock(
+        self,
+        session: Session,
+        *,
+        deltas: Dict[int, int]
+    ) -> List[Product]:
+        """
+        Aplica los deltas de stock `{product_id: cantidad}` con un único UPDATE
+        condicional que también mantiene el estado OUT_OF_STOCK en la misma sentencia.
+
+        Si algún descuento dejaría un stock negativo se revierte la transacción
+        completa y se lanza InsufficientStockError. No hace commit.
+        """
+        deltas = {product_id: quantity for product_id, quantity in deltas.items() if quantity}
+        if not deltas:
+            return []
+
+        delta = case(deltas, value=Product.id, else_=0)
+        new_stock = Product.stock + delta
+        result = session.exec(
+            update(Product)
+            .where(Product.id.in_(deltas), or_(delta > 0, new_stock >= 0))
+            # El estado se asigna primero: MySQL evalúa el SET de izquierda a derecha
+            .ordered_values(
+                (Product.status, status_for_stock_expr(new_stock)),
+                (Product.stock, new_stock)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(deltas):
+            session.rollback()
+            raise InsufficientStockError(self._insufficient(session, deltas))
+
+        products = session.exec(
+            select(Product)
+            .where(Product.id.in_(deltas))
+            .execution_options(populate_existing=True)
+        ).all()
+
+        stats_deltas = []
+        for product in products:
+            quantity = deltas[product.id]
+            previous_stock = product.stock - quantity
+
+            # Un cambio de estado en el mismo UPDATE también mueve el conteo de activos
+            active_delta = 0
+            if product.status == ProductStatus.OUT_OF_STOCK and previous_stock > 0:
+                active_delta = -1
+            elif product.status == ProductStatus.ACTIVE and previous_stock <= 0:
+                active_delta = 1
+            stats_deltas.append(category_stats.stock_delta(product, quantity, active_delta))
+
+            # Alertar solo cuando el descuento cruza el stock mínimo, no en cada venta
+            if quantity < 0 and product.stock < product.minimal_safe_stock <= previous_stock:
+                stock_alerts.track(session, product)
+
+        category_stats.apply_deltas(session, stats_deltas)
+        return products
+
+    def _insufficient(self, session: Session, deltas: Dict[int, int]) -> List[int]:
+        # Tras el rollback el stock vuelve a su valor previo y se puede comparar
+        stocks = dict(session.exec(
+            select(Product.id, Product.stock).where(Product.id.in_(deltas))
+        ).all())
+        return [
+            product_id for product_id, quantity in deltas.items()
+            if product_id not in stocks or stocks[product_id] + quantity < 0
+        ]
+
+    def reconcile_status(self, session: Session) -> int:
+        """
+        Sincroniza el estado de todos los productos con su stock actual.
+        """
+        result = session.exec(
+            update(Product)
+            .where(
+                or_(
+                    and_(Product.status == ProductStatus.ACTIVE, Product.stock <= 0),
+                    and_(Product.status == ProductStatus.OUT_OF_STOCK, Product.stock > 0)
+                )
+            )
+            .values(status=status_for_stock_expr(Product.stock))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount
+
+product = CRUDProduct(Product)
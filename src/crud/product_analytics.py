@@ -0,0 +1,174 @@
+import threading
+from datetime import date
+from typing import Dict, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+from sqlmodel import Session, select
+
+from src.config.settings import settings
+from src.models.product import Product
+from src.models.report import (
+    AbcClass,
+    ProductPerformanceReport,
+    ProductPerformanceRow,
+    SalesDailyProduct,
+)
+
+# Límites acumulados de ingresos para las clases A y B (Pareto)
+CLASS_A_SHARE = 0.80
+CLASS_B_SHARE = 0.95
+
+_cache: TTLCache = TTLCache(maxsize=256, ttl=settings.PRODUCT_ANALYTICS_CACHE_SECONDS)
+_cache_lock = threading.Lock()
+
+
+def load_columns(
+    session: Session, *, enterprise_id: int, start_date: date, end_date: date
+) -> Dict[str, np.ndarray]:
+    """
+    Carga los agregados diarios por producto del periodo como arreglos de NumPy,
+    uno por columna.
+    """
+    rows = session.exec(
+        select(
+            SalesDailyProduct.product_id,
+            SalesDailyProduct.units,
+            SalesDailyProduct.revenue,
+            SalesDailyProduct.cost,
+        ).where(
+            SalesDailyProduct.enterprise_id == enterprise_id,
+            SalesDailyProduct.day >= start_date,
+            SalesDailyProduct.day <= end_date,
+        )
+    ).all()
+    if not rows:
+        return {
+            "product_id": np.empty(0, dtype=np.int64),
+            "units": np.empty(0, dtype=np.int64),
+            "revenue": np.empty(0, dtype=np.float64),
+            "cost": np.empty(0, dtype=np.float64),
+        }
+    product_ids, units, revenue, cost = zip(*rows)
+    return {
+        "product_id": np.fromiter(product_ids, dtype=np.int64, count=len(rows)),
+        "units": np.fromiter(units, dtype=np.int64, count=len(rows)),
+        "revenue": np.fromiter(revenue, dtype=np.float64, count=len(rows)),
+        "cost": np.fromiter(cost, dtype=np.float64, count=len(rows)),
+    }
+
+
+def analyze(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Agrupa por producto y calcula margen, participación y clase ABC,
+    ordenado por ingresos de mayor a menor.
+    """
+    product_ids, inverse = np.unique(columns["product_id"], return_inverse=True)
+    size = len(product_ids)
+    units = np.bincount(inverse, weights=columns["units"], minlength=size).astype(np.int64)
+    revenue = np.bincount(inverse, weights=columns["revenue"], minlength=size)
+    cost = np.bincount(inverse, weights=columns["cost"], minlength=size)
+
+    margin = revenue - cost
+    margin_rate = np.divide(margin, revenue, out=np.zeros(size), where=revenue != 0)
+
+    order = np.argsort(-revenue, kind="stable")
+    total = revenue.sum()
+    share = revenue[order] / total if total > 0 else np.zeros(size)
+    cumulative = np.cumsum(share)
+    # Un producto entra en la clase si el acumulado antes de él no supera el límite,
+    # así el producto que cruza el 80% sigue siendo A
+    previous = cumulative - share
+    abc = np.where(
+        previous < CLASS_A_SHARE, AbcClass.A.value,
+        np.where(previous < CLASS_B_SHARE, AbcClass.B.value, AbcClass.C.value)
+    )
+    return {
+        "product_id": product_ids[order],
+        "units": units[order],
+        "revenue": revenue[order],
+        "cost": cost[order],
+        "margin": margin[order],
+        "margin_rate": margin_rate[order],
+        "revenue_share": share,
+        "cumulative_share": cumulative,
+        "abc_class": abc,
+    }
+
+
+def _build_report(
+    session: Session, *, enterprise_id: int, start_date: date, end_date: date
+) -> Tuple[ProductPerformanceReport, np.ndarray]:
+    result = analyze(load_columns(
+        session, enterprise_id=enterprise_id, start_date=start_date, end_date=end_date
+    ))
+    ids = result["product_id"].tolist()
+    names = dict(session.exec(
+        select(Product.id, Product.name).where(Product.id.in_(ids))
+    ).all()) if ids else {}
+
+    products = [
+        ProductPerformanceRow(
+            product_id=product_id,
+            name=names.get(product_id),
+            units=units,
+            revenue=revenue,
+            cost=cost,
+            margin=margin,
+            margin_rate=margin_rate,
+            revenue_share=revenue_share,
+            cumulative_share=cumulative_share,
+            abc_class=abc_class,
+        )
+        for product_id, units, revenue, cost, margin, margin_rate, revenue_share,
+        cumulative_share, abc_class in zip(
+            ids,
+            result["units"].tolist(),
+            result["revenue"].tolist(),
+            result["cost"].tolist(),
+            result["margin"].tolist(),
+            result["margin_rate"].tolist(),
+            result["revenue_share"].tolist(),
+            result["cumulative_share"].tolist(),
+            result["abc_class"].tolist(),
+        )
+    ]
+    report = ProductPerformanceReport(
+        start_date=start_date,
+        end_date=end_date,
+        total_revenue=float(result["revenue"].sum()),
+        top_by_units=[],
+        top_by_revenue=[],
+        products=products,
+    )
+    # Orden por unidades; los productos ya vienen ordenados por ingresos
+    return report, np.argsort(-result["units"], kind="stable")
+
+
+def get_report(
+    session: Session,
+    *,
+    enterprise_id: int,
+    start_date: date,
+    end_date: date,
+    top_n: int = 10
+) -> ProductPerformanceReport:
+    """
+    Top N por unidades e ingresos, clases ABC y margen por producto.
+    El análisis completo se guarda en caché por (empresa, periodo).
+    """
+    key = (enterprise_id, start_date, end_date)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is None:
+        cached = _build_report(
+            session, enterprise_id=enterprise_id, start_date=start_date, end_date=end_date
+        )
+        with _cache_lock:
+            _cache[key] = cached
+
+    report, units_order = cached
+    return report.model_copy(update={
+        "top_by_units": [report.products[index] for index in units_order[:top_n]],
+        "top_by_revenue": report.products[:top_n],
+    })
@@ -0,0 +1,188 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from src.config.settings import settings
+from src.models.product import Product, ProductStatus
+from src.models.report import SalesDailyProduct
+from src.models.supplier import (
+    ReorderPlan,
+    ReorderSuggestionItem,
+    Supplier,
+    SupplierReorderSuggestion,
+)
+
+# Último plan calculado por empresa; lo renueva el proceso nocturno
+_plans: Dict[int, ReorderPlan] = {}
+_plans_lock = threading.Lock()
+
+
+def load_demand(
+    session: Session, *, enterprise_id: int, history_days: int, today: date
+) -> np.ndarray:
+    """
+    Unidades vendidas por (producto, antigüedad en días) desde los agregados
+    diarios, como una matriz de NumPy con columnas [product_id, edad, unidades].
+    """
+    rows = session.exec(
+        select(
+            SalesDailyProduct.product_id,
+            func.datediff(today, SalesDailyProduct.day),
+            SalesDailyProduct.units,
+        ).where(
+            SalesDailyProduct.enterprise_id == enterprise_id,
+            SalesDailyProduct.day > today - timedelta(days=history_days),
+            SalesDailyProduct.day <= today,
+        )
+    ).all()
+    return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+
+def velocity(
+    product_ids: np.ndarray, demand: np.ndarray, *, history_days: int, half_life_days: float
+) -> np.ndarray:
+    """
+    Velocidad de venta diaria con promedio exponencial para cada producto de
+    `product_ids` (ordenado).
+
+    Equivale a recorrer la serie diaria completa (con ceros en los días sin
+    ventas) aplicando v = a * x + (1 - a) * v, pero solo toca los días con ventas:
+    cada día aporta a * (1 - a) ** edad.
+    """
+    alpha = 1 - 0.5 ** (1 / half_life_days)
+    if not len(demand):
+        return np.zeros(len(product_ids))
+    positions = np.searchsorted(product_ids, demand[:, 0])
+    known = (positions < len(product_ids)) & (
+        product_ids[np.minimum(positions, len(product_ids) - 1)] == demand[:, 0]
+    )
+    decay = alpha * (1 - alpha) ** np.arange(history_days + 1)
+    ages = np.clip(demand[known, 1], 0, history_days)
+    weights = decay[ages] * demand[known, 2]
+    totals = np.bincount(positions[known], weights=weights, minlength=len(product_ids))
+    # Corrige el sesgo hacia cero de una serie que empieza en v = 0
+    return totals / (1 - (1 - alpha) ** history_days)
+
+
+def build_plan(session: Session, *, enterprise_id: int, today: Optional[date] = None) -> ReorderPlan:
+    """
+    Calcula velocidad, días de cobertura y cantidad sugerida de cada producto
+    activo de la empresa, agrupados por proveedor.
+    """
+    today = today or date.today()
+    history_days = settings.REORDER_HISTORY_DAYS
+    products = session.exec(
+        select(
+            Product.id,
+            Product.name,
+            Product.supplier_id,
+            Product.stock,
+            Product.minimal_safe_stock,
+            Product.supplier_price,
+        )
+        .where(
+            Product.enterprise_id == enterprise_id,
+            Product.status != ProductStatus.INACTIVE,
+        )
+        .order_by(Product.id)
+    ).all()
+    suppliers = dict(session.exec(
+        select(Supplier.id, Supplier.name).where(Supplier.enterprise_id == enterprise_id)
+    ).all())
+    generated_at = datetime.utcnow()
+    if not products:
+        return ReorderPlan(
+            enterprise_id=enterprise_id,
+            generated_at=generated_at,
+            history_days=history_days,
+            suppliers=[],
+        )
+
+    ids, names, supplier_ids, stock, minimal, supplier_price = zip(*products)
+    ids = np.array(ids, dtype=np.int64)
+    stock = np.array(stock, dtype=np.float64)
+    minimal = np.array(minimal, dtype=np.float64)
+    supplier_price = np.array(supplier_price, dtype=np.float64)
+    # -1 agrupa los productos sin proveedor
+    supplier_keys = np.array([s if s is not None else -1 for s in supplier_ids], dtype=np.int64)
+
+    daily = velocity(
+        ids,
+        load_demand(session, enterprise_id=enterprise_id, history_days=history_days, today=today),
+        history_days=history_days,
+        half_life_days=settings.REORDER_HALF_LIFE_DAYS,
+    )
+    cover = np.divide(
+        stock, daily, out=np.full(len(ids), np.inf), where=daily > 0
+    )
+    target = daily * (settings.REORDER_LEAD_TIME_DAYS + settings.REORDER_COVERAGE_DAYS) + minimal
+    suggested = np.ceil(np.maximum(target - np.maximum(stock, 0), 0)).astype(np.int64)
+    cost = suggested * supplier_price
+
+    selected = np.flatnonzero(suggested > 0)
+    # Por proveedor y, dentro de cada uno, primero lo que se agota antes
+    selected = selected[np.lexsort((cover[selected], supplier_keys[selected]))]
+
+    groups: List[SupplierReorderSuggestion] = []
+    for index in selected.tolist():
+        supplier_id = supplier_ids[index]
+        if not groups or groups[-1].supplier_id != supplier_id:
+            groups.append(SupplierReorderSuggestion(
+                supplier_id=supplier_id,
+                supplier_name=suppliers.get(supplier_id),
+                total_units=0,
+                estimated_cost=0,
+                items=[],
+            ))
+        group = groups[-1]
+        group.items.append(ReorderSuggestionItem(
+            product_id=int(ids[index]),
+            name=names[index],
+            stock=int(stock[index]),
+            minimal_safe_stock=int(minimal[index]),
+            daily_velocity=round(float(daily[index]), 4),
+            days_of_cover=round(float(cover[index]), 1) if np.isfinite(cover[index]) else None,
+            suggested_quantity=int(suggested[index]),
+            estimated_cost=round(float(cost[index]), 2),
+        ))
+        group.total_units += int(suggested[index])
+        group.estimated_cost = round(group.estimated_cost + float(cost[index]), 2)
+
+    return ReorderPlan(
+        enterprise_id=enterprise_id,
+        generated_at=generated_at,
+        history_days=history_days,
+        suppliers=groups,
+    )
+
+
+def get_plan(session: Session, *, enterprise_id: int) -> ReorderPlan:
+    """
+    Plan guardado de la empresa. Solo se calcula aquí si aún no existe
+    (por ejemplo, justo después de reiniciar el API).
+    """
+    with _plans_lock:
+        plan = _plans.get(enterprise_id)
+    if plan is None:
+        plan = build_plan(session, enterprise_id=enterprise_id)
+        with _plans_lock:
+            _plans[enterprise_id] = plan
+    return plan
+
+
+def refresh_all(session: Session) -> int:
+    """
+    Recalcula el plan de todas las empresas con productos.
+    """
+    enterprise_ids = session.exec(
+        select(Product.enterprise_id).where(Product.enterprise_id.is_not(None)).distinct()
+    ).all()
+    for enterprise_id in enterprise_ids:
+        plan = build_plan(session, enterprise_id=enterprise_id)
+        with _plans_lock:
+            _plans[enterprise_id] = plan
+    return len(enterprise_ids)
@@ -1,12 +1,32 @@
-from typing import Optional, List
+from typing import Any, Dict, Iterator, Optional, List, Set, Tuple
 from datetime import date
-from sqlmodel import Session, select
-from src.models.sale import Sale, SaleCreate, SaleUpdate
+from sqlalchemy import and_, func, or_
+from sqlmodel import Session, select, update
+from src.models.invoice import Invoice
+from src.models.product import Product
+from src.models.sale import (
+    Sale, SaleCreate, SaleUpdate, CartItem, SaleQuoteRequest, SaleQuote, SaleQuoteLine
+)
+from src.utils import live_sales
 from .base import CRUDBase
-from . import product as product_crud
+from .product import product as product_crud
+from . import sales_rollup, client_summary
+
+
+def encode_cursor(sale: Sale) -> str:
+    return f"{sale.sell_date.isoformat()}_{sale.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Convierte el cursor "AAAA-MM-DD_id" en (sell_date, id). Lanza ValueError si es inválido.
+    """
+    sell_date, _, sale_id = cursor.partition("_")
+    return date.fromisoformat(sell_date), int(sale_id)
+
 
 class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
-    def create(self, session: Session, *, obj_in: SaleCreate) -> Sale:
+    def create(self, session: Session, *, obj_in: SaleCreate, commit: bool = True) -> Sale:
         # Crear la venta
         db_obj = Sale(
             quantity=obj_in.quantity,
@@ -20,28 +40,282 @@ class CRUDSale(CRUDBase[Sale, SaleCreate, SaleUpdate]):
         )
         
         # Actualizar el stock del producto
-        product_crud.product.update_stock(
+        product = product_crud.update_stock(
             session=session, 
             product_id=obj_in.product_id, 
             quantity=-obj_in.quantity
         )
         
+        # La venta solo suma una visita si es la primera del cliente en la factura
+        new_visit = self._first_of_invoice(
+            session, invoice_id=obj_in.invoice_id, client_id=obj_in.client_id
+        )
+        db_obj.enterprise_id = product.enterprise_id
+        db_obj.unit_cost = product.supplier_price
         session.add(db_obj)
+        session.flush()
+        sales_rollup.apply_sales(
+            session, sales=[db_obj], products={product.id: product}
+        )
+        client_summary.apply_sales(session, sales=[db_obj], count_visits=new_visit)
+        invoice = session.get(Invoice, obj_in.invoice_id)
+        live_sales.track(session, product.enterprise_id, live_sales.sale_event(
+            "sale",
+            invoice_id=obj_in.invoice_id,
+            payment_method=invoice.payment_method if invoice else None,
+            sell_date=db_obj.sell_date,
+            total=db_obj.total_price,
+            units=db_obj.quantity,
+            sale_ids=[db_obj.id]
+        ))
+        if not commit:
+            return db_obj
         session.commit()
         session.refresh(db_obj)
         return db_obj
 
+    def remove(self, session: Session, *, id: int) -> Sale:
+        sale = self.get(session=session, id=id)
+        if sale.product_id is not None:
+            # Devolver al stock las unidades vendidas
+            product = product_crud.update_stock(
+                session=session,
+                product_id=sale.product_id,
+                quantity=sale.quantity
+            )
+            if product:
+                sales_rollup.apply_sales(
+                    session, sales=[sale], products={product.id: product}, sign=-1
+                )
+        if sale.enterprise_id is not None:
+            live_sales.track(session, sale.enterprise_id, live_sales.sale_event(
+                "sale_deleted",
+                invoice_id=sale.invoice_id,
+                payment_method=sale.invoice.payment_method if sale.invoice else None,
+                sell_date=sale.sell_date,
+                total=-sale.total_price,
+                units=-sale.quantity,
+                sale_ids=[sale.id]
+            ))
+        session.delete(sale)
+        session.flush()
+        client_summary.apply_sales(
+            session,
+            sales=[sale],
+            sign=-1,
+            count_visits=self._first_of_invoice(
+                session, invoice_id=sale.invoice_id, client_id=sale.client_id
+            )
+        )
+        session.commit()
+        return sale
+
+    def _first_of_invoice(
+        self, session: Session, *, invoice_id: Optional[int], client_id: Optional[int]
+    ) -> bool:
+        # True si el cliente no tiene (otras) ventas guardadas en la factura
+        return session.exec(
+            select(Sale.id)
+            .where(Sale.invoice_id == invoice_id, Sale.client_id == client_id)
+            .limit(1)
+        ).first() is None
+
+    def get_by_client(
+        self,
+        session: Session,
+        *,
+        client_id: int,
+        enterprise_id: int,
+        after: Optional[Tuple[date, int]] = None,
+        limit: int = 100
+    ) -> List[Sale]:
+        # Usa el índice (client_id, enterprise_id, sell_date, id)
+        statement = select(Sale).where(
+            Sale.client_id == client_id,
+            Sale.enterprise_id == enterprise_id
+        )
+        return self._page(session, statement, after=after, limit=limit)
+
+    def get_by_enterprise(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        after: Optional[Tuple[date, int]] = None,
+        limit: int = 100
+    ) -> List[Sale]:
+        statement = select(Sale).where(Sale.enterprise_id == enterprise_id)
+        return self._page(session, statement, after=after, limit=limit)
+
     def get_by_date_range(
         self, 
         session: Session, 
         *, 
+        enterprise_id: int,
         start_date: date, 
-        end_date: date
+        end_date: date,
+        after: Optional[Tuple[date, int]] = None,
+        limit: int = 100
     ) -> List[Sale]:
-        return session.exec(
+        statement = (
             select(Sale)
+            .where(Sale.enterprise_id == enterprise_id)
             .where(Sale.sell_date >= start_date)
             .where(Sale.sell_date <= end_date)
+        )
+        return self._page(session, statement, after=after, limit=limit)
+
+    def _page(
+        self,
+        session: Session,
+        statement,
+        *,
+        after: Optional[Tuple[date, int]],
+        limit: int
+    ) -> List[Sale]:
+        # Paginación por cursor sobre el índice (enterprise_id, sell_date, id)
+        if after is not None:
+            sell_date, sale_id = after
+            statement = statement.where(
+                or_(
+                    Sale.sell_date > sell_date,
+                    and_(Sale.sell_date == sell_date, Sale.id > sale_id)
+                )
+            )
+        return session.exec(
+            statement.order_by(Sale.sell_date, Sale.id).limit(limit)
         ).all()
 
+    def get_totals_by_payment_method(
+        self, session: Session, *, enterprise_id: int, sell_date: date
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Total vendido y unidades del día por medio de pago, en una consulta agrupada.
+        """
+        rows = session.exec(
+            select(
+                Invoice.payment_method,
+                func.coalesce(func.sum(Sale.total_price), 0),
+                func.coalesce(func.sum(Sale.quantity), 0)
+            )
+            .join(Invoice, Invoice.id == Sale.invoice_id)
+            .where(Sale.enterprise_id == enterprise_id, Sale.sell_date == sell_date)
+            .group_by(Invoice.payment_method)
+        ).all()
+        return {
+            payment_method.value: {"total": round(total, 2), "units": int(units)}
+            for payment_method, total, units in rows
+        }
+
+    def get_ids_by_date(self, session: Session, *, enterprise_id: int, sell_date: date) -> Set[int]:
+        """
+        Ids de las ventas del día de la empresa (usa ix_sale_enterprise_date).
+        """
+        return set(session.exec(
+            select(Sale.id).where(Sale.enterprise_id == enterprise_id, Sale.sell_date == sell_date)
+        ).all())
+
+    def backfill(self, session: Session) -> int:
+        """
+        Completa enterprise_id de las ventas anteriores a esa columna con la
+        empresa de su producto.
+        """
+        enterprise_id = (
+            select(Product.enterprise_id)
+            .where(Product.id == Sale.product_id)
+            .scalar_subquery()
+        )
+        result = session.exec(
+            update(Sale)
+            .where(Sale.enterprise_id.is_(None), Sale.product_id.is_not(None))
+            .values(enterprise_id=enterprise_id)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount
+
+    EXPORT_COLUMNS = [
+        "sale_id", "sell_date", "quantity", "price", "discount", "total_price",
+        "client_id", "product_id", "product_name", "bar_code",
+        "invoice_id", "payment_method", "invoice_created_at",
+    ]
+
+    def iter_export_rows(
+        self,
+        session: Session,
+        *,
+        enterprise_id: int,
+        start_date: date,
+        end_date: date,
+        batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre las ventas del rango con un cursor del lado del servidor (yield_per),
+        con los datos del producto y la factura en una sola consulta.
+        """
+        statement = (
+            select(
+                Sale.id, Sale.sell_date, Sale.quantity, Sale.price, Sale.discount,
+                Sale.total_price, Sale.client_id, Product.id, Product.name,
+                Product.bar_code, Invoice.id, Invoice.payment_method, Invoice.created_at
+            )
+            .join(Product, Product.id == Sale.product_id)
+            .outerjoin(Invoice, Invoice.id == Sale.invoice_id)
+            .where(
+                Sale.enterprise_id == enterprise_id,
+                Sale.sell_date >= start_date,
+                Sale.sell_date <= end_date
+            )
+            .order_by(Sale.sell_date, Sale.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in session.exec(statement):
+            yield dict(zip(self.EXPORT_COLUMNS, row))
+
+    def match_items(
+        self, *, items: List[CartItem], products: List[Product]
+    ) -> List[Optional[Product]]:
+        """
+        Asocia cada item del carrito con su producto (None si no se encontró).
+        """
+        by_id = {p.id: p for p in products}
+        by_bar_code = {p.bar_code: p for p in products}
+        return [
+            by_id.get(item.product_id) if item.product_id is not None
+            else by_bar_code.get(item.bar_code)
+            for item in items
+        ]
+
+    def quote(
+        self, *, quote_in: SaleQuoteRequest, products: List[Product]
+    ) -> SaleQuote:
+        """
+        Calcula precio, descuento y total de cada línea y de la factura en una sola pasada.
+        `Product.discount` es un porcentaje sobre `public_price`.
+        """
+        lines = []
+        subtotal = discount = 0.0
+        for item, product in zip(quote_in.items, products):
+            gross = round(product.public_price * item.quantity, 2)
+            line_discount = round(gross * (product.discount or 0) / 100, 2)
+            lines.append(SaleQuoteLine(
+                product_id=product.id,
+                name=product.name,
+                bar_code=product.bar_code,
+                quantity=item.quantity,
+                price=product.public_price,
+                discount=line_discount,
+                total_price=round(gross - line_discount, 2)
+            ))
+            subtotal += gross
+            discount += line_discount
+        return SaleQuote(
+            client_id=quote_in.client_id,
+            payment_method=quote_in.payment_method,
+            lines=lines,
+            subtotal=round(subtotal, 2),
+            discount=round(discount, 2),
+            total_price=round(subtotal - discount, 2)
+        )
+
 sale = CRUDSale(Sale)
\ No newline at end of file
@@ -0,0 +1,186 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert as sa_insert
+from sqlalchemy.dialects.mysql import insert
+from sqlmodel import Session, select
+
+from src.models.product import Product
+from src.models.report import (
+    ReportGroupBy,
+    ReportPeriod,
+    SalesDailyCategory,
+    SalesDailyProduct,
+    SalesReportRow,
+)
+from src.models.sale import Sale
+
+FIELDS = ("units", "revenue", "discount", "cost")
+
+
+def _upsert(session: Session, model, rows: List[dict]) -> None:
+    rows = [row for row in rows if any(row[field] for field in FIELDS)]
+    if not rows:
+        return
+    table = model.__table__
+    statement = insert(table).values(rows)
+    statement = statement.on_duplicate_key_update(
+        {field: table.c[field] + statement.inserted[field] for field in FIELDS}
+    )
+    session.exec(statement)
+
+
+def apply_sales(
+    session: Session,
+    *,
+    sales: Iterable[Sale],
+    products: Dict[int, Product],
+    sign: int = 1
+) -> None:
+    """
+    Suma (sign=1) o resta (sign=-1) las ventas de los agregados diarios por
+    producto y por categoría. Debe llamarse en la misma transacción que crea
+    o elimina las ventas. No hace commit.
+    """
+    by_product: Dict[Tuple[int, date, int], dict] = {}
+    by_category: Dict[Tuple[int, date, int], dict] = {}
+    for sale in sales:
+        product = products[sale.product_id]
+        # Las ventas anteriores a unit_cost usan el supplier_price actual
+        unit_cost = product.supplier_price if sale.unit_cost is None else sale.unit_cost
+        values = {
+            "units": sign * sale.quantity,
+            "revenue": sign * sale.total_price,
+            "discount": sign * sale.discount,
+            "cost": sign * sale.quantity * unit_cost,
+        }
+        targets = [(
+            by_product,
+            (product.enterprise_id, sale.sell_date, product.id),
+            "product_id",
+        )]
+        if product.category_id is not None:
+            targets.append((
+                by_category,
+                (product.enterprise_id, sale.sell_date, product.category_id),
+                "category_id",
+            ))
+        for rows, key, key_field in targets:
+            row = rows.setdefault(key, {
+                "enterprise_id": key[0],
+                "day": key[1],
+                key_field: key[2],
+                **{field: 0 for field in FIELDS},
+            })
+            for field in FIELDS:
+                row[field] += values[field]
+
+    _upsert(session, SalesDailyProduct, list(by_product.values()))
+    _upsert(session, SalesDailyCategory, list(by_category.values()))
+
+
+def get_report(
+    session: Session,
+    *,
+    enterprise_id: int,
+    start_date: date,
+    end_date: date,
+    period: ReportPeriod = ReportPeriod.DAY,
+    group_by: ReportGroupBy = ReportGroupBy.TOTAL,
+    limit: Optional[int] = None
+) -> List[SalesReportRow]:
+    """
+    Agrupa los agregados diarios por día, semana (inicia el lunes) o mes.
+    """
+    model = SalesDailyCategory if group_by == ReportGroupBy.CATEGORY else SalesDailyProduct
+    if period == ReportPeriod.WEEK:
+        bucket = func.subdate(model.day, func.weekday(model.day))
+    elif period == ReportPeriod.MONTH:
+        bucket = func.date(func.date_format(model.day, "%Y-%m-01"))
+    else:
+        bucket = model.day
+    bucket = bucket.label("period")
+
+    columns = [bucket]
+    if group_by == ReportGroupBy.PRODUCT:
+        columns.append(model.product_id)
+    elif group_by == ReportGroupBy.CATEGORY:
+        columns.append(model.category_id)
+
+    revenue = func.sum(model.revenue).label("revenue")
+    statement = (
+        select(
+            *columns,
+            func.sum(model.units),
+            revenue,
+            func.sum(model.discount),
+            func.sum(model.cost),
+        )
+        .where(
+            model.enterprise_id == enterprise_id,
+            model.day >= start_date,
+            model.day <= end_date,
+        )
+        .group_by(*columns)
+        .order_by(bucket, revenue.desc())
+    )
+    if limit:
+        statement = statement.limit(limit)
+
+    report = []
+    for row in session.exec(statement).all():
+        key = row[1] if len(columns) > 1 else None
+        units, revenue_value, discount, cost = row[len(columns):]
+        report.append(SalesReportRow(
+            period=row[0],
+            product_id=key if group_by == ReportGroupBy.PRODUCT else None,
+            category_id=key if group_by == ReportGroupBy.CATEGORY else None,
+            units=units,
+            revenue=revenue_value,
+            discount=discount,
+            cost=cost,
+            margin=revenue_value - cost,
+        ))
+    return report
+
+
+def rebuild(session: Session) -> None:
+    """
+    Recalcula los agregados diarios a partir de todas las ventas.
+    El costo usa el unit_cost guardado en cada venta o, si no lo tiene, el
+    supplier_price actual del producto.
+    """
+    session.exec(delete(SalesDailyProduct))
+    session.exec(delete(SalesDailyCategory))
+
+    for model, key_column, key_field in (
+        (SalesDailyProduct, Product.id, "product_id"),
+        (SalesDailyCategory, Product.category_id, "category_id"),
+    ):
+        aggregated = (
+            select(
+                Product.enterprise_id,
+                Sale.sell_date,
+                key_column,
+                func.sum(Sale.quantity),
+                func.sum(Sale.total_price),
+                func.sum(Sale.discount),
+                func.sum(Sale.quantity * func.coalesce(Sale.unit_cost, Product.supplier_price)),
+            )
+            .join(Product, Product.id == Sale.product_id)
+            .where(key_column.is_not(None))
+            .group_by(Product.enterprise_id, Sale.sell_date, key_column)
+        )
+        table = model.__table__
+        session.exec(
+            sa_insert(table).from_select(
+                [
+                    table.c.enterprise_id,
+                    table.c.day,
+                    table.c[key_field],
+                    *(table.c[field] for field in FIELDS),
+                ],
+                aggregated,
+            )
+        )
+    session.commit()
@@ -95,4 +95,19 @@ def get_current_active_superuser(
             status_code=400, 
             detail="The employee doesn't have enough privileges"
         )
-    return current_employee
\ No newline at end of file
+    return current_employee
+
+def require_permission(permission_name: str):
+    """
+    Dependencia que exige que el rol del empleado tenga el permiso indicado.
+    """
+    def check_permission(
+        current_employee: EmployeeRead = Depends(get_current_active_employee),
+    ) -> EmployeeRead:
+        if permission_name not in {p.name for p in current_employee.role.permissions}:
+            raise HTTPException(
+                status_code=403,
+                detail="The employee doesn't have enough privileges"
+            )
+        return current_employee
+    return check_permission
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
@@ -13,12 +15,41 @@ from src.routers.client import router as client_router
 from src.routers.invoice import router as invoice_router
 from src.routers.sale import router as sale_router
 from src.routers.notification import router as notification_router
+from src.routers.report import router as report_router
+from src.routers.sync import router as sync_router
+from src.routers.live import router as live_router
 
 from src.config.settings import settings
+from src.utils.stock_alerts import low_stock_alerts
+from src.utils.reorder_forecast import reorder_forecasts
+from src.utils.notification_outbox import notification_outbox_worker
+from src.utils.notification_broadcast import notification_broadcasts
+from src.utils.push_receipts import push_receipts
+from src.utils import receipt
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    receipt.load_templates()
+    # Procesos en segundo plano del API
+    low_stock_alerts.start()
+    reorder_forecasts.start()
+    if settings.NOTIFICATION_OUTBOX_IN_PROCESS:
+        notification_outbox_worker.start()
+    push_receipts.start()
+    notification_broadcasts.recover()
+    yield
+    push_receipts.stop()
+    notification_broadcasts.shutdown()
+    notification_outbox_worker.stop()
+    reorder_forecasts.stop()
+    low_stock_alerts.stop()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set all CORS enabled origins
@@ -44,6 +75,9 @@ app.include_router(client_router, prefix=f"{settings.API_V1_STR}/clients", tags=
 app.include_router(invoice_router, prefix=f"{settings.API_V1_STR}/invoices", tags=["invoices"])
 app.include_router(sale_router, prefix=f"{settings.API_V1_STR}/sales", tags=["sales"])
 app.include_router(notification_router, prefix=f"{settings.API_V1_STR}/notifications", tags=["notifications"])
+app.include_router(report_router, prefix=f"{settings.API_V1_STR}/reports", tags=["reports"])
+app.include_router(sync_router, prefix=f"{settings.API_V1_STR}/sync", tags=["sync"])
+app.include_router(live_router, prefix=f"{settings.API_V1_STR}/ws", tags=["live"])
 
 @app.get("/")
 def read_root():
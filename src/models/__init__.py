@@ -3,14 +3,18 @@ from .permission import Permission, PermissionCreate, PermissionRead
 from .role import Role, RoleCreate, RoleRead
 from .enterprise import Enterprise, EnterpriseCreate, EnterpriseRead
 from .employee import Employee, EmployeeCreate, EmployeeRead
-from .category import Category, CategoryCreate, CategoryRead
+from .category import Category, CategoryCreate, CategoryRead, CategoryStats
 from .supplier import Supplier, SupplierCreate, SupplierRead
 from .product import Product, ProductCreate, ProductRead, ProductStatus
-from .invoice import Invoice, InvoiceCreate, InvoiceRead, PaymentMethod
+from .invoice import Invoice, InvoiceCreate, InvoiceRead, InvoiceVoid, PaymentMethod
 from .sale import Sale, SaleCreate, SaleRead
-from .client import Client, ClientCreate, ClientRead
+from .client import Client, ClientCreate, ClientRead, ClientSummary
 from .notification_token import NotificationToken, NotificationTokenCreate, NotificationTokenUpdate, NotificationTokenPublic, NotificationTokensPublic
 from .reset_token import PasswordResetToken
+from .idempotency import IdempotencyKey
+from .notification_outbox import NotificationOutbox, OutboxStatus
+from .notification_broadcast import NotificationBroadcast, BroadcastTarget, BroadcastStatus
+from .report import SalesDailyProduct, SalesDailyCategory
 
 __all__ = [
     "PermissionHasRole",
@@ -18,12 +22,16 @@ __all__ = [
     "Role", "RoleCreate", "RoleRead",
     "Enterprise", "EnterpriseCreate", "EnterpriseRead",
     "Employee", "EmployeeCreate", "EmployeeRead",
-    "Category", "CategoryCreate", "CategoryRead",
+    "Category", "CategoryCreate", "CategoryRead", "CategoryStats",
     "Supplier", "SupplierCreate", "SupplierRead",
     "Product", "ProductCreate", "ProductRead", "ProductStatus",
-    "Invoice", "InvoiceCreate", "InvoiceRead", "PaymentMethod",
+    "Invoice", "InvoiceCreate", "InvoiceRead", "InvoiceVoid", "PaymentMethod",
     "Sale", "SaleCreate", "SaleRead",
-    "Client", "ClientCreate", "ClientRead",
+    "Client", "ClientCreate", "ClientRead", "ClientSummary",
     "NotificationToken", "NotificationTokenCreate", "NotificationTokenUpdate", "NotificationTokenPublic", "NotificationTokensPublic",
-    "PasswordResetToken"
+    "PasswordResetToken",
+    "IdempotencyKey",
+    "NotificationOutbox", "OutboxStatus",
+    "NotificationBroadcast", "BroadcastTarget", "BroadcastStatus",
+    "SalesDailyProduct", "SalesDailyCategory"
 ]
\ No newline at end of file
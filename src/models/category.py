@@ -21,3 +21,21 @@ class CategoryRead(CategoryBase):
 class CategoryUpdate(CategoryBase):
     pass
 
+class CategoryStats(SQLModel, table=True):
+    """
+    Agregados por categoría mantenidos por las escrituras de productos y ventas.
+    """
+    __tablename__ = "category_stats"
+
+    category_id: int = Field(foreign_key="category.id", primary_key=True)
+    enterprise_id: int = Field(foreign_key="enterprise.id", index=True)
+    product_count: int = 0
+    active_count: int = 0
+    stock_units: int = 0
+    stock_value: float = 0
+
+class CategorySummaryRead(CategoryRead):
+    product_count: int
+    active_count: int
+    stock_units: int
+    stock_value: float
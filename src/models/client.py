@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
+from datetime import date
 
 class ClientBase(SQLModel):
     name: str = Field(max_length=45)
@@ -25,3 +26,20 @@ class ClientsRead(SQLModel):
 class ClientUpdate(ClientBase):
     pass
 
+class ClientSummary(SQLModel, table=True):
+    """
+    Resumen de compras de un cliente en una empresa, mantenido al crear y eliminar ventas.
+    """
+    __tablename__ = "client_summary"
+
+    client_id: int = Field(foreign_key="client.id", primary_key=True)
+    enterprise_id: int = Field(foreign_key="enterprise.id", primary_key=True)
+    visits: int = 0
+    lifetime_spend: float = 0
+    last_purchase_date: Optional[date] = None
+
+class ClientSummaryRead(ClientRead):
+    visits: int
+    lifetime_spend: float
+    last_purchase_date: Optional[date] = None
+    average_ticket: float
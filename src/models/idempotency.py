@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Text, UniqueConstraint
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    Respuesta guardada de una petición de escritura enviada con el header Idempotency-Key.
+    Mientras status_code es None la petición original sigue en curso; si
+    locked_until ya pasó, otra petición con la misma llave puede retomarla.
+    """
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        UniqueConstraint("enterprise_id", "key", name="uq_idempotency_enterprise_key"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    enterprise_id: int = Field(foreign_key="enterprise.id")
+    key: str = Field(max_length=255)
+    request_hash: str = Field(max_length=64)
+    status_code: Optional[int] = None
+    response_body: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    expires_at: datetime = Field(index=True)
@@ -1,3 +1,4 @@
+from sqlalchemy import Column, Index, Text, func
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from enum import Enum
@@ -8,19 +9,71 @@ class PaymentMethod(str, Enum):
     CREDIT_CARD = "credit_card"
     DEBIT_CARD = "debit_card"
 
+class ReceiptFormat(str, Enum):
+    HTML = "html"
+    TEXT = "text"
+
 class InvoiceBase(SQLModel):
     payment_method: PaymentMethod
     total_price: float
 
 class Invoice(InvoiceBase, table=True):
+    __table_args__ = (
+        Index("ix_invoice_enterprise_created", "enterprise_id", "created_at"),
+        # Las terminales fuera de línea identifican cada factura con un UUID propio
+        Index("ux_invoice_enterprise_client_uuid", "enterprise_id", "client_uuid", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    enterprise_id: Optional[int] = Field(default=None, foreign_key="enterprise.id")
+    client_uuid: Optional[str] = Field(default=None, max_length=36)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"server_default": func.now()}
+    )
+    voided_at: Optional[datetime] = None
     sales: List["Sale"] = Relationship(back_populates="invoice")
 
 class InvoiceCreate(InvoiceBase):
-    pass
+    enterprise_id: Optional[int] = None
 
 class InvoiceRead(InvoiceBase):
     id: int
+    enterprise_id: Optional[int] = None
+    client_uuid: Optional[str] = None
+    created_at: datetime
+    voided_at: Optional[datetime] = None
 
 class InvoiceUpdate(InvoiceBase):
-    pass
\ No newline at end of file
+    pass
+
+class InvoiceVoidCreate(SQLModel):
+    reason: Optional[str] = Field(default=None, max_length=255)
+
+class InvoiceVoid(SQLModel, table=True):
+    """
+    Registro de auditoría de una factura anulada, con una copia de sus líneas.
+    """
+    __tablename__ = "invoice_void"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    invoice_id: int = Field(foreign_key="invoice.id", index=True)
+    enterprise_id: int = Field(foreign_key="enterprise.id")
+    employee_id: int = Field(foreign_key="employee.id")
+    reason: Optional[str] = Field(default=None, max_length=255)
+    line_count: int
+    units: int
+    total_price: float
+    # JSON con las ventas eliminadas
+    lines: str = Field(sa_column=Column(Text, nullable=False))
+    voided_at: datetime = Field(default_factory=datetime.utcnow)
+
+class InvoiceVoidRead(SQLModel):
+    id: int
+    invoice_id: int
+    employee_id: int
+    reason: Optional[str] = None
+    line_count: int
+    units: int
+    total_price: float
+    voided_at: datetime
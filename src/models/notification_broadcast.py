@@ -0,0 +1,62 @@
+from sqlalchemy import Column, Text
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+from enum import Enum
+
+class BroadcastTarget(str, Enum):
+    ENTERPRISE = "enterprise"
+    ROLE = "role"
+    PERMISSION = "permission"
+
+class BroadcastStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class NotificationBroadcastCreate(SQLModel):
+    title: str = Field(max_length=255)
+    message: str
+    data: Optional[dict] = None
+    target: BroadcastTarget = BroadcastTarget.ENTERPRISE
+    # Requerido cuando target es ROLE
+    role_id: Optional[int] = None
+    # Requerido cuando target es PERMISSION
+    permission_name: Optional[str] = None
+
+class NotificationBroadcastBase(SQLModel):
+    enterprise_id: int = Field(foreign_key="enterprise.id", index=True)
+    created_by: int = Field(foreign_key="employee.id")
+    target: BroadcastTarget
+    role_id: Optional[int] = None
+    permission_name: Optional[str] = Field(default=None, max_length=45)
+    title: str = Field(max_length=255)
+    status: BroadcastStatus = BroadcastStatus.PENDING
+    # Progreso: tokens resueltos y resultado de los ya procesados
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    deactivated: int = 0
+    error: Optional[str] = Field(default=None, max_length=500)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    # Último avance registrado; detecta los envíos que quedaron a medias
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class NotificationBroadcast(NotificationBroadcastBase, table=True):
+    """
+    Trabajo de envío masivo de una notificación a los dispositivos de una empresa,
+    un rol o un permiso. Los contadores se actualizan a medida que avanza.
+    """
+    __tablename__ = "notification_broadcast"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    message: str = Field(sa_column=Column(Text, nullable=False))
+    # JSON con los datos adicionales de la notificación
+    data: Optional[str] = Field(default=None, sa_column=Column(Text))
+
+class NotificationBroadcastRead(NotificationBroadcastBase):
+    id: int
+    message: str
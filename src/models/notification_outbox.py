@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Index, Text
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import List, Optional
+from enum import Enum
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+class NotificationOutbox(SQLModel, table=True):
+    """
+    Notificación push pendiente de envío. Se inserta en la misma transacción que
+    la origina y un worker la entrega en segundo plano.
+    Mientras está en SENDING, next_attempt_at marca el fin de la reserva del worker.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="employee.id")
+    title: str = Field(max_length=255)
+    message: str = Field(sa_column=Column(Text, nullable=False))
+    # JSON con los datos adicionales de la notificación
+    data: Optional[str] = Field(default=None, sa_column=Column(Text))
+    # JSON con los IDs de los tokens que fallaron y se reintentan; None envía a
+    # todos los dispositivos del usuario (primer intento)
+    token_ids: Optional[str] = Field(default=None, sa_column=Column(Text))
+    status: OutboxStatus = OutboxStatus.PENDING
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = Field(default=None, max_length=500)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+
+class OutboxStatusCount(SQLModel):
+    status: OutboxStatus
+    count: int
+
+class NotificationOutboxStats(SQLModel):
+    queued: List[OutboxStatusCount]
+    oldest_pending_seconds: Optional[float] = None
+    # Contadores del worker de este proceso desde su inicio
+    sent: int
+    retried: int
+    dead: int
+    average_latency_seconds: Optional[float] = None
+    max_latency_seconds: Optional[float] = None
+    last_error: Optional[str] = None
@@ -1,11 +1,12 @@
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from .employee import Employee
 
 # Modelo base para tokens de notificación
 class NotificationTokenBase(SQLModel):
-    token: str = Field(index=True)
+    token: str = Field(max_length=255)
     device_name: Optional[str] = None
     active: bool = True
 
@@ -20,20 +21,44 @@ class NotificationTokenUpdate(SQLModel):
 
 # Modelo de base de datos
 class NotificationToken(NotificationTokenBase, table=True):
+    # Un registro por token: el registro desde otro usuario reasigna la fila
+    __table_args__ = (
+        Index("ux_notificationtoken_token", "token", unique=True),
+        # Cambios que leen los registros en memoria de los demás procesos
+        Index("ix_notificationtoken_updated_at", "updated_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(foreign_key="employee.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Salud del dispositivo: fallos de entrega consecutivos según tickets y recibos de Expo
+    failure_count: int = 0
+    last_success_at: Optional[datetime] = None
+    last_failure_at: Optional[datetime] = None
+    last_error: Optional[str] = Field(default=None, max_length=255)
     
     # Definir relación
     user: Optional[Employee] = Relationship(back_populates="notification_tokens")
 
+# Ticket de Expo cuyo recibo aún no se ha consultado
+class NotificationTicket(SQLModel, table=True):
+    __tablename__ = "notification_ticket"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    ticket_id: str = Field(max_length=64)
+    token_id: int = Field(foreign_key="notificationtoken.id", index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
 # Modelo para respuestas API
 class NotificationTokenPublic(NotificationTokenBase):
     id: int
     user_id: int
     created_at: datetime
     updated_at: datetime
+    failure_count: int = 0
+    last_success_at: Optional[datetime] = None
+    last_failure_at: Optional[datetime] = None
 
 # Lista de tokens para respuestas API
 class NotificationTokensPublic(SQLModel):
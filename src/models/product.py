@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from enum import Enum
@@ -20,6 +21,11 @@ class ProductBase(SQLModel):
     discount: float
 
 class Product(ProductBase, table=True):
+    __table_args__ = (
+        Index("ix_product_enterprise_status", "enterprise_id", "status"),
+        Index("ix_product_enterprise_supplier", "enterprise_id", "supplier_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     enterprise_id: Optional[int] = Field(default=None, foreign_key="enterprise.id")
     category_id: Optional[int] = Field(default=None, foreign_key="category.id")
@@ -42,4 +48,11 @@ class ProductRead(ProductBase):
     supplier_id: int
 
 class ProductUpdate(ProductBase):
-    pass
\ No newline at end of file
+    pass
+
+class ProductsPage(SQLModel):
+    data: List[ProductRead]
+    next_cursor: Optional[int] = None
+
+class ProductReorderRead(ProductRead):
+    shortfall: int
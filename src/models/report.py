@@ -0,0 +1,71 @@
+from sqlmodel import SQLModel, Field
+from typing import List, Optional
+from enum import Enum
+from datetime import date
+
+class ReportPeriod(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class ReportGroupBy(str, Enum):
+    TOTAL = "total"
+    PRODUCT = "product"
+    CATEGORY = "category"
+
+class SalesRollupBase(SQLModel):
+    units: int = 0
+    revenue: float = 0
+    discount: float = 0
+    cost: float = 0
+
+class SalesDailyProduct(SalesRollupBase, table=True):
+    """
+    Ventas agregadas por (empresa, día, producto), mantenidas al crear y eliminar ventas.
+    """
+    __tablename__ = "sales_daily_product"
+
+    enterprise_id: int = Field(foreign_key="enterprise.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    product_id: int = Field(primary_key=True)
+
+class SalesDailyCategory(SalesRollupBase, table=True):
+    """
+    Ventas agregadas por (empresa, día, categoría), mantenidas al crear y eliminar ventas.
+    """
+    __tablename__ = "sales_daily_category"
+
+    enterprise_id: int = Field(foreign_key="enterprise.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    category_id: int = Field(primary_key=True)
+
+class SalesReportRow(SalesRollupBase):
+    period: date
+    product_id: Optional[int] = None
+    category_id: Optional[int] = None
+    margin: float
+
+class AbcClass(str, Enum):
+    A = "A"
+    B = "B"
+    C = "C"
+
+class ProductPerformanceRow(SQLModel):
+    product_id: int
+    name: Optional[str] = None
+    units: int
+    revenue: float
+    cost: float
+    margin: float
+    margin_rate: float
+    revenue_share: float
+    cumulative_share: float
+    abc_class: AbcClass
+
+class ProductPerformanceReport(SQLModel):
+    start_date: date
+    end_date: date
+    total_revenue: float
+    top_by_units: List[ProductPerformanceRow]
+    top_by_revenue: List[ProductPerformanceRow]
+    products: List[ProductPerformanceRow]
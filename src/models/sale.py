@@ -1,6 +1,10 @@
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional
+from sqlalchemy import Index
+from typing import Optional, List
 from datetime import date
+from enum import Enum
+from pydantic import model_validator
+from .invoice import PaymentMethod, InvoiceRead
 
 class SaleBase(SQLModel):
     quantity: int
@@ -10,10 +14,20 @@ class SaleBase(SQLModel):
     total_price: float
 
 class Sale(SaleBase, table=True):
+    # Listados por empresa y fecha paginados por cursor (sell_date, id)
+    __table_args__ = (
+        Index("ix_sale_enterprise_date", "enterprise_id", "sell_date", "id"),
+        Index("ix_sale_client_enterprise_date", "client_id", "enterprise_id", "sell_date", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     invoice_id: Optional[int] = Field(default=None, foreign_key="invoice.id")
     client_id: Optional[int] = Field(default=None, foreign_key="client.id")
     product_id: Optional[int] = Field(default=None, foreign_key="product.id")
+    # Copia de product.enterprise_id para filtrar sin pasar por el producto
+    enterprise_id: Optional[int] = Field(default=None, foreign_key="enterprise.id")
+    # Costo unitario (supplier_price) al momento de la venta; las anulaciones restan este mismo costo
+    unit_cost: Optional[float] = None
     
     invoice: Optional["Invoice"] = Relationship(back_populates="sales")
     client: Optional["Client"] = Relationship(back_populates="sales")
@@ -29,6 +43,71 @@ class SaleRead(SaleBase):
     invoice_id: int
     client_id: int
     product_id: int
+    enterprise_id: Optional[int] = None
+
+class SalesPage(SQLModel):
+    data: List[SaleRead]
+    next_cursor: Optional[str] = None
 
 class SaleUpdate(SaleBase):
-    pass
\ No newline at end of file
+    pass
+
+class SaleLine(SQLModel):
+    product_id: int
+    quantity: int = Field(gt=0)
+    price: float
+    discount: float
+    total_price: float
+
+class CartItem(SQLModel):
+    product_id: Optional[int] = None
+    bar_code: Optional[str] = None
+    quantity: int = Field(gt=0)
+
+    @model_validator(mode="after")
+    def check_reference(self) -> "CartItem":
+        if self.product_id is None and not self.bar_code:
+            raise ValueError("Each item needs a product_id or a bar_code")
+        return self
+
+class SaleQuoteRequest(SQLModel):
+    items: List[CartItem] = Field(min_length=1)
+    client_id: Optional[int] = None
+    payment_method: Optional[PaymentMethod] = None
+
+class SaleQuoteLine(SaleLine):
+    name: str
+    bar_code: str
+
+class SaleQuote(SQLModel):
+    client_id: Optional[int] = None
+    payment_method: Optional[PaymentMethod] = None
+    lines: List[SaleQuoteLine]
+    subtotal: float
+    discount: float
+    total_price: float
+
+class CheckoutCreate(SQLModel):
+    payment_method: PaymentMethod
+    client_id: int
+    lines: List[SaleLine] = Field(min_length=1)
+    total_price: float
+
+class CheckoutRead(SQLModel):
+    invoice: InvoiceRead
+    sales: List[SaleRead]
+
+class InvoiceSummaryRead(InvoiceRead):
+    line_count: int
+    units: int
+    lines_total: float
+
+class InvoiceSaleRead(SaleRead):
+    product_name: Optional[str] = None
+
+class InvoiceDetailRead(InvoiceRead):
+    sales: List[InvoiceSaleRead]
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
+from datetime import datetime
 from pydantic import EmailStr
 
 class SupplierBase(SQLModel):
@@ -22,4 +23,27 @@ class SupplierRead(SupplierBase):
     enterprise_id: int
 
 class SupplierUpdate(SupplierBase):
-    pass
\ No newline at end of file
+    pass
+
+class ReorderSuggestionItem(SQLModel):
+    product_id: int
+    name: str
+    stock: int
+    minimal_safe_stock: int
+    daily_velocity: float
+    days_of_cover: Optional[float] = None
+    suggested_quantity: int
+    estimated_cost: float
+
+class SupplierReorderSuggestion(SQLModel):
+    supplier_id: Optional[int] = None
+    supplier_name: Optional[str] = None
+    total_units: int
+    estimated_cost: float
+    items: List[ReorderSuggestionItem]
+
+class ReorderPlan(SQLModel):
+    enterprise_id: int
+    generated_at: datetime
+    history_days: int
+    suppliers: List[SupplierReorderSuggestion]
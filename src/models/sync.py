@@ -0,0 +1,32 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional, List
+from enum import Enum
+from datetime import datetime
+from uuid import UUID
+from .invoice import PaymentMethod
+from .sale import SaleLine
+
+class SyncInvoice(SQLModel):
+    client_uuid: UUID
+    payment_method: PaymentMethod
+    client_id: int
+    sold_at: datetime
+    lines: List[SaleLine] = Field(min_length=1)
+    total_price: float
+
+class SalesBatchCreate(SQLModel):
+    invoices: List[SyncInvoice] = Field(min_length=1, max_length=1000)
+
+class SyncStatus(str, Enum):
+    ACCEPTED = "accepted"
+    DUPLICATE = "duplicate"
+    CONFLICT = "conflict"
+
+class SyncInvoiceResult(SQLModel):
+    client_uuid: UUID
+    status: SyncStatus
+    invoice_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class SalesBatchResult(SQLModel):
+    results: List[SyncInvoiceResult]
@@ -2,8 +2,9 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import select
 from src.crud import category as crud
+from src.crud import category_stats
 from src.deps import SessionDep, get_current_active_employee
-from src.models.category import Category, CategoryCreate, CategoryRead
+from src.models.category import Category, CategoryCreate, CategoryRead, CategorySummaryRead
 from src.models.employee import Employee
 from src.models.utils import Message
 
@@ -27,6 +28,23 @@ def read_categories(
     )
     return categories
 
+@router.get("/summary", response_model=list[CategorySummaryRead])
+def read_categories_summary(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Retrieve categories with product counts and inventory totals.
+    """
+    return category_stats.get_summaries(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        skip=skip,
+        limit=limit
+    )
+
 @router.post("/", response_model=CategoryRead)
 def create_category(
     *,
@@ -1,10 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import select
 from src.crud import client as crud
+from src.crud import sale as sale_crud
+from src.crud import client_summary
 from src.deps import SessionDep, get_current_active_employee
-from src.models.client import Client, ClientCreate, ClientRead
-from src.models.sale import SaleRead
+from src.models.client import Client, ClientCreate, ClientRead, ClientSummaryRead
+from src.models.sale import SalesPage
+from src.utils.pagination import MAX_PAGE_SIZE, build_page, parse_cursor
 from src.models.employee import Employee
 from src.models.utils import Message
 
@@ -51,18 +54,45 @@ def read_client(
         raise HTTPException(status_code=404, detail="Client not found")
     return client
 
-@router.get("/{client_id}/sales", response_model=List[SaleRead])
+@router.get("/{client_id}/summary", response_model=ClientSummaryRead)
+def read_client_summary(
+    *,
+    session: SessionDep,
+    client_id: int,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Get a client with their purchase summary in the employee's enterprise.
+    """
+    summary = client_summary.get_summary(
+        session=session,
+        client_id=client_id,
+        enterprise_id=current_employee.enterprise.id
+    )
+    if not summary:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return summary
+
+@router.get("/{client_id}/sales", response_model=SalesPage)
 def read_client_sales(
     *,
     session: SessionDep,
     client_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Get sales for a client.
+    Get sales for a client, paginated by cursor.
     """
-    sales = crud.get_sales(session=session, client_id=client_id)
-    return sales
+    sales = sale_crud.get_by_client(
+        session=session,
+        client_id=client_id,
+        enterprise_id=current_employee.enterprise.id,
+        after=parse_cursor(cursor),
+        limit=limit
+    )
+    return build_page(sales, limit)
 
 @router.delete("/{client_id}", response_model=Message)
 def delete_client(
@@ -79,7 +109,7 @@ def delete_client(
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Verificar si el cliente tiene ventas asociadas
-    if client.sales:
+    if crud.has_sales(session=session, client_id=client_id):
         raise HTTPException(
             status_code=400,
             detail="Cannot delete client with associated sales"
@@ -1,11 +1,23 @@
-from typing import Any, List
+from typing import Any, List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from src.config.settings import settings
 from sqlmodel import select
 from src.crud import invoice as crud
+from src.crud import product as product_crud
+from src.crud.product import InsufficientStockError
+from src.crud.invoice import InvoiceAlreadyVoidedError
 from src.deps import SessionDep, get_current_active_employee
-from src.models.invoice import Invoice, InvoiceCreate, InvoiceRead
-from src.models.sale import SaleRead
+from src.utils import idempotency, receipt
+from src.utils.pagination import MAX_PAGE_SIZE
+from src.models.invoice import (
+    Invoice, InvoiceCreate, InvoiceRead, InvoiceVoidCreate, InvoiceVoidRead, ReceiptFormat
+)
+from src.models.sale import (
+    SaleRead, CheckoutCreate, CheckoutRead, InvoiceSummaryRead, InvoiceDetailRead
+)
+from src.models.product import ProductStatus
 from src.models.employee import Employee
 from src.models.utils import Message
 
@@ -21,7 +33,12 @@ def read_invoices(
     """
     Retrieve invoices.
     """
-    invoices = crud.get_multi(session=session, skip=skip, limit=limit)
+    invoices = crud.get_by_enterprise(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        skip=skip,
+        limit=limit
+    )
     return invoices
 
 @router.post("/", response_model=InvoiceRead)
@@ -29,13 +46,115 @@ def create_invoice(
     *,
     session: SessionDep,
     invoice_in: InvoiceCreate,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Create new invoice.
+    Create new invoice. Retries with the same Idempotency-Key return the first response.
     """
-    invoice = crud.create(session=session, obj_in=invoice_in)
-    return invoice
+    # Asignar la empresa del empleado actual
+    invoice_in.enterprise_id = current_employee.enterprise.id
+
+    return idempotency.run(
+        session=session,
+        key=idempotency_key,
+        enterprise_id=current_employee.enterprise.id,
+        route="POST /invoices/",
+        payload=invoice_in,
+        response_model=InvoiceRead,
+        handler=lambda: crud.create(session=session, obj_in=invoice_in, commit=False)
+    )
+
+@router.post("/checkout", response_model=CheckoutRead)
+def checkout(
+    *,
+    session: SessionDep,
+    checkout_in: CheckoutCreate,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Create an invoice with all its sale lines in a single transaction.
+    Retries with the same Idempotency-Key return the first response.
+    """
+    def process() -> CheckoutRead:
+        products = product_crud.get_many(
+            session=session,
+            enterprise_id=current_employee.enterprise.id,
+            ids=[line.product_id for line in checkout_in.lines]
+        )
+        products_by_id = {p.id: p for p in products}
+
+        missing = {line.product_id for line in checkout_in.lines} - products_by_id.keys()
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Productos no encontrados: {', '.join(map(str, sorted(missing)))}"
+            )
+
+        inactive = [p.name for p in products if p.status == ProductStatus.INACTIVE]
+        if inactive:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Productos inactivos: {', '.join(inactive)}"
+            )
+
+        # Verificar que los totales sean coherentes con las líneas
+        for line in checkout_in.lines:
+            if abs(line.price * line.quantity - line.discount - line.total_price) > 0.01:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Total inválido en la línea del producto {line.product_id}"
+                )
+        if abs(sum(line.total_price for line in checkout_in.lines) - checkout_in.total_price) > 0.01:
+            raise HTTPException(
+                status_code=400,
+                detail="El total de la factura no coincide con sus líneas"
+            )
+
+        try:
+            invoice, sales = crud.checkout(
+                session=session,
+                enterprise_id=current_employee.enterprise.id,
+                obj_in=checkout_in,
+                commit=False
+            )
+        except InsufficientStockError as exc:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Stock insuficiente para los productos: {', '.join(map(str, exc.product_ids))}"
+            )
+        if settings.RECEIPT_PRERENDER:
+            background_tasks.add_task(receipt.prerender, invoice.id)
+        return CheckoutRead(invoice=invoice, sales=sales)
+
+    return idempotency.run(
+        session=session,
+        key=idempotency_key,
+        enterprise_id=current_employee.enterprise.id,
+        route="POST /invoices/checkout",
+        payload=checkout_in,
+        response_model=CheckoutRead,
+        handler=process
+    )
+
+@router.get("/summary", response_model=List[InvoiceSummaryRead])
+def read_invoice_summaries(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Retrieve invoices with line count, units and total of their sales.
+    """
+    return crud.get_summaries(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        skip=skip,
+        limit=limit
+    )
 
 @router.get("/by-date-range", response_model=List[InvoiceRead])
 def read_invoices_by_date_range(
@@ -43,6 +162,8 @@ def read_invoices_by_date_range(
     session: SessionDep,
     start_date: datetime,
     end_date: datetime,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
@@ -50,8 +171,11 @@ def read_invoices_by_date_range(
     """
     invoices = crud.get_by_date_range(
         session=session,
+        enterprise_id=current_employee.enterprise.id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        skip=skip,
+        limit=limit
     )
     return invoices
 
@@ -68,8 +192,68 @@ def read_invoice(
     invoice = crud.get(session=session, id=invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Verificar que la factura pertenece a la empresa del empleado
+    if invoice.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para ver esta factura"
+        )
+    
+    return invoice
+
+@router.get("/{invoice_id}/detail", response_model=InvoiceDetailRead)
+def read_invoice_detail(
+    *,
+    session: SessionDep,
+    invoice_id: int,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Get an invoice with its sales and product names.
+    """
+    invoice = crud.get_detail(session=session, invoice_id=invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Verificar que la factura pertenece a la empresa del empleado
+    if invoice.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para ver esta factura"
+        )
+    
     return invoice
 
+@router.get("/{invoice_id}/receipt", response_class=HTMLResponse)
+def read_invoice_receipt(
+    *,
+    session: SessionDep,
+    invoice_id: int,
+    format: ReceiptFormat = ReceiptFormat.HTML,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Render the invoice receipt as HTML or as plain text for receipt printers.
+    """
+    invoice = crud.get(session=session, id=invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Verificar que la factura pertenece a la empresa del empleado
+    if invoice.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para ver esta factura"
+        )
+    
+    content = receipt.get_receipt(session=session, invoice=invoice, receipt_format=format)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    if format == ReceiptFormat.TEXT:
+        return PlainTextResponse(content)
+    return HTMLResponse(content)
+
 @router.get("/{invoice_id}/sales", response_model=List[SaleRead])
 def read_invoice_sales(
     *,
@@ -80,9 +264,56 @@ def read_invoice_sales(
     """
     Get sales for an invoice.
     """
+    invoice = crud.get(session=session, id=invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Verificar que la factura pertenece a la empresa del empleado
+    if invoice.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para ver esta factura"
+        )
+    
     sales = crud.get_sales(session=session, invoice_id=invoice_id)
     return sales
 
+@router.post("/{invoice_id}/void", response_model=InvoiceVoidRead)
+def void_invoice(
+    *,
+    session: SessionDep,
+    invoice_id: int,
+    void_in: InvoiceVoidCreate,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Void an invoice: restore the stock of all its lines and remove its sales
+    in a single transaction, keeping an audit record.
+    """
+    invoice = crud.get(session=session, id=invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    # Verificar que la factura pertenece a la empresa del empleado
+    if invoice.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para anular esta factura"
+        )
+    
+    try:
+        return crud.void(
+            session=session,
+            invoice_id=invoice_id,
+            employee_id=current_employee.id,
+            reason=void_in.reason
+        )
+    except InvoiceAlreadyVoidedError:
+        raise HTTPException(
+            status_code=409,
+            detail="La factura ya fue anulada"
+        )
+
 @router.delete("/{invoice_id}", response_model=Message)
 def delete_invoice(
     *,
@@ -97,6 +328,20 @@ def delete_invoice(
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
+    # Verificar que la factura pertenece a la empresa del empleado
+    if invoice.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para eliminar esta factura"
+        )
+    
+    # Las facturas anuladas se conservan junto con su registro de auditoría
+    if invoice.voided_at is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete a voided invoice"
+        )
+    
     # Verificar si la factura tiene ventas asociadas
     if invoice.sales:
         raise HTTPException(
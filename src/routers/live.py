@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date
+from typing import Any, Dict, Set, Tuple
+
+from fastapi import APIRouter, HTTPException, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from src.config.db import engine
+from src.crud import sale as sale_crud
+from src.deps import get_current_employee
+from src.utils import live_sales
+
+router = APIRouter()
+
+def authenticate(token: str) -> int:
+    with Session(engine) as session:
+        employee = get_current_employee(session=session, token=token)
+    if not employee.is_active:
+        raise HTTPException(status_code=400, detail="Inactive employee")
+    return employee.enterprise.id
+
+def load_totals(enterprise_id: int, sell_date: date) -> Tuple[Dict[str, Dict[str, float]], Set[int]]:
+    # Totales e ids en la misma transacción: ambos ven la misma foto de la base
+    with Session(engine) as session:
+        totals = sale_crud.get_totals_by_payment_method(
+            session=session, enterprise_id=enterprise_id, sell_date=sell_date
+        )
+        sale_ids = sale_crud.get_ids_by_date(
+            session=session, enterprise_id=enterprise_id, sell_date=sell_date
+        )
+    return totals, sale_ids
+
+def counted(message: Dict[str, Any], sale_ids: Set[int]) -> bool:
+    """
+    Aplica el evento a las ventas contadas en los totales. Devuelve False si
+    ya estaba reflejado (una venta que el snapshot incluye, o una anulación o
+    eliminación de ventas que el snapshot ya no tenía).
+    """
+    ids = message.get("sale_ids") or []
+    if message["type"] == "sale":
+        if ids and ids[0] in sale_ids:
+            return False
+        sale_ids.update(ids)
+    else:
+        if ids and not sale_ids.intersection(ids):
+            return False
+        sale_ids.difference_update(ids)
+    return True
+
+async def send_events(
+    websocket: WebSocket, subscription: live_sales.Subscription, enterprise_id: int
+) -> None:
+    today = date.today()
+    totals, sale_ids = await run_in_threadpool(load_totals, enterprise_id, today)
+    await websocket.send_json({"type": "snapshot", "date": today.isoformat(), "totals": totals})
+    while True:
+        message: Dict[str, Any] = await subscription.get()
+        if date.today() != today:
+            # Cambio de día: los totales empiezan de cero
+            today = date.today()
+            totals, sale_ids = {}, set()
+        if message["sell_date"] != today.isoformat():
+            await websocket.send_json({**message, "totals": totals})
+            continue
+        # Un evento suscrito antes del snapshot puede estar ya incluido en él
+        if not counted(message, sale_ids):
+            continue
+        if message["payment_method"]:
+            current = totals.setdefault(message["payment_method"], {"total": 0, "units": 0})
+            current["total"] = round(current["total"] + message["total"], 2)
+            current["units"] += message["units"]
+        await websocket.send_json({**message, "totals": totals})
+
+@router.websocket("/sales")
+async def live_sales_feed(websocket: WebSocket, token: str) -> None:
+    """
+    Live sales of the employee's enterprise: a snapshot of today's totals by
+    payment method, then one message per sale, deletion or void with the
+    updated totals. Browsers cannot send headers, so the token goes in the query.
+    """
+    try:
+        enterprise_id = await run_in_threadpool(authenticate, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    broker = live_sales.get_broker()
+    # Suscribirse antes de leer los totales para no perder eventos entre ambos pasos;
+    # send_events descarta los que el snapshot ya incluye
+    subscription = broker.subscribe(enterprise_id)
+    sender = asyncio.create_task(send_events(websocket, subscription, enterprise_id))
+    try:
+        # El cliente no envía datos; se lee solo para detectar la desconexión
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        broker.unsubscribe(subscription)
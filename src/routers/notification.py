@@ -1,3 +1,4 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session
 from typing import Any, List
@@ -11,8 +12,20 @@ from src.models.notification_token import (
     NotificationTokensPublic,
     NotificationTokenUpdate,
 )
+from src.models.notification_outbox import NotificationOutboxStats
+from src.models.notification_broadcast import (
+    BroadcastTarget,
+    NotificationBroadcastCreate,
+    NotificationBroadcastRead,
+)
 from src.crud import notification_token as crud
-from src.utils.notification import send_notification_to_user
+from src.crud import notification_outbox
+from src.crud import notification_broadcast
+from src.crud import employee as employee_crud
+from src.crud import role as role_crud
+from src.crud import permission as permission_crud
+from src.utils.notification_outbox import notification_outbox_worker
+from src.utils.notification_broadcast import notification_broadcasts
 
 router = APIRouter()
 
@@ -108,25 +121,28 @@ def delete_token(
     crud.delete(db, token_id)
 
 
-@router.post("/send-test", status_code=status.HTTP_200_OK)
+@router.post("/send-test", status_code=status.HTTP_202_ACCEPTED)
 def send_test_notification(
     db: Session = Depends(get_session),
     current_user: Employee = Depends(get_current_employee),
 ) -> dict:
     """
-    Envía una notificación de prueba a todos los dispositivos del usuario actual.
+    Encola una notificación de prueba para todos los dispositivos del usuario actual.
     """
     title = "Notificación de prueba"
     message = f"Hola {current_user.name} {current_user.lastname}, esta es una notificación de prueba."
-    
-    results = send_notification_to_user(db, current_user.id, title, message)
+
+    queued = notification_outbox.enqueue(
+        db, user_ids=[current_user.id], title=title, message=message
+    )
+    db.commit()
     return {
-        "message": "Notificación de prueba enviada",
-        "results": results
+        "message": "Notificación de prueba encolada",
+        "queued": queued
     }
 
 
-@router.post("/send-to-user/{user_id}", status_code=status.HTTP_200_OK)
+@router.post("/send-to-user/{user_id}", status_code=status.HTTP_202_ACCEPTED)
 def send_notification_to_specific_user(
     user_id: int,
     title: str,
@@ -136,7 +152,7 @@ def send_notification_to_specific_user(
     current_user: Employee = Depends(get_current_employee),
 ) -> dict:
     """
-    Envía una notificación a un usuario específico.
+    Encola una notificación para un usuario específico.
     Solo accesible para administradores.
     """
     if current_user.role.name != "ADMIN":
@@ -144,9 +160,115 @@ def send_notification_to_specific_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permiso para enviar notificaciones a otros usuarios",
         )
-    
-    results = send_notification_to_user(db, user_id, title, message, data)
+    employee = employee_crud.get(session=db, id=user_id)
+    if not employee or employee.enterprise_id != current_user.enterprise_id:
+        raise HTTPException(status_code=404, detail="Empleado no encontrado")
+
+    queued = notification_outbox.enqueue(
+        db, user_ids=[user_id], title=title, message=message, data=data
+    )
+    db.commit()
     return {
-        "message": f"Notificación enviada al usuario {user_id}",
-        "results": results
-    } 
\ No newline at end of file
+        "message": f"Notificación encolada para el usuario {user_id}",
+        "queued": queued
+    }
+
+
+@router.post(
+    "/broadcast",
+    response_model=NotificationBroadcastRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def create_broadcast(
+    broadcast_in: NotificationBroadcastCreate,
+    db: Session = Depends(get_session),
+    current_user: Employee = Depends(get_current_employee),
+) -> Any:
+    """
+    Envía una notificación a toda la empresa, a un rol o a un permiso.
+    Responde de inmediato con el trabajo; el progreso se consulta en /broadcast/{id}.
+    Solo accesible para administradores.
+    """
+    if current_user.role.name != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para enviar notificaciones masivas",
+        )
+    if broadcast_in.target == BroadcastTarget.ROLE:
+        if broadcast_in.role_id is None or not role_crud.get(session=db, id=broadcast_in.role_id):
+            raise HTTPException(status_code=404, detail="Rol no encontrado")
+    if broadcast_in.target == BroadcastTarget.PERMISSION:
+        if not broadcast_in.permission_name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Debe indicar el permiso destino",
+            )
+        if not permission_crud.get_by_name(session=db, name=broadcast_in.permission_name):
+            raise HTTPException(status_code=404, detail="Permiso no encontrado")
+
+    broadcast = notification_broadcast.create(
+        db,
+        obj_in=broadcast_in,
+        enterprise_id=current_user.enterprise_id,
+        created_by=current_user.id,
+    )
+    notification_broadcasts.submit(broadcast.id)
+    return broadcast
+
+
+@router.get("/broadcast", response_model=List[NotificationBroadcastRead])
+def read_broadcasts(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_session),
+    current_user: Employee = Depends(get_current_employee),
+) -> Any:
+    """
+    Retrieve broadcasts.
+    """
+    return notification_broadcast.get_by_enterprise(
+        db, enterprise_id=current_user.enterprise_id, skip=skip, limit=limit
+    )
+
+
+@router.get("/broadcast/{broadcast_id}", response_model=NotificationBroadcastRead)
+def read_broadcast(
+    broadcast_id: int,
+    db: Session = Depends(get_session),
+    current_user: Employee = Depends(get_current_employee),
+) -> Any:
+    """
+    Get broadcast progress by ID.
+    """
+    broadcast = notification_broadcast.get(
+        db, id=broadcast_id, enterprise_id=current_user.enterprise_id
+    )
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Envío no encontrado")
+    return broadcast
+
+
+@router.get("/outbox/stats", response_model=NotificationOutboxStats)
+def get_outbox_stats(
+    db: Session = Depends(get_session),
+    current_user: Employee = Depends(get_current_employee),
+) -> Any:
+    """
+    Estado de la cola de notificaciones de la empresa y contadores del worker.
+    Solo accesible para administradores.
+    """
+    if current_user.role.name != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permiso para ver la cola de notificaciones",
+        )
+    counts, oldest_pending = notification_outbox.get_counts(
+        db, enterprise_id=current_user.enterprise_id
+    )
+    return NotificationOutboxStats(
+        queued=counts,
+        oldest_pending_seconds=(
+            (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else None
+        ),
+        **notification_outbox_worker.counters.snapshot(),
+    )
@@ -1,10 +1,10 @@
-from typing import Any, List
+from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import select
 from src.crud import product as crud
 from src.crud import category as category_crud
 from src.deps import SessionDep, get_current_active_employee
-from src.models.product import Product, ProductCreate, ProductRead
+from src.models.product import Product, ProductCreate, ProductRead, ProductStatus
 from src.models.employee import Employee
 from src.models.utils import Message
 
@@ -15,14 +15,16 @@ def read_products(
     session: SessionDep,
     skip: int = 0,
     limit: int = 100,
+    status: Optional[ProductStatus] = None,
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Retrieve products.
+    Retrieve products, optionally filtered by status.
     """
     products = crud.get_by_enterprise(
         session=session,
         enterprise_id=current_employee.enterprise.id,
+        status=status,
         skip=skip,
         limit=limit
     )
@@ -35,10 +37,11 @@ def read_products_by_category(
     category_id: int,
     skip: int = 0,
     limit: int = 100,
+    status: Optional[ProductStatus] = None,
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Retrieve products by category.
+    Retrieve products by category, optionally filtered by status.
     """
     # Verificar que la categoría existe y pertenece a la empresa del empleado
     category = category_crud.get(session=session, id=category_id)
@@ -55,6 +58,7 @@ def read_products_by_category(
         session=session,
         category_id=category_id,
         enterprise_id=current_employee.enterprise.id,
+        status=status,
         skip=skip,
         limit=limit
     )
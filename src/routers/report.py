@@ -0,0 +1,71 @@
+from typing import Any, List
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from src.crud import sales_rollup, product_analytics
+from src.deps import SessionDep, require_permission
+from src.models.employee import Employee
+from src.models.report import (
+    ReportGroupBy, ReportPeriod, SalesReportRow, ProductPerformanceReport
+)
+
+router = APIRouter()
+
+# Filas máximas del reporte de ventas
+MAX_REPORT_ROWS = 10000
+# Productos máximos del top del reporte de productos
+MAX_TOP_N = 100
+
+@router.get("/sales", response_model=List[SalesReportRow])
+def read_sales_report(
+    *,
+    session: SessionDep,
+    start_date: date,
+    end_date: date,
+    period: ReportPeriod = ReportPeriod.DAY,
+    group_by: ReportGroupBy = ReportGroupBy.TOTAL,
+    limit: int = Query(1000, ge=1, le=MAX_REPORT_ROWS),
+    current_employee: Employee = Depends(require_permission("VER_REPORTES"))
+) -> Any:
+    """
+    Sales totals per day, week or month, optionally per product or category.
+    Served from the daily rollup tables.
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=400,
+            detail="La fecha inicial debe ser anterior a la final"
+        )
+    return sales_rollup.get_report(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        start_date=start_date,
+        end_date=end_date,
+        period=period,
+        group_by=group_by,
+        limit=limit
+    )
+
+@router.get("/products", response_model=ProductPerformanceReport)
+def read_products_report(
+    *,
+    session: SessionDep,
+    start_date: date,
+    end_date: date,
+    top_n: int = Query(10, ge=1, le=MAX_TOP_N),
+    current_employee: Employee = Depends(require_permission("VER_REPORTES"))
+) -> Any:
+    """
+    Product performance for a period: top sellers, ABC classes and margins.
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=400,
+            detail="La fecha inicial debe ser anterior a la final"
+        )
+    return product_analytics.get_report(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        start_date=start_date,
+        end_date=end_date,
+        top_n=top_n
+    )
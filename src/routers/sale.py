@@ -1,59 +1,173 @@
-from typing import Any, List
+from typing import Any, Optional
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from src.config.db import engine
 from src.crud import sale as crud
+from src.crud import product as product_crud
+from src.crud.product import InsufficientStockError
 from src.deps import SessionDep, get_current_active_employee
-from src.models.sale import Sale, SaleCreate, SaleRead
+from src.utils import idempotency
+from src.utils.export import stream_csv, stream_ndjson
+from src.utils.pagination import MAX_PAGE_SIZE, build_page, parse_cursor
+from src.models.sale import (
+    Sale, SaleCreate, SaleRead, SalesPage, SaleQuoteRequest, SaleQuote, ExportFormat
+)
+from src.models.product import ProductStatus
 from src.models.employee import Employee
 from src.models.utils import Message
 
 router = APIRouter()
 
-@router.get("/", response_model=list[SaleRead])
+@router.get("/", response_model=SalesPage)
 def read_sales(
     session: SessionDep,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Retrieve sales.
+    Retrieve sales, paginated by cursor.
     """
-    sales = crud.get_multi(session=session, skip=skip, limit=limit)
-    return sales
+    sales = crud.get_by_enterprise(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        after=parse_cursor(cursor),
+        limit=limit
+    )
+    return build_page(sales, limit)
 
 @router.post("/", response_model=SaleRead)
 def create_sale(
     *,
     session: SessionDep,
     sale_in: SaleCreate,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255),
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Create new sale.
+    Create new sale. Retries with the same Idempotency-Key return the first response.
     """
-    # La creación de la venta también actualizará el stock del producto
-    sale = crud.create(session=session, obj_in=sale_in)
-    return sale
+    def process() -> Sale:
+        # La creación de la venta también actualizará el stock del producto
+        try:
+            return crud.create(session=session, obj_in=sale_in, commit=False)
+        except InsufficientStockError:
+            raise HTTPException(
+                status_code=409,
+                detail="Stock insuficiente para el producto"
+            )
+
+    return idempotency.run(
+        session=session,
+        key=idempotency_key,
+        enterprise_id=current_employee.enterprise.id,
+        route="POST /sales/",
+        payload=sale_in,
+        response_model=SaleRead,
+        handler=process
+    )
+
+@router.post("/quote", response_model=SaleQuote)
+def quote_sale(
+    *,
+    session: SessionDep,
+    quote_in: SaleQuoteRequest,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Price a cart server-side. All products are resolved in a single query.
+    """
+    products = product_crud.get_many(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        ids=[item.product_id for item in quote_in.items if item.product_id is not None],
+        bar_codes=[item.bar_code for item in quote_in.items if item.product_id is None]
+    )
+    matched = crud.match_items(items=quote_in.items, products=products)
 
-@router.get("/by-date-range", response_model=List[SaleRead])
+    missing = [
+        str(item.product_id if item.product_id is not None else item.bar_code)
+        for item, product in zip(quote_in.items, matched)
+        if product is None
+    ]
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Productos no encontrados: {', '.join(missing)}"
+        )
+
+    inactive = [p.name for p in matched if p.status == ProductStatus.INACTIVE]
+    if inactive:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Productos inactivos: {', '.join(inactive)}"
+        )
+
+    return crud.quote(quote_in=quote_in, products=matched)
+
+@router.get("/by-date-range", response_model=SalesPage)
 def read_sales_by_date_range(
     *,
     session: SessionDep,
     start_date: date,
     end_date: date,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_employee: Employee = Depends(get_current_active_employee)
 ) -> Any:
     """
-    Get sales by date range.
+    Get sales by date range, paginated by cursor.
     """
     sales = crud.get_by_date_range(
         session=session,
+        enterprise_id=current_employee.enterprise.id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        after=parse_cursor(cursor),
+        limit=limit
+    )
+    return build_page(sales, limit)
+
+@router.get("/export")
+def export_sales(
+    *,
+    start_date: date,
+    end_date: date,
+    format: ExportFormat = ExportFormat.CSV,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Stream sales in a date range as CSV or NDJSON with constant memory.
+    """
+    enterprise_id = current_employee.enterprise.id
+
+    def generate():
+        # La sesión de la dependencia se cierra antes de enviar la respuesta,
+        # así que el generador abre la suya
+        with Session(engine) as session:
+            rows = crud.iter_export_rows(
+                session=session,
+                enterprise_id=enterprise_id,
+                start_date=start_date,
+                end_date=end_date
+            )
+            if format == ExportFormat.NDJSON:
+                yield from stream_ndjson(rows)
+            else:
+                yield from stream_csv(rows, crud.EXPORT_COLUMNS)
+
+    if format == ExportFormat.NDJSON:
+        media_type = "application/x-ndjson"
+    else:
+        media_type = "text/csv"
+    filename = f"ventas_{start_date}_{end_date}.{format.value}"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
-    return sales
 
 @router.get("/{sale_id}", response_model=SaleRead)
 def read_sale(
@@ -68,6 +182,11 @@ def read_sale(
     sale = crud.get(session=session, id=sale_id)
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
+    if sale.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para ver esta venta"
+        )
     return sale
 
 @router.delete("/{sale_id}", response_model=Message)
@@ -83,9 +202,12 @@ def delete_sale(
     sale = crud.get(session=session, id=sale_id)
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
+    if sale.enterprise_id != current_employee.enterprise.id:
+        raise HTTPException(
+            status_code=403,
+            detail="No tienes permiso para eliminar esta venta"
+        )
     
-    # Aquí podrías agregar lógica adicional antes de eliminar la venta
-    # Por ejemplo, restaurar el stock del producto
-    
+    # La eliminación devuelve las unidades al stock del producto
     crud.remove(session=session, id=sale_id)
     return Message(message="Sale deleted successfully")
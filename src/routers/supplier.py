@@ -1,9 +1,12 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import select
 from src.crud import supplier as crud
+from src.crud import product as product_crud
+from src.crud import reorder_forecast
 from src.deps import SessionDep, get_current_active_employee
-from src.models.supplier import Supplier, SupplierCreate, SupplierRead
+from src.models.supplier import Supplier, SupplierCreate, SupplierRead, ReorderPlan
+from src.models.product import ProductsPage, ProductReorderRead
 from src.models.employee import Employee
 from src.models.utils import Message
 
@@ -55,6 +58,25 @@ def create_supplier(
     supplier = crud.create(session=session, obj_in=supplier_in)
     return supplier
 
+@router.get("/reorder-suggestions", response_model=ReorderPlan)
+def read_reorder_suggestions(
+    session: SessionDep,
+    supplier_id: Optional[int] = None,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Suggested order quantities grouped by supplier, from the nightly sales-velocity forecast.
+    """
+    plan = reorder_forecast.get_plan(
+        session=session,
+        enterprise_id=current_employee.enterprise.id
+    )
+    if supplier_id is not None:
+        plan = plan.model_copy(update={
+            "suppliers": [s for s in plan.suppliers if s.supplier_id == supplier_id]
+        })
+    return plan
+
 @router.get("/{supplier_id}", response_model=SupplierRead)
 def read_supplier(
     *,
@@ -78,6 +100,49 @@ def read_supplier(
     
     return supplier
 
+@router.get("/{supplier_id}/products", response_model=ProductsPage)
+def read_supplier_products(
+    *,
+    session: SessionDep,
+    supplier_id: int,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Retrieve a supplier's products, paginated by cursor.
+    """
+    # El filtro por empresa va en la misma consulta: otro tenant recibe una lista vacía
+    products = product_crud.get_by_supplier(
+        session=session,
+        supplier_id=supplier_id,
+        enterprise_id=current_employee.enterprise.id,
+        after_id=cursor,
+        limit=limit
+    )
+    next_cursor = products[-1].id if products and len(products) == limit else None
+    return ProductsPage(data=products, next_cursor=next_cursor)
+
+@router.get("/{supplier_id}/reorder", response_model=list[ProductReorderRead])
+def read_supplier_reorder(
+    *,
+    session: SessionDep,
+    supplier_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Retrieve a supplier's products below their minimal safe stock.
+    """
+    return product_crud.get_reorder_by_supplier(
+        session=session,
+        supplier_id=supplier_id,
+        enterprise_id=current_employee.enterprise.id,
+        skip=skip,
+        limit=limit
+    )
+
 @router.put("/{supplier_id}", response_model=SupplierRead)
 def update_supplier(
     *,
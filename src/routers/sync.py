@@ -0,0 +1,28 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+from src.config.settings import settings
+from src.crud import invoice as crud
+from src.deps import SessionDep, get_current_active_employee
+from src.models.sync import SalesBatchCreate, SalesBatchResult
+from src.models.employee import Employee
+
+router = APIRouter()
+
+@router.post("/sales-batch", response_model=SalesBatchResult)
+def sync_sales_batch(
+    *,
+    session: SessionDep,
+    batch_in: SalesBatchCreate,
+    current_employee: Employee = Depends(get_current_active_employee)
+) -> Any:
+    """
+    Upload invoices recorded offline. Each invoice is reported as accepted,
+    duplicate (its client_uuid was already ingested) or conflict.
+    """
+    results = crud.sync_batch(
+        session=session,
+        enterprise_id=current_employee.enterprise.id,
+        invoices=batch_in.invoices,
+        chunk_size=settings.SYNC_BATCH_CHUNK_SIZE
+    )
+    return SalesBatchResult(results=results)
@@ -159,4 +159,34 @@ def generate_reset_password_email(email_to: str, email: str, token: str) -> dict
     return {
         "html_content": html_content,
         "subject": subject
-    } 
\ No newline at end of file
+    } 
+
+def generate_low_stock_email(events: list) -> dict:
+    """
+    Genera el contenido del correo con el resumen de productos bajo el stock mínimo
+    """
+    project_name = settings.PROJECT_NAME
+    subject = f"{project_name} - {len(events)} producto(s) con stock bajo"
+    rows = "".join(
+        f"<tr><td>{event.name}</td><td>{event.stock}</td><td>{event.minimal_safe_stock}</td></tr>"
+        for event in events
+    )
+    html_content = f"""
+    <html>
+    <head>
+        <meta charset="UTF-8">
+    </head>
+    <body>
+        <h1>{project_name} - Stock bajo</h1>
+        <p>Los siguientes productos están por debajo de su stock mínimo:</p>
+        <table>
+            <tr><th>Producto</th><th>Stock</th><th>Stock mínimo</th></tr>
+            {rows}
+        </table>
+    </body>
+    </html>
+    """
+    return {
+        "html_content": html_content,
+        "subject": subject
+    }
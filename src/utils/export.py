@@ -0,0 +1,34 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+def stream_csv(rows: Iterable[Dict[str, Any]], columns: List[str], chunk_size: int = 500) -> Iterator[str]:
+    """
+    Convierte las filas a CSV en bloques de `chunk_size` para no acumular todo en memoria.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_ndjson(rows: Iterable[Dict[str, Any]], chunk_size: int = 500) -> Iterator[str]:
+    """
+    Convierte las filas a JSON por líneas (NDJSON) en bloques de `chunk_size`.
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, default=str))
+        if len(lines) == chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple, Type
+
+from cachetools import TTLCache
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, delete, select, update
+
+from src.config.db import engine
+from src.config.settings import settings
+from src.models.idempotency import IdempotencyKey
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# Caché delante de la tabla: (enterprise_id, key) -> (request_hash, status_code, body)
+_cache: TTLCache = TTLCache(maxsize=10000, ttl=settings.IDEMPOTENCY_CACHE_SECONDS)
+_cache_lock = threading.Lock()
+
+
+def request_hash(route: str, payload: Any) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True)
+    return hashlib.sha256(f"{route}\n{body}".encode()).hexdigest()
+
+
+def _remember(enterprise_id: int, key: str, stored: Tuple[str, int, str]) -> None:
+    with _cache_lock:
+        _cache[(enterprise_id, key)] = stored
+
+
+def _replay(stored: Tuple[str, int, str], expected_hash: str) -> JSONResponse:
+    stored_hash, status_code, body = stored
+    if stored_hash != expected_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="La Idempotency-Key ya se usó con una petición distinta"
+        )
+    return JSONResponse(
+        status_code=status_code,
+        content=json.loads(body),
+        headers={REPLAY_HEADER: "true"}
+    )
+
+
+def _reserve(enterprise_id: int, key: str, hashed: str, now: datetime) -> Optional[JSONResponse]:
+    """
+    Inserta la llave antes de ejecutar la petición. Si ya existe devuelve la
+    respuesta guardada, o 409 si la petición original sigue en curso.
+    La llave se retoma si venció o si su reserva quedó abandonada.
+    """
+    expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    with Session(engine) as session:
+        session.add(IdempotencyKey(
+            enterprise_id=enterprise_id,
+            key=key,
+            request_hash=hashed,
+            created_at=now,
+            expires_at=expires_at,
+            locked_until=locked_until
+        ))
+        try:
+            session.commit()
+            return None
+        except IntegrityError:
+            session.rollback()
+
+        record = session.exec(
+            select(IdempotencyKey).where(
+                IdempotencyKey.enterprise_id == enterprise_id,
+                IdempotencyKey.key == key
+            )
+        ).first()
+        takeover = or_(
+            IdempotencyKey.expires_at <= now,
+            and_(
+                IdempotencyKey.status_code.is_(None),
+                or_(IdempotencyKey.locked_until.is_(None), IdempotencyKey.locked_until <= now)
+            )
+        )
+        if record is not None and (
+            record.expires_at <= now
+            or (record.status_code is None and (record.locked_until or now) <= now)
+        ):
+            # Se reutiliza solo si nadie más la tomó primero
+            result = session.exec(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.id == record.id, takeover)
+                .values(
+                    request_hash=hashed,
+                    status_code=None,
+                    response_body=None,
+                    created_at=now,
+                    expires_at=expires_at,
+                    locked_until=locked_until
+                )
+            )
+            session.commit()
+            if result.rowcount == 1:
+                return None
+            record = None
+        if record is not None and record.status_code is not None:
+            stored = (record.request_hash, record.status_code, record.response_body)
+            _remember(enterprise_id, key, stored)
+            return _replay(stored, hashed)
+        if record is not None and record.request_hash != hashed:
+            raise HTTPException(
+                status_code=422,
+                detail="La Idempotency-Key ya se usó con una petición distinta"
+            )
+        raise HTTPException(
+            status_code=409,
+            detail="La petición con esta Idempotency-Key sigue en proceso"
+        )
+
+
+def _owned(enterprise_id: int, key: str, reserved_at: datetime):
+    # Condición de la reserva propia: si otra petición la retomó, created_at cambió
+    return and_(
+        IdempotencyKey.enterprise_id == enterprise_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at == reserved_at,
+        IdempotencyKey.status_code.is_(None)
+    )
+
+
+def _complete(
+    session: Session, enterprise_id: int, key: str, reserved_at: datetime, stored: Tuple[str, int, str]
+) -> bool:
+    """
+    Guarda la respuesta en la transacción de la petición, sin commit: la llave
+    y la escritura se confirman juntas. Devuelve False si la reserva ya no es
+    propia (venció y otra petición la retomó).
+    """
+    _, status_code, body = stored
+    result = session.exec(
+        update(IdempotencyKey)
+        .where(_owned(enterprise_id, key, reserved_at))
+        .values(status_code=status_code, response_body=body, locked_until=None)
+    )
+    return result.rowcount == 1
+
+
+def _release(enterprise_id: int, key: str, reserved_at: datetime) -> None:
+    # Si la petición falló se libera la llave para que el reintento se ejecute de nuevo
+    with Session(engine) as session:
+        session.exec(delete(IdempotencyKey).where(_owned(enterprise_id, key, reserved_at)))
+        session.commit()
+
+
+def run(
+    *,
+    session: Session,
+    key: Optional[str],
+    enterprise_id: int,
+    route: str,
+    payload: Any,
+    response_model: Type[SQLModel],
+    handler: Callable[[], Any]
+) -> Any:
+    """
+    Ejecuta `handler` una sola vez por Idempotency-Key. Los reintentos con la misma
+    llave y el mismo cuerpo reciben la respuesta guardada sin volver a ejecutarlo.
+    Sin llave se ejecuta normalmente.
+
+    `handler` escribe en `session` sin hacer commit: run confirma en un único
+    commit la escritura y la respuesta guardada, así un reintento nunca repite
+    una escritura ya confirmada.
+    """
+    if not key:
+        result = handler()
+        session.commit()
+        return result
+
+    hashed = request_hash(route, payload)
+    with _cache_lock:
+        cached = _cache.get((enterprise_id, key))
+    if cached is not None:
+        return _replay(cached, hashed)
+
+    # Sin microsegundos: MySQL guarda DATETIME por segundos y created_at identifica la reserva
+    reserved_at = datetime.utcnow().replace(microsecond=0)
+    replay = _reserve(enterprise_id, key, hashed, reserved_at)
+    if replay is not None:
+        return replay
+
+    try:
+        result = handler()
+        stored = (hashed, 200, json.dumps(jsonable_encoder(response_model.model_validate(result))))
+        if not _complete(session, enterprise_id, key, reserved_at, stored):
+            raise HTTPException(
+                status_code=409,
+                detail="La reserva de la Idempotency-Key venció y otra petición la retomó"
+            )
+        session.commit()
+    except Exception:
+        # Nada quedó confirmado: se revierte la escritura y se libera la llave
+        session.rollback()
+        _release(enterprise_id, key, reserved_at)
+        raise
+
+    _remember(enterprise_id, key, stored)
+    return result
+
+
+def purge_expired(session: Session) -> int:
+    """
+    Elimina las llaves vencidas.
+    """
+    result = session.exec(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+    )
+    session.commit()
+    return result.rowcount
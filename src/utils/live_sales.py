@@ -0,0 +1,168 @@
+import asyncio
+import importlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Clave en session.info donde se acumulan los eventos hasta el commit
+_PENDING_KEY = "live_sale_events"
+
+
+class Subscription:
+    """
+    Cola de eventos de una conexión. Se consume desde el event loop con `get()`.
+    """
+
+    def __init__(self, enterprise_id: int, max_size: int = 1000):
+        self.enterprise_id = enterprise_id
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(max_size)
+
+    def put(self, message: Dict[str, Any]) -> None:
+        # Puede llamarse desde cualquier hilo
+        self._loop.call_soon_threadsafe(self._put_nowait, message)
+
+    def _put_nowait(self, message: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning(
+                "Cliente del tablero de ventas sin leer: se descarta un evento",
+                extra={"enterprise_id": self.enterprise_id},
+            )
+
+    async def get(self) -> Dict[str, Any]:
+        return await self._queue.get()
+
+
+class Broker(ABC):
+    """
+    Interfaz del pub/sub de eventos de ventas por empresa.
+
+    Para compartir eventos entre varios procesos del API basta con implementar
+    `publish` sobre un servicio externo (Redis, por ejemplo) y repartir lo que
+    llegue a las suscripciones locales con `deliver`; se configura con
+    LIVE_SALES_BROKER.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def publish(self, enterprise_id: int, message: Dict[str, Any]) -> None:
+        ...
+
+    def subscribe(self, enterprise_id: int) -> Subscription:
+        subscription = Subscription(enterprise_id)
+        with self._lock:
+            self._subscriptions.setdefault(enterprise_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.enterprise_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.enterprise_id, None)
+
+    def deliver(self, enterprise_id: int, message: Dict[str, Any]) -> None:
+        """
+        Entrega un evento a las conexiones de este proceso.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(enterprise_id, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+
+class InProcessBroker(Broker):
+    """
+    Broker en memoria: solo llegan los eventos generados en el mismo proceso.
+    """
+
+    def publish(self, enterprise_id: int, message: Dict[str, Any]) -> None:
+        self.deliver(enterprise_id, message)
+
+
+def _load_broker(path: str) -> Broker:
+    module_name, _, class_name = path.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+_broker: Optional[Broker] = None
+
+
+def get_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        _broker = _load_broker(settings.LIVE_SALES_BROKER)
+    return _broker
+
+
+def set_broker(broker: Broker) -> None:
+    global _broker
+    _broker = broker
+
+
+def track(session: Session, enterprise_id: int, message: Dict[str, Any]) -> None:
+    """
+    Registra un evento de ventas de la empresa. Se publica solo cuando la
+    transacción se confirma; si se hace rollback se descarta.
+    """
+    session.info.setdefault(_PENDING_KEY, []).append((enterprise_id, message))
+
+
+def sale_event(
+    event_type: str,
+    *,
+    invoice_id: Optional[int],
+    payment_method: Any,
+    sell_date: Any,
+    total: float,
+    units: int,
+    sale_ids: List[int]
+) -> Dict[str, Any]:
+    """
+    Evento de ventas. En las anulaciones y eliminaciones `total` y `units` son negativos,
+    así el cliente puede sumar todos los eventos sin distinguir su tipo. `sale_ids` son
+    las ventas que agrega o quita: permiten saber si un snapshot ya incluye el evento.
+    """
+    return {
+        "type": event_type,
+        "invoice_id": invoice_id,
+        "sale_ids": list(sale_ids),
+        "payment_method": getattr(payment_method, "value", payment_method),
+        "sell_date": sell_date.isoformat(),
+        "total": round(total, 2),
+        "units": units,
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, [])
+    if not pending:
+        return
+    broker = get_broker()
+    for enterprise_id, message in pending:
+        try:
+            broker.publish(enterprise_id, message)
+        except Exception as exc:
+            logger.error(
+                f"Error al publicar evento de ventas: {exc}",
+                extra={"enterprise_id": enterprise_id},
+            )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
 from exponent_server_sdk import (
     DeviceNotRegisteredError,
     PushClient,
@@ -7,9 +10,9 @@ from exponent_server_sdk import (
 )
 import requests
 from requests.exceptions import ConnectionError, HTTPError
-import os
 from src.config.settings import settings
-from src.models.notification_token import NotificationToken
+from src.crud import notification_token
+from src.utils.token_registry import TokenEntry, get_registry, is_healthy
 from sqlmodel import Session
 import logging
 
@@ -26,116 +29,226 @@ session.headers.update(
     }
 )
 
-def send_push_message(token: str, title: str, message: str, extra: dict = None) -> bool:
+# Cliente compartido: reutiliza la conexión HTTP entre envíos
+push_client = PushClient(
+    host=settings.EXPO_HOST,
+    session=session,
+    max_message_count=settings.EXPO_PUSH_CHUNK_SIZE,
+)
+
+
+def send_push_messages(
+    tokens: List[str], title: str, message: str, extra: dict = None
+) -> Dict[str, Any]:
     """
-    Envía un mensaje push a un dispositivo específico.
-    
+    Envía el mismo mensaje push a varios dispositivos, agrupando hasta
+    EXPO_PUSH_CHUNK_SIZE mensajes por solicitud.
+
     Args:
-        token: Token del dispositivo.
+        tokens: Tokens de los dispositivos.
         title: Título de la notificación.
         message: Mensaje de la notificación.
         extra: Datos adicionales para enviar con la notificación.
-        
+
     Returns:
-        bool: True si el mensaje se envió correctamente, False en caso contrario.
+        dict: Tokens agrupados en 'successful', 'failed' y 'unregistered'.
+        Solo los 'unregistered' dejaron de ser válidos; los 'failed' pueden
+        reintentarse. 'tickets' relaciona cada token exitoso con su ticket de
+        Expo y 'errors' los tokens rechazados individualmente con su error.
     """
-    try:
-        response = PushClient(session=session).publish(
-            PushMessage(
-                to=token,
-                title=title,
-                body=message,
-                data=extra
+    results = {'successful': [], 'failed': [], 'unregistered': [], 'tickets': {}, 'errors': {}}
+
+    # Un token mal formado haría fallar la solicitud completa: se descarta antes
+    valid_tokens = []
+    for token in dict.fromkeys(tokens):
+        if PushClient.is_exponent_push_token(token):
+            valid_tokens.append(token)
+        else:
+            logger.warning(f"Token de dispositivo inválido: {token}")
+            results['unregistered'].append(token)
+
+    chunk_size = push_client.max_message_count
+    for start in range(0, len(valid_tokens), chunk_size):
+        chunk = valid_tokens[start:start + chunk_size]
+        try:
+            tickets = push_client.publish_multiple([
+                PushMessage(to=token, title=title, body=message, data=extra)
+                for token in chunk
+            ])
+        except PushServerError as exc:
+            # Error de formato o validación de toda la solicitud
+            logger.error(
+                f"Error al enviar notificaciones push: {exc}",
+                extra={
+                    'tokens': chunk,
+                    'title': title,
+                    'body': message,
+                    'extra': extra,
+                    'errors': exc.errors,
+                    'response_data': exc.response_data,
+                }
+            )
+            results['failed'].extend(chunk)
+            continue
+        except (ConnectionError, HTTPError) as exc:
+            # Error de conexión o HTTP
+            logger.error(
+                f"Error de conexión al enviar notificaciones push: {exc}",
+                extra={'tokens': chunk, 'title': title, 'body': message, 'extra': extra}
             )
-        )
-    except PushServerError as exc:
-        # Error de formato o validación
-        logger.error(
-            f"Error al enviar notificación push: {exc}",
-            extra={
-                'token': token,
-                'title': title,
-                'message': message,
-                'extra': extra,
-                'errors': exc.errors,
-                'response_data': exc.response_data,
-            }
-        )
-        return False
-    except (ConnectionError, HTTPError) as exc:
-        # Error de conexión o HTTP
-        logger.error(
-            f"Error de conexión al enviar notificación push: {exc}",
-            extra={'token': token, 'title': title, 'message': message, 'extra': extra}
-        )
-        return False
-
-    try:
-        # Validar la respuesta
-        response.validate_response()
-        return True
-    except DeviceNotRegisteredError:
-        # El token ya no es válido
-        logger.warning(f"Token de dispositivo no registrado: {token}")
-        return False
-    except PushTicketError as exc:
-        # Otro error por notificación
-        logger.error(
-            f"Error de ticket al enviar notificación push: {exc}",
-            extra={
-                'token': token,
-                'title': title,
-                'message': message,
-                'extra': extra,
-                'push_response': exc.push_response._asdict(),
-            }
-        )
-        return False
-
-def send_notification_to_user(db: Session, user_id: int, title: str, message: str, extra: dict = None) -> dict:
+            results['failed'].extend(chunk)
+            continue
+
+        # Validar la respuesta de cada mensaje
+        for token, ticket in zip(chunk, tickets):
+            try:
+                ticket.validate_response()
+                results['successful'].append(token)
+                if ticket.id:
+                    results['tickets'][token] = ticket.id
+            except DeviceNotRegisteredError:
+                # El token ya no es válido
+                logger.warning(f"Token de dispositivo no registrado: {token}")
+                results['unregistered'].append(token)
+            except PushTicketError as exc:
+                # Otro error por notificación
+                logger.error(
+                    f"Error de ticket al enviar notificación push: {exc}",
+                    extra={
+                        'token': token,
+                        'title': title,
+                        'body': message,
+                        'extra': extra,
+                        'push_response': exc.push_response._asdict(),
+                    }
+                )
+                results['failed'].append(token)
+                results['errors'][token] = ticket.message or str(exc)
+
+    return results
+
+
+def record_results(db: Session, ids_by_token: Dict[str, List[int]], results: Dict[str, Any]) -> List[int]:
+    """
+    Guarda el resultado de un envío: desactiva los tokens no registrados,
+    guarda los tickets para conciliar sus recibos y suma los fallos individuales
+    a la salud de cada dispositivo.
+
+    Returns:
+        List[int]: IDs de los tokens desactivados.
+    """
+    deactivated = [
+        token_id for token in results['unregistered'] for token_id in ids_by_token[token]
+    ]
+    notification_token.deactivate_many(db, deactivated)
+    notification_token.save_tickets(db, [
+        (token_id, ticket_id)
+        for token, ticket_id in results['tickets'].items()
+        for token_id in ids_by_token[token]
+    ])
+    notification_token.record_health(db, failures={
+        token_id: error
+        for token, error in results['errors'].items()
+        for token_id in ids_by_token[token]
+    })
+    return deactivated
+
+
+def send_push_message(token: str, title: str, message: str, extra: dict = None) -> bool:
     """
-    Envía una notificación a todos los dispositivos registrados de un usuario.
-    
+    Envía un mensaje push a un dispositivo específico.
+
+    Returns:
+        bool: True si el mensaje se envió correctamente, False en caso contrario.
+    """
+    results = send_push_messages([token], title, message, extra)
+    return bool(results['successful'])
+
+
+def healthy_tokens(
+    user_ids: List[int], token_ids: Optional[Iterable[int]] = None
+) -> List[TokenEntry]:
+    """
+    Tokens activos de los usuarios según el registro, sin los dispositivos con
+    fallos recurrentes; si se indican `token_ids`, solo esos.
+    """
+    now = datetime.utcnow()
+    only_ids = set(token_ids) if token_ids is not None else None
+    return [
+        entry
+        for entry in get_registry().tokens_for_users(user_ids)
+        if is_healthy(entry, now) and (only_ids is None or entry.id in only_ids)
+    ]
+
+
+def send_notification_to_users(
+    db: Session,
+    user_ids: List[int],
+    title: str,
+    message: str,
+    extra: dict = None,
+    token_ids: Optional[Iterable[int]] = None
+) -> dict:
+    """
+    Envía una notificación a todos los dispositivos registrados de varios usuarios.
+
+    Los tokens salen del registro en memoria, sin consultar la base de datos
+    (omitiendo los dispositivos con fallos recurrentes); los mensajes se envían
+    por lotes y los tokens que Expo reporta como no registrados se desactivan
+    con un único UPDATE.
+
     Args:
         db: Sesión de base de datos.
-        user_id: ID del usuario.
+        user_ids: IDs de los usuarios.
         title: Título de la notificación.
         message: Mensaje de la notificación.
         extra: Datos adicionales para enviar con la notificación.
-        
+        token_ids: Si se indica, solo se envía a estos tokens de los usuarios
+            (reintento de los dispositivos que fallaron).
+
     Returns:
-        dict: Resumen de resultados de envío.
+        dict: Resumen de resultados de envío. 'failed_token_ids' son los
+        tokens que fallaron por una causa que vale la pena reintentar.
     """
-    # Obtener todos los tokens activos del usuario
-    tokens = db.query(NotificationToken).filter(
-        NotificationToken.user_id == user_id,
-        NotificationToken.active == True
-    ).all()
-    
+    # Obtener todos los tokens activos de los usuarios
+    tokens = [(entry.id, entry.token) for entry in healthy_tokens(user_ids, token_ids)]
+
     results = {
         'total': len(tokens),
         'successful': 0,
         'failed': 0,
-        'tokens_to_deactivate': []
+        'tokens_to_deactivate': [],
+        'failed_token_ids': []
     }
-    
+
     if not tokens:
         return results
-    
-    for token in tokens:
-        success = send_push_message(token.token, title, message, extra)
-        if success:
-            results['successful'] += 1
-        else:
-            results['failed'] += 1
-            # Marcar para desactivar los tokens que fallaron
-            results['tokens_to_deactivate'].append(token.id)
-    
-    # Desactivar los tokens que fallaron
-    if results['tokens_to_deactivate']:
-        db.query(NotificationToken).filter(
-            NotificationToken.id.in_(results['tokens_to_deactivate'])
-        ).update({NotificationToken.active: False}, synchronize_session=False)
-        db.commit()
-    
-    return results 
\ No newline at end of file
+
+    ids_by_token: Dict[str, List[int]] = {}
+    for token_id, token in tokens:
+        ids_by_token.setdefault(token, []).append(token_id)
+
+    sent = send_push_messages(list(ids_by_token), title, message, extra)
+    results['successful'] = sum(len(ids_by_token[token]) for token in sent['successful'])
+    results['failed'] = results['total'] - results['successful']
+    results['tokens_to_deactivate'] = record_results(db, ids_by_token, sent)
+    results['failed_token_ids'] = [
+        token_id for token in sent['failed'] for token_id in ids_by_token[token]
+    ]
+
+    return results
+
+
+def send_notification_to_user(
+    db: Session,
+    user_id: int,
+    title: str,
+    message: str,
+    extra: dict = None,
+    token_ids: Optional[Iterable[int]] = None
+) -> dict:
+    """
+    Envía una notificación a todos los dispositivos registrados de un usuario
+    (o solo a `token_ids`, si se indican).
+    """
+    return send_notification_to_users(db, [user_id], title, message, extra, token_ids)
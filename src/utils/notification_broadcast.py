@@ -0,0 +1,145 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Limita los mensajes por segundo entre todos los hilos: cada lote reserva
+    su turno y espera hasta que le corresponda.
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.rate_per_second = rate_per_second
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int = 1) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + count / self.rate_per_second
+        if start > now:
+            time.sleep(start - now)
+
+
+class BroadcastRunner:
+    """
+    Ejecuta los envíos masivos de uno en uno fuera del request. Los tokens se
+    reparten en lotes de EXPO_PUSH_CHUNK_SIZE que se envían con un máximo de
+    `concurrency` solicitudes simultáneas y `rate_per_second` mensajes por segundo.
+    """
+
+    def __init__(self, concurrency: int, rate_per_second: float):
+        self.limiter = RateLimiter(rate_per_second)
+        self._jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notification-broadcast")
+        self._sender = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="broadcast-send")
+
+    def submit(self, broadcast_id: int) -> Future:
+        return self._jobs.submit(self.run, broadcast_id)
+
+    def recover(self) -> int:
+        """
+        Se ejecuta al iniciar el API: da por fallidos los envíos en curso sin
+        avances recientes (el proceso se detuvo a medias) y vuelve a encolar
+        los pendientes. Devuelve la cantidad de envíos encolados.
+        """
+        # Importaciones diferidas para evitar ciclos con src.crud y src.config.db
+        from sqlmodel import Session
+        from src.config.db import engine
+        from src.crud import notification_broadcast
+
+        updated_before = datetime.utcnow() - timedelta(
+            seconds=settings.NOTIFICATION_BROADCAST_STALE_SECONDS
+        )
+        with Session(engine) as session:
+            failed = notification_broadcast.fail_stale(
+                session,
+                updated_before=updated_before,
+                error="Envío interrumpido: el servidor se detuvo antes de terminar",
+            )
+            pending = notification_broadcast.get_pending_ids(session)
+        if failed:
+            logger.warning(f"Envíos masivos interrumpidos marcados como fallidos: {failed}")
+        for broadcast_id in pending:
+            self.submit(broadcast_id)
+        return len(pending)
+
+    def shutdown(self) -> None:
+        self._jobs.shutdown(wait=False, cancel_futures=True)
+        self._sender.shutdown(wait=False, cancel_futures=True)
+
+    def _send_chunk(self, tokens: List[str], title: str, message: str, extra: dict) -> Dict[str, Any]:
+        # Importación diferida: src.utils.notification carga src.crud
+        from src.utils.notification import send_push_messages
+
+        self.limiter.acquire(len(tokens))
+        return send_push_messages(tokens, title, message, extra)
+
+    def run(self, broadcast_id: int) -> None:
+        # Importaciones diferidas para evitar ciclos con src.crud y src.config.db
+        from sqlmodel import Session
+        from src.config.db import engine
+        from src.crud import notification_broadcast
+        from src.models.notification_broadcast import BroadcastStatus, NotificationBroadcast
+        from src.utils.notification import record_results
+
+        with Session(engine) as session:
+            broadcast = session.get(NotificationBroadcast, broadcast_id)
+            if not broadcast or broadcast.status != BroadcastStatus.PENDING:
+                return
+            try:
+                ids_by_token: Dict[str, List[int]] = {}
+                for token_id, token in notification_broadcast.resolve_tokens(session, broadcast=broadcast):
+                    ids_by_token.setdefault(token, []).append(token_id)
+                title, message = broadcast.title, broadcast.message
+                extra = json.loads(broadcast.data) if broadcast.data else None
+                if not notification_broadcast.mark_running(
+                    session, id=broadcast_id, total=sum(map(len, ids_by_token.values()))
+                ):
+                    return
+
+                tokens = list(ids_by_token)
+                chunk_size = settings.EXPO_PUSH_CHUNK_SIZE
+                futures = [
+                    self._sender.submit(
+                        self._send_chunk, tokens[start:start + chunk_size], title, message, extra
+                    )
+                    for start in range(0, len(tokens), chunk_size)
+                ]
+                for future in as_completed(futures):
+                    results = future.result()
+                    deactivated = record_results(session, ids_by_token, results)
+                    notification_broadcast.add_progress(
+                        session,
+                        id=broadcast_id,
+                        sent=sum(len(ids_by_token[token]) for token in results["successful"]),
+                        failed=sum(len(ids_by_token[token]) for token in results["failed"]) + len(deactivated),
+                        deactivated=len(deactivated),
+                    )
+                notification_broadcast.finish(
+                    session, id=broadcast_id, status=BroadcastStatus.COMPLETED
+                )
+            except Exception as exc:
+                logger.error(
+                    f"Error en el envío masivo de notificaciones: {exc}",
+                    extra={"broadcast_id": broadcast_id},
+                )
+                session.rollback()
+                notification_broadcast.finish(
+                    session, id=broadcast_id, status=BroadcastStatus.FAILED, error=str(exc)
+                )
+
+
+notification_broadcasts = BroadcastRunner(
+    settings.NOTIFICATION_BROADCAST_CONCURRENCY,
+    settings.NOTIFICATION_BROADCAST_RATE_PER_SECOND,
+)
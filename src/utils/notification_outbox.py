@@ -0,0 +1,255 @@
+import json
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Clave en session.info que indica que la transacción encoló notificaciones
+_PENDING_KEY = "notification_outbox_pending"
+_wakeup = threading.Event()
+
+
+def track(session: Session) -> None:
+    """
+    Marca que la sesión encoló notificaciones; el worker se despierta solo
+    cuando la transacción se confirma.
+    """
+    session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class OutboxCounters:
+    """
+    Contadores del worker de este proceso: envíos, reintentos, notificaciones
+    muertas y latencia desde que se encoló hasta que se entregó.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.latency_total = 0.0
+        self.latency_max: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def record_sent(self, latency: float) -> None:
+        with self._lock:
+            self.sent += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max or 0.0, latency)
+
+    def record_failed(self, dead: bool, error: str) -> None:
+        with self._lock:
+            if dead:
+                self.dead += 1
+            else:
+                self.retried += 1
+            self.last_error = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "retried": self.retried,
+                "dead": self.dead,
+                "average_latency_seconds": self.latency_total / self.sent if self.sent else None,
+                "max_latency_seconds": self.latency_max,
+                "last_error": self.last_error,
+            }
+
+
+def deliver(
+    recipients: List[Tuple[int, Optional[str]]],
+    title: str,
+    message: str,
+    data: Optional[str]
+) -> List[Tuple[Optional[str], List[int]]]:
+    """
+    Envía una misma notificación de la cola a varios usuarios con una sola
+    llamada a send_push_messages (en lotes de EXPO_PUSH_CHUNK_SIZE). Cada
+    destinatario es (user_id, token_ids); en un reintento solo se envía a los
+    tokens que fallaron antes. Devuelve, en el mismo orden, el error y los
+    tokens que vale la pena reintentar de cada uno, o (None, []) si se entregó.
+    """
+    # Importaciones diferidas para evitar ciclos con src.config.db
+    from sqlmodel import Session as DBSession
+    from src.config.db import engine
+    from src.utils.notification import healthy_tokens, record_results, send_push_messages
+
+    entries = healthy_tokens(list({user_id for user_id, _ in recipients}))
+    tokens_by_recipient = []
+    ids_by_token: Dict[str, List[int]] = {}
+    for user_id, token_ids in recipients:
+        only_ids = set(json.loads(token_ids)) if token_ids else None
+        tokens = [
+            (entry.id, entry.token)
+            for entry in entries
+            if entry.user_id == user_id and (only_ids is None or entry.id in only_ids)
+        ]
+        tokens_by_recipient.append(tokens)
+        for token_id, token in tokens:
+            ids_by_token.setdefault(token, []).append(token_id)
+
+    failed: Set[str] = set()
+    if ids_by_token:
+        sent = send_push_messages(list(ids_by_token), title, message, json.loads(data) if data else None)
+        with DBSession(engine) as session:
+            record_results(session, ids_by_token, sent)
+        failed = set(sent["failed"])
+
+    results = []
+    for tokens in tokens_by_recipient:
+        # Los tokens no registrados ya quedaron desactivados: no se reintentan
+        retryable = [token_id for token_id, token in tokens if token in failed]
+        if retryable:
+            results.append((f"{len(retryable)} dispositivo(s) no recibieron la notificación", retryable))
+        else:
+            results.append((None, []))
+    return results
+
+
+class NotificationOutboxWorker:
+    """
+    Hilo que vacía la cola de notificaciones por lotes. Las notificaciones del
+    lote con el mismo contenido se envían juntas, y los grupos en paralelo con
+    un máximo de `concurrency` envíos simultáneos; se despierta al
+    confirmarse una transacción que encoló notificaciones o cada `poll_seconds`
+    para atender los reintentos programados.
+    """
+
+    def __init__(self, batch_size: int, concurrency: int, poll_seconds: int):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.counters = OutboxCounters()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="notification-send"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="notification-outbox", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        if not self._thread:
+            return
+        self._stop.set()
+        _wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def join(self) -> None:
+        while self._thread and self._thread.is_alive():
+            self._thread.join(1)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            _wakeup.clear()
+            try:
+                processed = self.drain()
+            except Exception as exc:
+                logger.error(f"Error al procesar la cola de notificaciones: {exc}")
+                processed = 0
+            # Un lote completo indica que puede quedar más trabajo pendiente
+            if processed < self.batch_size:
+                _wakeup.wait(self.poll_seconds)
+
+    def drain(self) -> int:
+        """
+        Reserva un lote, lo envía agrupado por contenido y registra el
+        resultado de cada notificación.
+        """
+        # Importaciones diferidas para evitar ciclos con src.crud y src.config.db
+        from sqlmodel import Session as DBSession
+        from src.config.db import engine
+        from src.crud import notification_outbox
+        from src.models.notification_outbox import OutboxStatus
+
+        with DBSession(engine, expire_on_commit=False) as session:
+            messages = notification_outbox.claim(
+                session,
+                limit=self.batch_size,
+                lease_seconds=settings.NOTIFICATION_OUTBOX_LEASE_SECONDS,
+            )
+            if not messages:
+                return 0
+
+            # Las notificaciones iguales se envían juntas; si un usuario recibe la misma
+            # dos veces, la segunda va en otro grupo para que Expo no la deduplique
+            groups: Dict[Tuple[str, str, Optional[str], int], List] = {}
+            seen = Counter()
+            for m in messages:
+                content = (m.title, m.message, m.data)
+                groups.setdefault((*content, seen[(content, m.user_id)]), []).append(m)
+                seen[(content, m.user_id)] += 1
+
+            futures = [
+                (rows, self._executor.submit(
+                    deliver, [(m.user_id, m.token_ids) for m in rows], title, message, data
+                ))
+                for (title, message, data, _), rows in groups.items()
+            ]
+            sent = []
+            for rows, future in futures:
+                try:
+                    results = future.result()
+                except Exception as exc:
+                    # No se sabe qué dispositivos la recibieron: se reintentan los mismos
+                    results = [(str(exc) or exc.__class__.__name__, None)] * len(rows)
+                for outbox_message, (error, failed_ids) in zip(rows, results):
+                    if error is None:
+                        sent.append(outbox_message.id)
+                        self.counters.record_sent(
+                            (datetime.utcnow() - outbox_message.created_at).total_seconds()
+                        )
+                        continue
+                    status = notification_outbox.mark_failed(
+                        session, outbox_message=outbox_message, error=error, token_ids=failed_ids
+                    )
+                    self.counters.record_failed(status == OutboxStatus.DEAD, error)
+                    if status == OutboxStatus.DEAD:
+                        logger.error(
+                            f"Notificación descartada tras {outbox_message.attempts} intentos: {error}",
+                            extra={"outbox_id": outbox_message.id, "user_id": outbox_message.user_id},
+                        )
+
+            notification_outbox.mark_sent(session, ids=sent)
+            session.commit()
+            return len(messages)
+
+
+notification_outbox_worker = NotificationOutboxWorker(
+    settings.NOTIFICATION_OUTBOX_BATCH_SIZE,
+    settings.NOTIFICATION_OUTBOX_CONCURRENCY,
+    settings.NOTIFICATION_OUTBOX_POLL_SECONDS,
+)
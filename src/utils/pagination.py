@@ -0,0 +1,30 @@
+from datetime import date
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from src.crud.sale import decode_cursor, encode_cursor
+from src.models.sale import Sale, SalesPage
+
+# Límite máximo de los listados de ventas paginados por cursor
+MAX_PAGE_SIZE = 500
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[date, int]]:
+    """
+    Decodifica el cursor recibido en la query; responde 400 si es inválido.
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def build_page(sales: List[Sale], limit: int) -> SalesPage:
+    """
+    Arma la página con el cursor de la última venta si puede haber más resultados.
+    """
+    next_cursor = encode_cursor(sales[-1]) if sales and len(sales) == limit else None
+    return SalesPage(data=sales, next_cursor=next_cursor)
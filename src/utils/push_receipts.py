@@ -0,0 +1,135 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from exponent_server_sdk import (
+    DeviceNotRegisteredError,
+    PushServerError,
+    PushTicket,
+    PushTicketError,
+)
+from requests.exceptions import ConnectionError, HTTPError
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_receipts() -> int:
+    """
+    Consulta en Expo los recibos de los tickets pendientes por lotes de
+    PUSH_RECEIPT_CHUNK_SIZE. Desactiva los tokens no registrados, registra la
+    salud de cada dispositivo y elimina los tickets conciliados o vencidos.
+    Cada lote se reserva hasta su commit, así varios procesos no cuentan dos
+    veces el mismo recibo.
+
+    Returns:
+        int: Cantidad de tickets conciliados.
+    """
+    # Importaciones diferidas para evitar ciclos con src.crud y src.config.db
+    from sqlmodel import Session
+    from src.config.db import engine
+    from src.crud import notification_token
+    from src.utils.notification import push_client
+
+    now = datetime.utcnow()
+    sent_before = now - timedelta(seconds=settings.PUSH_RECEIPT_DELAY_SECONDS)
+    expired_before = now - timedelta(hours=settings.PUSH_RECEIPT_EXPIRY_HOURS)
+    reconciled = 0
+    after_id = 0
+
+    with Session(engine) as session:
+        while True:
+            tickets = notification_token.claim_due_tickets(
+                session,
+                sent_before=sent_before,
+                after_id=after_id,
+                limit=settings.PUSH_RECEIPT_CHUNK_SIZE,
+            )
+            if not tickets:
+                break
+            after_id = tickets[-1].id
+
+            try:
+                receipts = push_client.check_receipts_multiple([
+                    PushTicket(push_message=None, status=None, message=None, details=None, id=ticket_id)
+                    for ticket_id in {ticket.ticket_id for ticket in tickets}
+                ])
+            except (PushServerError, ConnectionError, HTTPError) as exc:
+                # Se reintenta en la próxima ejecución
+                logger.error(f"Error al consultar los recibos de Expo: {exc}")
+                session.rollback()
+                break
+            by_ticket = {receipt.id: receipt for receipt in receipts}
+
+            done: List[int] = []
+            successful: List[int] = []
+            unregistered: List[int] = []
+            failures: Dict[int, str] = {}
+            for ticket in tickets:
+                receipt = by_ticket.get(ticket.ticket_id)
+                if receipt is None:
+                    # El recibo aún no está listo; Expo lo descarta pasadas 24 horas
+                    if ticket.created_at < expired_before:
+                        done.append(ticket.id)
+                    continue
+                done.append(ticket.id)
+                try:
+                    receipt.validate_response()
+                    successful.append(ticket.token_id)
+                except DeviceNotRegisteredError:
+                    unregistered.append(ticket.token_id)
+                except PushTicketError as exc:
+                    failures[ticket.token_id] = receipt.message or str(exc)
+
+            notification_token.delete_tickets(session, done)
+            notification_token.record_health(
+                session, successful_ids=successful, failures=failures
+            )
+            notification_token.deactivate_many(session, unregistered)
+            session.commit()
+            reconciled += len(done)
+            if unregistered:
+                logger.info(f"Tokens desactivados por recibos de Expo: {len(unregistered)}")
+
+            if len(tickets) < settings.PUSH_RECEIPT_CHUNK_SIZE:
+                break
+    return reconciled
+
+
+class PushReceiptWorker:
+    """
+    Hilo que concilia periódicamente los recibos de las notificaciones enviadas.
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="push-receipts", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                reconcile_receipts()
+            except Exception as exc:
+                logger.error(f"Error al conciliar los recibos de Expo: {exc}")
+
+
+push_receipts = PushReceiptWorker(settings.PUSH_RECEIPT_INTERVAL_SECONDS)
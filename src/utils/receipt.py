@@ -0,0 +1,129 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from cachetools import LRUCache
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from sqlmodel import Session
+
+from src.config.db import engine
+from src.config.settings import settings
+from src.crud import invoice as invoice_crud
+from src.models.invoice import Invoice, ReceiptFormat
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "receipt-templates"
+TEMPLATE_NAMES = {
+    ReceiptFormat.HTML: "receipt.html",
+    ReceiptFormat.TEXT: "receipt.txt",
+}
+PAYMENT_METHOD_NAMES = {
+    "cash": "Efectivo",
+    "credit_card": "Tarjeta de crédito",
+    "debit_card": "Tarjeta débito",
+}
+
+_templates: Dict[ReceiptFormat, Template] = {}
+# Recibos renderizados por (factura, versión, formato)
+_cache: LRUCache = LRUCache(maxsize=settings.RECEIPT_CACHE_SIZE)
+_lock = threading.Lock()
+
+
+def money(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def columns(left: str, right: str, width: int) -> str:
+    """
+    Texto a la izquierda y valor alineado a la derecha en una línea de `width` caracteres.
+    """
+    left = left[:max(width - len(right) - 1, 0)]
+    return f"{left}{right.rjust(width - len(left))}"
+
+
+def load_templates() -> None:
+    """
+    Compila las plantillas una sola vez; se llama al iniciar el API.
+    """
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(["html"]),
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    environment.filters["money"] = money
+    environment.globals["columns"] = columns
+    templates = {
+        receipt_format: environment.get_template(name)
+        for receipt_format, name in TEMPLATE_NAMES.items()
+    }
+    with _lock:
+        _templates.update(templates)
+
+
+def version(session: Session, invoice: Invoice) -> str:
+    """
+    Versión del recibo: cambia al anular la factura y al agregar o eliminar
+    sus ventas (POST /sales/, DELETE /sales/{id}), también desde otro proceso.
+    """
+    count, max_id = invoice_crud.get_line_state(session=session, invoice_id=invoice.id)
+    voided_at = invoice.voided_at.isoformat() if invoice.voided_at else ""
+    return f"{count}:{max_id or 0}:{voided_at}"
+
+
+def render(data: Dict[str, Any], receipt_format: ReceiptFormat) -> str:
+    if not _templates:
+        load_templates()
+    invoice = data["invoice"]
+    payment_method = getattr(invoice.payment_method, "value", invoice.payment_method)
+    lines = data["lines"]
+    discount = round(sum(line["discount"] for line in lines), 2)
+    return _templates[receipt_format].render(
+        **data,
+        payment_method=PAYMENT_METHOD_NAMES.get(payment_method, payment_method),
+        subtotal=round(sum(line["total_price"] for line in lines) + discount, 2),
+        discount=discount,
+        width=settings.RECEIPT_TEXT_WIDTH,
+    )
+
+
+def get_receipt(
+    session: Session, *, invoice: Invoice, receipt_format: ReceiptFormat
+) -> Optional[str]:
+    """
+    Recibo de la factura en el formato pedido, desde la caché si ya se renderizó
+    esta versión.
+    """
+    key = (invoice.id, version(session, invoice), receipt_format)
+    with _lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    data = invoice_crud.get_receipt_data(session=session, invoice_id=invoice.id)
+    if data is None:
+        return None
+    receipt = render(data, receipt_format)
+    with _lock:
+        _cache[key] = receipt
+    return receipt
+
+
+def prerender(invoice_id: int) -> None:
+    """
+    Renderiza los recibos de una factura recién creada para que la primera
+    impresión salga de la caché. Pensada para BackgroundTasks.
+    """
+    with Session(engine) as session:
+        invoice = invoice_crud.get(session=session, id=invoice_id)
+        if invoice is None:
+            return
+        data = invoice_crud.get_receipt_data(session=session, invoice_id=invoice_id)
+        if data is None:
+            return
+        current = version(session, invoice)
+        rendered = {
+            (invoice_id, current, receipt_format): render(data, receipt_format)
+            for receipt_format in ReceiptFormat
+        }
+    with _lock:
+        _cache.update(rendered)
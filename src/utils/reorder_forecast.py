@@ -0,0 +1,69 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until(hour: int, now: Optional[datetime] = None) -> float:
+    """
+    Segundos que faltan para la próxima vez que el reloj marque `hour`:00.
+    """
+    now = now or datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+class ReorderForecastWorker:
+    """
+    Hilo que calcula las sugerencias de pedido de todas las empresas al iniciar
+    el API y luego una vez cada noche.
+    """
+
+    def __init__(self, hour: int):
+        self.hour = hour
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="reorder-forecast", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            if self._stop.wait(seconds_until(self.hour)):
+                break
+
+    def refresh(self) -> None:
+        # Importaciones diferidas para evitar ciclos con src.crud y src.config.db
+        from sqlmodel import Session
+        from src.config.db import engine
+        from src.crud import reorder_forecast
+
+        try:
+            with Session(engine) as session:
+                count = reorder_forecast.refresh_all(session)
+            logger.info(f"Sugerencias de pedido calculadas para {count} empresa(s)")
+        except Exception as exc:
+            logger.error(f"Error al calcular las sugerencias de pedido: {exc}")
+
+
+reorder_forecasts = ReorderForecastWorker(settings.REORDER_FORECAST_HOUR)
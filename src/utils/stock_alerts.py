@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Clave en session.info donde se acumulan los eventos hasta el commit
+_PENDING_KEY = "low_stock_events"
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class LowStockEvent:
+    enterprise_id: int
+    product_id: int
+    name: str
+    stock: int
+    minimal_safe_stock: int
+
+
+_events: "queue.Queue" = queue.Queue()
+
+
+def track(session: Session, product) -> None:
+    """
+    Registra que un producto cruzó por debajo de su stock mínimo.
+
+    El evento queda pendiente en la sesión y solo se encola cuando la
+    transacción se confirma; si se hace rollback se descarta.
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(
+        LowStockEvent(
+            enterprise_id=product.enterprise_id,
+            product_id=product.id,
+            name=product.name,
+            stock=product.stock,
+            minimal_safe_stock=product.minimal_safe_stock,
+        )
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_pending(session: Session) -> None:
+    for low_stock_event in session.info.pop(_PENDING_KEY, []):
+        _events.put(low_stock_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def coalesce(events: List[LowStockEvent]) -> Dict[int, List[LowStockEvent]]:
+    """
+    Agrupa los eventos por empresa, conservando el último evento de cada producto.
+    """
+    by_enterprise: Dict[int, Dict[int, LowStockEvent]] = {}
+    for low_stock_event in events:
+        products = by_enterprise.setdefault(low_stock_event.enterprise_id, {})
+        products[low_stock_event.product_id] = low_stock_event
+    return {
+        enterprise_id: list(products.values())
+        for enterprise_id, products in by_enterprise.items()
+    }
+
+
+def deliver_summary(enterprise_id: int, events: List[LowStockEvent]) -> None:
+    """
+    Encola un único resumen push y opcionalmente envía un correo a los
+    empleados de la empresa con el permiso GESTIONAR_INVENTARIO.
+    """
+    # Importaciones diferidas para evitar ciclos con src.crud y src.config.db
+    from src.config.db import engine
+    from src.crud import employee as employee_crud
+    from src.crud import notification_outbox
+    from src.utils.email import generate_low_stock_email, send_email
+    from sqlmodel import Session as DBSession
+
+    names = [e.name for e in events[:5]]
+    if len(events) > 5:
+        names.append(f"y {len(events) - 5} más")
+    title = f"Stock bajo en {len(events)} producto(s)"
+    message = ", ".join(names)
+    data = {
+        "type": "low_stock",
+        "product_ids": [e.product_id for e in events],
+    }
+
+    with DBSession(engine) as session:
+        employees = employee_crud.get_by_permission(
+            session=session,
+            enterprise_id=enterprise_id,
+            permission_name="GESTIONAR_INVENTARIO",
+        )
+        notification_outbox.enqueue(
+            session,
+            user_ids=[e.id for e in employees],
+            title=title,
+            message=message,
+            data=data,
+        )
+        session.commit()
+        if settings.LOW_STOCK_ALERT_EMAIL:
+            email_data = generate_low_stock_email(events)
+            for employee in employees:
+                send_email(
+                    to_email=employee.email,
+                    subject=email_data["subject"],
+                    html_content=email_data["html_content"],
+                )
+
+
+class LowStockAlertWorker:
+    """
+    Hilo que consume los eventos de stock bajo y los agrupa por empresa durante
+    una ventana de tiempo antes de notificar.
+    """
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="low-stock-alerts", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        if not self._thread:
+            return
+        _events.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = _events.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.window_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    low_stock_event = _events.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if low_stock_event is _STOP:
+                    stopping = True
+                    break
+                batch.append(low_stock_event)
+            self._flush(batch)
+
+    def _flush(self, batch: List[LowStockEvent]) -> None:
+        for enterprise_id, events in coalesce(batch).items():
+            try:
+                deliver_summary(enterprise_id, events)
+            except Exception as exc:
+                logger.error(
+                    f"Error al enviar alerta de stock bajo: {exc}",
+                    extra={"enterprise_id": enterprise_id},
+                )
+
+
+low_stock_alerts = LowStockAlertWorker(settings.LOW_STOCK_ALERT_WINDOW_SECONDS)
@@ -0,0 +1,341 @@
+import importlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config.settings import settings
+
+
+@dataclass(frozen=True)
+class TokenEntry:
+    id: int
+    token: str
+    user_id: int
+    device_name: Optional[str] = None
+    failure_count: int = 0
+    last_failure_at: Optional[datetime] = None
+
+
+def is_healthy(entry: TokenEntry, now: Optional[datetime] = None) -> bool:
+    """
+    Versión en memoria de `crud.notification_token.healthy_condition`.
+    """
+    if entry.failure_count < settings.NOTIFICATION_TOKEN_MAX_FAILURES:
+        return True
+    retry_after = (now or datetime.utcnow()) - timedelta(hours=settings.NOTIFICATION_TOKEN_RETRY_HOURS)
+    return entry.last_failure_at is not None and entry.last_failure_at < retry_after
+
+
+def load_active_tokens(
+    user_ids: Optional[List[int]] = None, token: Optional[str] = None
+) -> List[TokenEntry]:
+    """
+    Lee de la base de datos los tokens activos, todos o solo los de `user_ids`
+    o el valor `token`.
+    """
+    # Importaciones diferidas para evitar ciclos con src.config.db
+    from sqlmodel import Session, select
+    from src.config.db import engine
+    from src.models.notification_token import NotificationToken
+
+    statement = select(
+        NotificationToken.id,
+        NotificationToken.token,
+        NotificationToken.user_id,
+        NotificationToken.device_name,
+        NotificationToken.failure_count,
+        NotificationToken.last_failure_at,
+    ).where(NotificationToken.active == True)
+    if user_ids is not None:
+        statement = statement.where(NotificationToken.user_id.in_(user_ids))
+    if token is not None:
+        statement = statement.where(NotificationToken.token == token)
+    with Session(engine) as session:
+        rows = session.exec(statement).all()
+    return [TokenEntry(*row) for row in rows]
+
+
+def load_token_changes(since: datetime) -> List[Tuple[TokenEntry, bool]]:
+    """
+    Lee de la base de datos los tokens con cambios desde `since` (usa
+    ix_notificationtoken_updated_at), activos o no, con su estado.
+    """
+    # Importaciones diferidas para evitar ciclos con src.config.db
+    from sqlmodel import Session, select
+    from src.config.db import engine
+    from src.models.notification_token import NotificationToken
+
+    statement = select(
+        NotificationToken.id,
+        NotificationToken.token,
+        NotificationToken.user_id,
+        NotificationToken.device_name,
+        NotificationToken.failure_count,
+        NotificationToken.last_failure_at,
+        NotificationToken.active,
+    ).where(NotificationToken.updated_at >= since)
+    with Session(engine) as session:
+        rows = session.exec(statement).all()
+    return [(TokenEntry(*row[:-1]), row[-1]) for row in rows]
+
+
+class TokenRegistry(ABC):
+    """
+    Interfaz del registro de tokens activos: `user_id → tokens` y `token → dueño`.
+
+    crud.notification_token lo mantiene al día tras cada commit. Para
+    compartirlo entre varios procesos del API basta con implementar estos
+    métodos sobre un servicio externo (Redis, por ejemplo); se configura con
+    NOTIFICATION_TOKEN_REGISTRY.
+    """
+
+    @abstractmethod
+    def tokens_for_users(self, user_ids: Iterable[int]) -> List[TokenEntry]:
+        ...
+
+    @abstractmethod
+    def owner_of(self, token: str) -> Optional[TokenEntry]:
+        ...
+
+    @abstractmethod
+    def put(self, entry: TokenEntry) -> None:
+        ...
+
+    @abstractmethod
+    def discard(self, token_ids: Iterable[int]) -> None:
+        ...
+
+    @abstractmethod
+    def discard_user(self, user_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def record_health(
+        self, *, successful_ids: Iterable[int], failed_ids: Iterable[int], now: datetime
+    ) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate(self) -> None:
+        ...
+
+
+class InMemoryTokenRegistry(TokenRegistry):
+    """
+    Registro en memoria del proceso. Se carga completo en el primer uso y se
+    recarga cada NOTIFICATION_TOKEN_REGISTRY_TTL_SECONDS; entre recargas, cada
+    NOTIFICATION_TOKEN_REGISTRY_POLL_SECONDS lee los tokens que otros procesos
+    registraron, reasignaron o desactivaron (por su updated_at).
+    """
+
+    # Margen al leer cambios: una fila puede confirmarse después de su updated_at
+    CHANGES_OVERLAP = timedelta(seconds=30)
+
+    def __init__(
+        self,
+        loader: Callable[[], List[TokenEntry]] = load_active_tokens,
+        ttl_seconds: Optional[float] = None,
+        changes_loader: Callable[[datetime], List[Tuple[TokenEntry, bool]]] = load_token_changes,
+        poll_seconds: Optional[float] = None,
+    ):
+        self._loader = loader
+        self._ttl_seconds = (
+            settings.NOTIFICATION_TOKEN_REGISTRY_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self._changes_loader = changes_loader
+        self._poll_seconds = (
+            settings.NOTIFICATION_TOKEN_REGISTRY_POLL_SECONDS if poll_seconds is None else poll_seconds
+        )
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._polled_at: Optional[float] = None
+        self._changes_since: Optional[datetime] = None
+        self._by_id: Dict[int, TokenEntry] = {}
+        self._by_user: Dict[int, Dict[int, TokenEntry]] = {}
+        self._by_token: Dict[str, TokenEntry] = {}
+        # Cambios recibidos mientras se lee la base de datos; se reaplican al terminar
+        self._changes: Optional[List[Tuple[str, tuple]]] = None
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self._ttl_seconds
+
+    def _poll_due(self) -> bool:
+        return self._polled_at is None or time.monotonic() - self._polled_at >= self._poll_seconds
+
+    def _ensure_loaded(self) -> None:
+        if not self._stale():
+            if self._poll_due():
+                self._poll()
+            return
+        with self._load_lock:
+            if not self._stale():
+                return
+            started = datetime.utcnow()
+            with self._lock:
+                self._changes = []
+            try:
+                entries = self._loader()
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+            with self._lock:
+                changes, self._changes = self._changes, None
+                self._by_id, self._by_user, self._by_token = {}, {}, {}
+                for entry in entries:
+                    self._put(entry)
+                for name, args in changes:
+                    getattr(self, name)(*args)
+                self._loaded_at = self._polled_at = time.monotonic()
+                self._changes_since = started - self.CHANGES_OVERLAP
+
+    def _poll(self) -> None:
+        if not self._load_lock.acquire(blocking=False):
+            # Otro hilo está cargando o leyendo cambios
+            return
+        try:
+            if not self._poll_due():
+                return
+            started = datetime.utcnow()
+            changes = self._changes_loader(self._changes_since)
+            with self._lock:
+                for entry, active in changes:
+                    if active:
+                        self._put(entry)
+                    else:
+                        self._discard(entry.id)
+                self._polled_at = time.monotonic()
+                self._changes_since = started - self.CHANGES_OVERLAP
+        finally:
+            self._load_lock.release()
+
+    def _change(self, name: str, *args) -> None:
+        with self._lock:
+            getattr(self, name)(*args)
+            if self._changes is not None:
+                self._changes.append((name, args))
+
+    def _put(self, entry: TokenEntry) -> None:
+        self._discard(entry.id)
+        # El token pudo pasar a otro usuario: se quita la entrada del dueño anterior
+        previous = self._by_token.get(entry.token)
+        if previous is not None:
+            self._discard(previous.id)
+        self._by_id[entry.id] = entry
+        self._by_user.setdefault(entry.user_id, {})[entry.id] = entry
+        self._by_token[entry.token] = entry
+
+    def _discard(self, token_id: int) -> None:
+        entry = self._by_id.pop(token_id, None)
+        if entry is None:
+            return
+        user_tokens = self._by_user.get(entry.user_id, {})
+        user_tokens.pop(token_id, None)
+        if not user_tokens:
+            self._by_user.pop(entry.user_id, None)
+        if self._by_token.get(entry.token) is entry:
+            del self._by_token[entry.token]
+
+    def _discard_user(self, user_id: int) -> None:
+        for token_id in list(self._by_user.get(user_id, ())):
+            self._discard(token_id)
+
+    def _record_health(self, successful_ids, failed_ids, now: datetime) -> None:
+        for token_id in successful_ids:
+            entry = self._by_id.get(token_id)
+            if entry:
+                self._put(replace(entry, failure_count=0))
+        for token_id in failed_ids:
+            entry = self._by_id.get(token_id)
+            if entry:
+                self._put(replace(entry, failure_count=entry.failure_count + 1, last_failure_at=now))
+
+    def tokens_for_users(self, user_ids: Iterable[int]) -> List[TokenEntry]:
+        self._ensure_loaded()
+        with self._lock:
+            return [
+                entry
+                for user_id in dict.fromkeys(user_ids)
+                for entry in self._by_user.get(user_id, {}).values()
+            ]
+
+    def owner_of(self, token: str) -> Optional[TokenEntry]:
+        self._ensure_loaded()
+        with self._lock:
+            return self._by_token.get(token)
+
+    def put(self, entry: TokenEntry) -> None:
+        self._change("_put", entry)
+
+    def discard(self, token_ids: Iterable[int]) -> None:
+        for token_id in token_ids:
+            self._change("_discard", token_id)
+
+    def discard_user(self, user_id: int) -> None:
+        self._change("_discard_user", user_id)
+
+    def record_health(
+        self, *, successful_ids: Iterable[int], failed_ids: Iterable[int], now: datetime
+    ) -> None:
+        self._change("_record_health", list(successful_ids), list(failed_ids), now)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+
+class DatabaseTokenRegistry(TokenRegistry):
+    """
+    Registro sin estado: cada consulta va a la base de datos. Para despliegues
+    que no toleran el retraso de NOTIFICATION_TOKEN_REGISTRY_POLL_SECONDS.
+    """
+
+    def tokens_for_users(self, user_ids: Iterable[int]) -> List[TokenEntry]:
+        user_ids = list(dict.fromkeys(user_ids))
+        return load_active_tokens(user_ids=user_ids) if user_ids else []
+
+    def owner_of(self, token: str) -> Optional[TokenEntry]:
+        entries = load_active_tokens(token=token)
+        return entries[0] if entries else None
+
+    # Los cambios ya están en la base de datos: no hay nada que actualizar
+    def put(self, entry: TokenEntry) -> None:
+        pass
+
+    def discard(self, token_ids: Iterable[int]) -> None:
+        pass
+
+    def discard_user(self, user_id: int) -> None:
+        pass
+
+    def record_health(
+        self, *, successful_ids: Iterable[int], failed_ids: Iterable[int], now: datetime
+    ) -> None:
+        pass
+
+    def invalidate(self) -> None:
+        pass
+
+
+def _load_registry(path: str) -> TokenRegistry:
+    module_name, _, class_name = path.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+_registry: Optional[TokenRegistry] = None
+
+
+def get_registry() -> TokenRegistry:
+    global _registry
+    if _registry is None:
+        _registry = _load_registry(settings.NOTIFICATION_TOKEN_REGISTRY)
+    return _registry
+
+
+def set_registry(registry: TokenRegistry) -> None:
+    global _registry
+    _registry = registry
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from src.crud import invoice as invoice_crud
+from src.models import Invoice, InvoiceCreate, InvoiceRead
+from src.models.idempotency import IdempotencyKey
+from src.utils import idempotency
+from tests.conftest import use_engine
+
+
+@pytest.fixture
+def file_engine(monkeypatch, tmp_path):
+    # Base en archivo: cada sesión usa su propia conexión y transacción
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    SQLModel.metadata.create_all(engine)
+    use_engine(monkeypatch, engine)
+    idempotency._cache.clear()
+    yield engine
+    idempotency._cache.clear()
+    engine.dispose()
+
+
+def create_invoice(engine, key: str, before_write=None):
+    calls = []
+
+    def handler():
+        calls.append(1)
+        if before_write:
+            before_write()
+        return invoice_crud.create(
+            session=session, obj_in=InvoiceCreate(payment_method="cash", total_price=10), commit=False
+        )
+
+    with Session(engine) as session:
+        response = idempotency.run(
+            session=session,
+            key=key,
+            enterprise_id=1,
+            route="POST /invoices/",
+            payload={"total_price": 10},
+            response_model=InvoiceRead,
+            handler=handler,
+        )
+        if isinstance(response, Invoice):
+            response = InvoiceRead.model_validate(response)
+    return response, len(calls)
+
+
+def invoice_count(engine) -> int:
+    with Session(engine) as session:
+        return len(session.exec(select(Invoice)).all())
+
+
+def test_retry_replays_the_committed_response(file_engine):
+    first, calls = create_invoice(file_engine, "k1")
+    assert calls == 1
+
+    idempotency._cache.clear()
+    replay, calls = create_invoice(file_engine, "k1")
+    assert calls == 0
+    assert replay.headers[idempotency.REPLAY_HEADER] == "true"
+    assert invoice_count(file_engine) == 1
+    with Session(file_engine) as session:
+        stored = session.exec(select(IdempotencyKey)).one()
+        assert stored.status_code == 200
+        assert f'"id": {first.id}' in stored.response_body
+
+
+def test_failed_handler_releases_the_key_and_writes_nothing(file_engine):
+    def fail():
+        raise HTTPException(status_code=400, detail="Petición inválida")
+
+    with pytest.raises(HTTPException):
+        create_invoice(file_engine, "k1", before_write=fail)
+
+    assert invoice_count(file_engine) == 0
+    with Session(file_engine) as session:
+        assert session.exec(select(IdempotencyKey)).all() == []
+
+
+def test_write_is_rolled_back_when_the_reservation_was_taken_over(file_engine):
+    def take_over():
+        # Otra petición retoma la reserva vencida antes de que esta termine
+        with Session(file_engine) as other:
+            reservation = other.exec(select(IdempotencyKey)).one()
+            reservation.created_at += timedelta(seconds=90)
+            other.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        create_invoice(file_engine, "k1", before_write=take_over)
+
+    assert exc.value.status_code == 409
+    assert invoice_count(file_engine) == 0
+    # La reserva de la otra petición sigue intacta
+    with Session(file_engine) as session:
+        assert session.exec(select(IdempotencyKey)).one().status_code is None
@@ -0,0 +1,136 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from src.crud import invoice as invoice_crud
+from src.crud.invoice import InvoiceAlreadyVoidedError
+from src.crud.product import InsufficientStockError
+from src.models import Client, InvoiceVoid, PaymentMethod, Product, Sale, SalesDailyProduct
+from src.models.sale import CheckoutCreate, SaleLine
+
+
+@pytest.fixture
+def sale_setup(mysql_engine, enterprise):
+    with Session(mysql_engine) as session:
+        client = Client(name="Cliente")
+        session.add(client)
+        session.commit()
+        products = session.exec(
+            select(Product)
+            .where(Product.enterprise_id == enterprise["id"])
+            .order_by(Product.id)
+            .limit(2)
+        ).all()
+        return {
+            **enterprise,
+            "client_id": client.id,
+            "stock": {product.id: product.stock for product in products},
+        }
+
+
+def checkout(engine, setup, quantity: int = 2) -> int:
+    lines = [
+        SaleLine(product_id=product_id, quantity=quantity, price=10, discount=0, total_price=10 * quantity)
+        for product_id in setup["stock"]
+    ]
+    with Session(engine) as session:
+        invoice, _ = invoice_crud.checkout(
+            session=session,
+            enterprise_id=setup["id"],
+            obj_in=CheckoutCreate(
+                payment_method=PaymentMethod.CASH,
+                client_id=setup["client_id"],
+                lines=lines,
+                total_price=sum(line.total_price for line in lines),
+            ),
+        )
+        return invoice.id
+
+
+def void_like_router(engine, setup, invoice_id: int, ready: threading.Barrier = None) -> bool:
+    # Igual que el router: lee la factura antes de anularla y la mantiene en la sesión
+    with Session(engine) as session:
+        invoice = invoice_crud.get(session=session, id=invoice_id)
+        assert invoice.voided_at is None
+        if ready:
+            ready.wait()
+        try:
+            invoice_crud.void(session=session, invoice_id=invoice_id, employee_id=setup["employee_id"])
+        except InvoiceAlreadyVoidedError:
+            return False
+        return True
+
+
+def current_stock(engine, setup) -> dict:
+    with Session(engine) as session:
+        return dict(session.exec(
+            select(Product.id, Product.stock).where(Product.id.in_(setup["stock"]))
+        ).all())
+
+
+def test_void_with_stale_invoice_in_session(mysql_engine, sale_setup):
+    invoice_id = checkout(mysql_engine, sale_setup)
+
+    with Session(mysql_engine) as stale:
+        invoice = invoice_crud.get(session=stale, id=invoice_id)
+        assert invoice.voided_at is None
+        assert void_like_router(mysql_engine, sale_setup, invoice_id)
+        with pytest.raises(InvoiceAlreadyVoidedError):
+            invoice_crud.void(session=stale, invoice_id=invoice_id, employee_id=sale_setup["employee_id"])
+        assert invoice.voided_at is not None
+
+    assert current_stock(mysql_engine, sale_setup) == sale_setup["stock"]
+
+
+def test_concurrent_voids_restore_stock_once(mysql_engine, sale_setup):
+    invoice_id = checkout(mysql_engine, sale_setup)
+    workers = 8
+    ready = threading.Barrier(workers)
+
+    with ThreadPoolExecutor(workers) as pool:
+        voided = list(pool.map(
+            lambda _: void_like_router(mysql_engine, sale_setup, invoice_id, ready), range(workers)
+        ))
+
+    assert voided.count(True) == 1
+    assert current_stock(mysql_engine, sale_setup) == sale_setup["stock"]
+    with Session(mysql_engine) as session:
+        audits = session.exec(select(InvoiceVoid).where(InvoiceVoid.invoice_id == invoice_id)).all()
+        assert len(audits) == 1
+
+
+def test_void_racing_sales_on_same_products(mysql_engine, sale_setup):
+    invoice_id = checkout(mysql_engine, sale_setup, quantity=3)
+    sales = 10
+    ready = threading.Barrier(sales + 1)
+
+    def sell() -> int:
+        ready.wait()
+        try:
+            return checkout(mysql_engine, sale_setup, quantity=1)
+        except InsufficientStockError:
+            return 0
+
+    with ThreadPoolExecutor(sales + 1) as pool:
+        voided = pool.submit(void_like_router, mysql_engine, sale_setup, invoice_id, ready)
+        sold = [pool.submit(sell) for _ in range(sales)]
+        assert voided.result()
+        completed = sum(1 for future in sold if future.result())
+
+    # Solo quedan descontadas las ventas concurrentes; la anulada se devolvió completa
+    assert current_stock(mysql_engine, sale_setup) == {
+        product_id: stock - completed for product_id, stock in sale_setup["stock"].items()
+    }
+    with Session(mysql_engine) as session:
+        for product_id in sale_setup["stock"]:
+            sold_units = session.exec(
+                select(func.coalesce(func.sum(Sale.quantity), 0)).where(Sale.product_id == product_id)
+            ).one()
+            rollup_units = session.exec(
+                select(func.coalesce(func.sum(SalesDailyProduct.units), 0))
+                .where(SalesDailyProduct.product_id == product_id)
+            ).one()
+            assert sold_units == rollup_units == completed
@@ -0,0 +1,29 @@
+from datetime import date
+
+from src.routers.live import counted
+from src.utils.live_sales import sale_event
+
+
+def event(event_type: str, sale_ids: list, total: float) -> dict:
+    return sale_event(
+        event_type,
+        invoice_id=1,
+        payment_method="cash",
+        sell_date=date.today(),
+        total=total,
+        units=1 if total > 0 else -1,
+        sale_ids=sale_ids,
+    )
+
+
+def test_events_already_in_the_snapshot_are_skipped():
+    # El snapshot ya incluye la venta 1; los eventos llegaron antes de leerlo
+    sale_ids = {1}
+
+    assert not counted(event("sale", [1], 10), sale_ids)
+    assert counted(event("sale", [2, 3], 20), sale_ids)
+    assert counted(event("void", [2, 3], -20), sale_ids)
+    assert counted(event("sale_deleted", [1], -10), sale_ids)
+    # Eliminada antes del snapshot: no se vuelve a restar
+    assert not counted(event("sale_deleted", [1], -10), sale_ids)
+    assert sale_ids == set()
@@ -0,0 +1,68 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlmodel import Session, select, update
+
+from src.crud import notification_outbox
+from src.models.notification_outbox import NotificationOutbox, OutboxStatus
+from src.models.notification_token import NotificationToken
+from src.utils.notification_outbox import NotificationOutboxWorker
+
+
+def test_retry_only_resends_to_failed_devices(expo_stub, sqlite_engine):
+    with Session(sqlite_engine) as session:
+        ok = NotificationToken(token="ExponentPushToken[ok-1]", user_id=1)
+        failing = NotificationToken(token="ExponentPushToken[toobig-1]", user_id=1)
+        session.add_all([ok, failing])
+        session.commit()
+        failing_id = failing.id
+        notification_outbox.enqueue(session, user_ids=[1], title="Título", message="Mensaje")
+        session.commit()
+
+    worker = NotificationOutboxWorker(batch_size=10, concurrency=2, poll_seconds=60)
+    worker._executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        assert worker.drain() == 1
+        with Session(sqlite_engine) as session:
+            outbox_message = session.exec(select(NotificationOutbox)).one()
+            assert outbox_message.status == OutboxStatus.PENDING
+            assert json.loads(outbox_message.token_ids) == [failing_id]
+            session.exec(update(NotificationOutbox).values(next_attempt_at=datetime.utcnow()))
+            session.commit()
+        assert expo_stub()["messages"] == 2
+
+        assert worker.drain() == 1
+    finally:
+        worker._executor.shutdown()
+
+    # El reintento va solo al dispositivo que falló
+    assert expo_stub()["messages"] == 3
+
+
+def test_same_notification_for_many_users_is_sent_together(expo_stub, sqlite_engine):
+    with Session(sqlite_engine) as session:
+        session.add_all([
+            NotificationToken(token=f"ExponentPushToken[ok-{user_id}]", user_id=user_id)
+            for user_id in range(1, 8)
+        ])
+        session.commit()
+        notification_outbox.enqueue(session, user_ids=list(range(1, 8)), title="Título", message="Mensaje")
+        # La misma notificación dos veces al mismo usuario se entrega dos veces
+        notification_outbox.enqueue(session, user_ids=[1], title="Título", message="Mensaje")
+        notification_outbox.enqueue(session, user_ids=[2], title="Otro", message="Mensaje")
+        session.commit()
+
+    worker = NotificationOutboxWorker(batch_size=20, concurrency=1, poll_seconds=60)
+    worker._executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        assert worker.drain() == 9
+    finally:
+        worker._executor.shutdown()
+
+    stats = expo_stub()
+    assert stats["requests"] == 3
+    assert stats["messages"] == 9
+    with Session(sqlite_engine) as session:
+        statuses = session.exec(select(NotificationOutbox.status)).all()
+    assert set(statuses) == {OutboxStatus.SENT}
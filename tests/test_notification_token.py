@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlmodel import Session, select
+
+from src.crud import notification_token
+from src.models import Employee
+from src.models.notification_token import NotificationToken, NotificationTokenCreate
+from src.utils.token_registry import get_registry
+
+TOKEN = "ExponentPushToken[dispositivo-compartido]"
+
+
+@pytest.fixture
+def users(mysql_engine, enterprise):
+    with Session(mysql_engine) as session:
+        admin = session.get(Employee, enterprise["employee_id"])
+        other = Employee(
+            name="Otro",
+            lastname="Empleado",
+            email="otro@example.com",
+            code="EMP002",
+            telephone="3000000001",
+            hashed_password=admin.hashed_password,
+            enterprise_id=admin.enterprise_id,
+            role_id=admin.role_id,
+        )
+        session.add(other)
+        session.commit()
+        return admin.id, other.id
+
+
+def register_concurrently(engine, user_ids: list) -> list:
+    ready = threading.Barrier(len(user_ids))
+
+    def register(user_id: int) -> int:
+        with Session(engine) as session:
+            ready.wait()
+            return notification_token.create(
+                session, NotificationTokenCreate(token=TOKEN, user_id=user_id, device_name="Teléfono")
+            ).id
+
+    with ThreadPoolExecutor(len(user_ids)) as pool:
+        return list(pool.map(register, user_ids))
+
+
+def stored_tokens(engine) -> list:
+    with Session(engine) as session:
+        return session.exec(select(NotificationToken).where(NotificationToken.token == TOKEN)).all()
+
+
+def test_concurrent_registrations_of_one_token_keep_one_row(mysql_engine, users):
+    user_id, _ = users
+
+    ids = register_concurrently(mysql_engine, [user_id] * 16)
+
+    rows = stored_tokens(mysql_engine)
+    assert len(rows) == 1
+    assert set(ids) == {rows[0].id}
+    assert rows[0].user_id == user_id
+    assert rows[0].active
+
+
+def test_same_token_from_two_users_keeps_one_row_with_last_owner(mysql_engine, users):
+    first, second = users
+
+    ids = register_concurrently(mysql_engine, [first, second] * 8)
+    rows = stored_tokens(mysql_engine)
+    assert len(rows) == 1
+    assert set(ids) == {rows[0].id}
+    assert rows[0].user_id in (first, second)
+    assert rows[0].active
+
+    # El dispositivo pasa al último usuario que lo registra, aunque el registro
+    # en memoria haya quedado con el dueño de otro hilo
+    with Session(mysql_engine) as session:
+        notification_token.create(
+            session, NotificationTokenCreate(token=TOKEN, user_id=second, device_name="Teléfono")
+        )
+    rows = stored_tokens(mysql_engine)
+    assert len(rows) == 1
+    assert rows[0].user_id == second
+    assert rows[0].active
+    assert get_registry().owner_of(TOKEN).user_id == second
+
+
+def test_init_db_deduplicates_tokens_and_replaces_the_old_index(mysql_engine, users):
+    from sqlalchemy import inspect, text
+    from src.config.db import init_db
+
+    user_id, other_id = users
+    # Base de datos anterior al índice único: índice simple y tokens repetidos
+    with mysql_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ux_notificationtoken_token ON notificationtoken"))
+        connection.execute(text("CREATE INDEX ix_notificationtoken_token ON notificationtoken (token)"))
+    with Session(mysql_engine) as session:
+        session.add_all([
+            NotificationToken(token=TOKEN, user_id=user_id, active=False),
+            NotificationToken(token=TOKEN, user_id=other_id),
+            NotificationToken(token=TOKEN, user_id=user_id, active=False),
+            NotificationToken(token="ExponentPushToken[unico]", user_id=user_id),
+        ])
+        session.commit()
+
+    with Session(mysql_engine) as session:
+        init_db(session)
+
+    rows = stored_tokens(mysql_engine)
+    assert [(row.user_id, row.active) for row in rows] == [(other_id, True)]
+    indexes = {index["name"] for index in inspect(mysql_engine).get_indexes("notificationtoken")}
+    assert "ux_notificationtoken_token" in indexes
+    assert "ix_notificationtoken_token" not in indexes
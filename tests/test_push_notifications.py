@@ -0,0 +1,60 @@
+import time
+
+import pytest
+from sqlmodel import Session, select
+
+from src.models.notification_token import NotificationToken
+from src.utils.notification import send_notification_to_users, send_push_messages
+from tests.conftest import EXPO_STUB_LATENCY
+
+
+def push_tokens(count: int, prefix: str = "ok") -> list:
+    return [f"ExponentPushToken[{prefix}-{i}]" for i in range(count)]
+
+
+def test_seven_tokens_use_one_request(expo_stub):
+    started = time.monotonic()
+    results = send_push_messages(push_tokens(7), "Título", "Mensaje")
+    elapsed = time.monotonic() - started
+
+    assert len(results["successful"]) == 7
+    stats = expo_stub()
+    assert stats["requests"] == 1
+    # Un solo viaje de ida y vuelta, no uno por token
+    assert stats["busy_seconds"] == pytest.approx(EXPO_STUB_LATENCY)
+    assert elapsed < 3 * EXPO_STUB_LATENCY
+
+
+def test_tokens_are_sent_in_chunks_of_one_hundred(expo_stub):
+    results = send_push_messages(push_tokens(255), "Título", "Mensaje")
+
+    assert len(results["successful"]) == 255
+    stats = expo_stub()
+    assert stats["requests"] == 3
+    assert stats["max_batch"] == 100
+
+
+def test_only_unregistered_and_malformed_tokens_are_deactivated(expo_stub, sqlite_engine):
+    tokens = {
+        "ok": "ExponentPushToken[ok-1]",
+        "unregistered": "ExponentPushToken[unregistered-1]",
+        "toobig": "ExponentPushToken[toobig-1]",
+        "malformed": "token-mal-formado",
+    }
+    with Session(sqlite_engine) as session:
+        for token in tokens.values():
+            session.add(NotificationToken(token=token, user_id=1, device_name="Teléfono"))
+        session.commit()
+
+        results = send_notification_to_users(session, [1], "Título", "Mensaje")
+
+        assert results["total"] == 4
+        assert results["successful"] == 1
+        rows = {row.token: row for row in session.exec(select(NotificationToken)).all()}
+
+    assert {token for token, row in rows.items() if not row.active} == {
+        tokens["unregistered"], tokens["malformed"]
+    }
+    # MessageTooBig es un fallo del mensaje, no del dispositivo: solo suma a su salud
+    assert rows[tokens["toobig"]].failure_count == 1
+    assert expo_stub()["requests"] == 1
@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, select
+
+from src.config.settings import settings
+from src.models.notification_token import NotificationTicket, NotificationToken
+from src.utils.notification import send_notification_to_users
+from src.utils.push_receipts import reconcile_receipts
+
+TOKENS = [
+    "ExponentPushToken[ok-1]",
+    "ExponentPushToken[receiptdead-1]",
+    "ExponentPushToken[receiptfail-1]",
+]
+
+
+def send_with_tickets(engine, user_id: int) -> None:
+    with Session(engine) as session:
+        session.add_all([NotificationToken(token=token, user_id=user_id) for token in TOKENS])
+        session.commit()
+        send_notification_to_users(session, [user_id], "Título", "Mensaje")
+
+
+def token_rows(engine) -> dict:
+    with Session(engine) as session:
+        return {row.token: row for row in session.exec(select(NotificationToken)).all()}
+
+
+def test_receipts_are_reconciled_once(expo_stub, sqlite_engine, monkeypatch):
+    monkeypatch.setattr(settings, "PUSH_RECEIPT_DELAY_SECONDS", -1)
+    send_with_tickets(sqlite_engine, user_id=1)
+
+    assert reconcile_receipts() == 3
+    assert reconcile_receipts() == 0
+
+    rows = token_rows(sqlite_engine)
+    assert not rows[TOKENS[1]].active
+    assert rows[TOKENS[2]].failure_count == 1
+    assert rows[TOKENS[0]].active and rows[TOKENS[0]].failure_count == 0
+    with Session(sqlite_engine) as session:
+        assert session.exec(select(NotificationTicket)).all() == []
+    assert expo_stub()["receipt_requests"] == 1
+
+
+def test_concurrent_workers_claim_each_ticket_once(expo_stub, mysql_engine, enterprise, monkeypatch):
+    monkeypatch.setattr(settings, "PUSH_RECEIPT_DELAY_SECONDS", -1)
+    send_with_tickets(mysql_engine, user_id=enterprise["employee_id"])
+
+    # Un worker por proceso del API, todos a la vez
+    ready = threading.Barrier(4)
+
+    def run() -> int:
+        ready.wait()
+        return reconcile_receipts()
+
+    with ThreadPoolExecutor(4) as pool:
+        assert sum(pool.map(lambda _: run(), range(4))) == 3
+
+    assert token_rows(mysql_engine)[TOKENS[2]].failure_count == 1
+    assert expo_stub()["receipts"] == 3
@@ -0,0 +1,45 @@
+from datetime import date
+
+from sqlmodel import Session
+
+from src.models import Enterprise, Invoice, PaymentMethod, Product, ProductStatus, Sale
+from src.models.invoice import ReceiptFormat
+from src.utils import receipt
+
+
+def test_receipt_changes_when_a_line_is_added(sqlite_engine):
+    receipt._cache.clear()
+    with Session(sqlite_engine) as session:
+        enterprise = Enterprise(
+            name="Empresa", NIT="900000000-1", email="empresa@example.com", phone_number="3000000000", currency="COP"
+        )
+        session.add(enterprise)
+        session.flush()
+        products = [
+            Product(
+                name=name, description="", status=ProductStatus.ACTIVE, stock=10, supplier_price=5,
+                public_price=10, thumbnail="", bar_code=name, minimal_safe_stock=0, discount=0,
+                enterprise_id=enterprise.id
+            )
+            for name in ("Café", "Pan")
+        ]
+        invoice = Invoice(payment_method=PaymentMethod.CASH, total_price=10, enterprise_id=enterprise.id)
+        session.add_all([*products, invoice])
+        session.flush()
+
+        def add_line(product: Product) -> None:
+            session.add(Sale(
+                invoice_id=invoice.id, product_id=product.id, enterprise_id=enterprise.id,
+                quantity=1, price=10, discount=0, total_price=10, sell_date=date.today()
+            ))
+            session.commit()
+
+        add_line(products[0])
+        first = receipt.get_receipt(session, invoice=invoice, receipt_format=ReceiptFormat.TEXT)
+        assert "Café" in first and "Pan" not in first
+
+        # Como lo haría POST /sales/ desde cualquier proceso del API
+        add_line(products[1])
+        second = receipt.get_receipt(session, invoice=invoice, receipt_format=ReceiptFormat.TEXT)
+        assert "Café" in second and "Pan" in second
+    receipt._cache.clear()
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from sqlmodel import Session, update
+
+from src.models.notification_token import NotificationToken
+from src.utils.token_registry import DatabaseTokenRegistry, InMemoryTokenRegistry, TokenEntry
+
+
+def test_database_registry_sees_changes_from_other_processes(sqlite_engine):
+    in_memory = InMemoryTokenRegistry()
+    database = DatabaseTokenRegistry()
+    assert in_memory.tokens_for_users([1]) == []
+
+    # Cambios hechos por otro proceso, sin pasar por estos registros
+    with Session(sqlite_engine) as session:
+        token = NotificationToken(token="ExponentPushToken[ok-1]", user_id=1)
+        session.add(token)
+        session.commit()
+        token_id = token.id
+
+    assert in_memory.tokens_for_users([1]) == []
+    assert [entry.id for entry in database.tokens_for_users([1])] == [token_id]
+    assert database.owner_of("ExponentPushToken[ok-1]").user_id == 1
+
+    with Session(sqlite_engine) as session:
+        session.exec(update(NotificationToken).values(active=False))
+        session.commit()
+
+    assert database.tokens_for_users([1]) == []
+    assert database.owner_of("ExponentPushToken[ok-1]") is None
+
+
+def test_reassigned_token_leaves_the_previous_owner():
+    registry = InMemoryTokenRegistry(loader=list, poll_seconds=60)
+    assert registry.tokens_for_users([1]) == []
+    registry.put(TokenEntry(id=1, token="ExponentPushToken[ok-1]", user_id=1))
+    registry.put(TokenEntry(id=2, token="ExponentPushToken[ok-1]", user_id=2))
+
+    assert registry.tokens_for_users([1]) == []
+    assert [entry.id for entry in registry.tokens_for_users([2])] == [2]
+    assert registry.owner_of("ExponentPushToken[ok-1]").user_id == 2
+
+
+def test_in_memory_registry_polls_changes_from_other_processes(sqlite_engine):
+    with Session(sqlite_engine) as session:
+        session.add_all([
+            NotificationToken(token="ExponentPushToken[ok-1]", user_id=1),
+            NotificationToken(token="ExponentPushToken[ok-2]", user_id=1),
+        ])
+        session.commit()
+    registry = InMemoryTokenRegistry(poll_seconds=0)
+    assert len(registry.tokens_for_users([1])) == 2
+
+    # Otro proceso reasigna un token y desactiva el otro
+    with Session(sqlite_engine) as session:
+        now = datetime.utcnow()
+        session.exec(
+            update(NotificationToken)
+            .where(NotificationToken.token == "ExponentPushToken[ok-1]")
+            .values(user_id=2, updated_at=now)
+        )
+        session.exec(
+            update(NotificationToken)
+            .where(NotificationToken.token == "ExponentPushToken[ok-2]")
+            .values(active=False, updated_at=now)
+        )
+        session.commit()
+
+    assert registry.tokens_for_users([1]) == []
+    assert registry.owner_of("ExponentPushToken[ok-1]").user_id == 2
+    assert registry.owner_of("ExponentPushToken[ok-2]") is None